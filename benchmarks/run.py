@@ -0,0 +1,300 @@
+"""Benchmark the scoring pipeline on a synthetic corpus
+
+Every stage of scoring a file is timed separately:
+
+- probe: reading the metadata in `AudioFileInfo`
+- praat_pass_N: each run of the Praat script in `_run_praat_script`
+- tables: reading the Praat tables and TextGrid, the rest of `analyze_recording`
+- text_grid: `_analyze_text_grid`
+- features: reducing the analysis to features, including `text_grid`
+- scoring: scoring the features
+- export: writing the CSV row
+
+The corpus is then scored again end to end with the CLI's process pool to measure
+files per second. Results are saved as JSON under `benchmarks/results/`, so runs on
+different commits can be compared with `--compare`, and the scores are checked
+against `benchmarks/golden.json`, which `--update-golden` (re)writes.
+
+    python -m benchmarks.run --files 8 --seconds 20 --jobs 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import math
+import os
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, Iterator, List, Tuple
+
+import parselmouth
+
+from acat.backend.judge_score import score_features
+from acat.backend.language_model import default_model
+from acat.backend.praat_score import EXPORT_COLUMNS, export_row
+from acat.backend.praat_score_judging_japanese import (
+    _analyze_text_grid,
+    analyze_recording,
+    features_from_analysis,
+)
+from acat.cli import score_files
+from acat.ui.audio_file import AudioFileInfo
+from benchmarks.synthetic import (
+    add_corpus_arguments,
+    corpus_spec_from_args,
+    generate_corpus,
+)
+
+BENCHMARK_DIR = pathlib.Path(__file__).parent
+RESULTS_DIR = BENCHMARK_DIR / "results"
+GOLDEN_PATH = BENCHMARK_DIR / "golden.json"
+
+
+class StageTimer:
+    """Collects the wall time of each stage of each file"""
+
+    def __init__(self) -> None:
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name].append(time.perf_counter() - start)
+
+    @contextlib.contextmanager
+    def praat_passes(self) -> Iterator[List[float]]:
+        """Time each run of a Praat script, yielding the times of this file's runs"""
+        run_file = parselmouth.praat.run_file
+        passes: List[float] = []
+
+        def timed_run_file(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return run_file(*args, **kwargs)
+            finally:
+                passes.append(time.perf_counter() - start)
+
+        parselmouth.praat.run_file = timed_run_file
+        try:
+            yield passes
+        finally:
+            parselmouth.praat.run_file = run_file
+            for i, seconds in enumerate(passes, 1):
+                self.timings[f"praat_pass_{i}"].append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                "count": len(times),
+                "total": sum(times),
+                "mean": statistics.fmean(times),
+                "median": statistics.median(times),
+                "min": min(times),
+                "max": max(times),
+            }
+            for name, times in self.timings.items()
+        }
+
+
+def _peak_rss_mb() -> float | None:
+    """The peak resident set size of this process and its finished children"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+
+    # kilobytes on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return peak * scale / 2**20
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCHMARK_DIR,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_stages(files: List[pathlib.Path], timer: StageTimer) -> Dict[str, List]:
+    """Score the files one by one, timing every stage; returns the rows per file"""
+    model = default_model()
+    out = csv.writer(io.StringIO())
+    out.writerow(EXPORT_COLUMNS)
+    rows = {}
+
+    for path in files:
+        with timer.stage("probe"):
+            AudioFileInfo(path)
+
+        start = time.perf_counter()
+        with timer.praat_passes() as passes:
+            analysis = analyze_recording(path)
+        timer.timings["tables"].append(time.perf_counter() - start - sum(passes))
+
+        with timer.stage("text_grid"):
+            _analyze_text_grid(analysis.intervals)
+        with timer.stage("features"):
+            features = features_from_analysis(analysis)
+        with timer.stage("scoring"):
+            score = score_features(features, [model])[model]
+        with timer.stage("export"):
+            row = export_row(path, score)
+            out.writerow(row)
+
+        rows[path.name] = row[2:]
+
+    return rows
+
+
+def run_end_to_end(files: List[pathlib.Path], jobs: int) -> float:
+    """Score the files with the CLI's process pool and return the files per second"""
+    start = time.perf_counter()
+    score_files(files, [default_model()], jobs, io.StringIO(), use_cache=False)
+    return len(files) / (time.perf_counter() - start)
+
+
+def _read_golden() -> Dict[str, List]:
+    return json.loads(GOLDEN_PATH.read_text()) if GOLDEN_PATH.exists() else {}
+
+
+def check_golden(rows: Dict[str, List], tolerance: float) -> Tuple[int, List[str]]:
+    """Compare scores to the golden set
+
+    Returns how many files have golden scores and a description of each mismatch.
+    """
+    golden = _read_golden()
+    compared, mismatches = 0, []
+    for name, expected in golden.items():
+        if name not in rows:
+            continue
+        compared += 1
+        for column, want, got in zip(EXPORT_COLUMNS[2:], expected, rows[name]):
+            got = _json_value(got)
+            if want is None or got is None:
+                matches = want is got
+            else:
+                matches = math.isclose(want, got, rel_tol=tolerance, abs_tol=tolerance)
+            if not matches:
+                mismatches.append(f"{name} {column}: expected {want}, got {got}")
+    return compared, mismatches
+
+
+def _json_value(value) -> float | None:
+    if value is None or math.isnan(value):
+        return None
+    return float(value)
+
+
+def compare(result: Dict, baseline_path: pathlib.Path) -> None:
+    baseline = json.loads(baseline_path.read_text())
+    print(f"\nCompared to {baseline['commit']} ({baseline_path.name}):")
+    for name, stats in result["stages"].items():
+        if name in baseline["stages"]:
+            before = baseline["stages"][name]["median"]
+            print(f"  {name:14} {stats['median'] / before:6.2f}x median time")
+    before = baseline["files_per_second"]
+    print(f"  {'throughput':14} {result['files_per_second'] / before:6.2f}x files/s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_corpus_arguments(parser)
+    parser.add_argument(
+        "--corpus",
+        type=pathlib.Path,
+        help="directory to keep the generated corpus in (default: a temporary one)",
+    )
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--compare", type=pathlib.Path, help="earlier result file")
+    parser.add_argument("--tolerance", type=float, default=1e-6)
+    parser.add_argument("--update-golden", action="store_true")
+    args = parser.parse_args()
+
+    # measure the analysis, not the result cache or the feature store
+    os.environ["ACAT_CACHE"] = "0"
+    os.environ["ACAT_FEATURES"] = "0"
+    spec = corpus_spec_from_args(args)
+
+    with contextlib.ExitStack() as stack:
+        corpus_dir = args.corpus or pathlib.Path(
+            stack.enter_context(tempfile.TemporaryDirectory(prefix="acat-bench-"))
+        )
+        files = generate_corpus(corpus_dir, spec)
+
+        timer = StageTimer()
+        rows = run_stages(files, timer)
+        files_per_second = run_end_to_end(files, args.jobs)
+
+    result = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": vars(spec),
+        "jobs": args.jobs,
+        "stages": timer.summary(),
+        "files_per_second": files_per_second,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+    for name, stats in result["stages"].items():
+        print(f"{name:14} median {stats['median'] * 1000:9.2f} ms")
+    print(f"{'throughput':14} {files_per_second:9.2f} files/s with {args.jobs} jobs")
+    if result["peak_rss_mb"] is not None:
+        print(f"{'peak RSS':14} {result['peak_rss_mb']:9.1f} MB")
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    result_path = (
+        RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{result['commit']}.json"
+    )
+    result_path.write_text(json.dumps(result, indent=2))
+    print(f"\nSaved {result_path}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+    if args.update_golden:
+        golden = _read_golden()
+        for name, row in rows.items():
+            golden[name] = [_json_value(value) for value in row]
+        GOLDEN_PATH.write_text(json.dumps(golden, indent=2, sort_keys=True))
+        print(f"Updated {GOLDEN_PATH}")
+        return 0
+
+    compared, mismatches = check_golden(rows, args.tolerance)
+    if mismatches:
+        print("\nScores differ from the golden set:", *mismatches, sep="\n  ")
+        return 1
+    if compared:
+        print(f"Scores of {compared} files match the golden set")
+    else:
+        print("No golden scores for this corpus, run with --update-golden to add them")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""Load-test the local scoring service
+
+`acat serve` is started on a free port with the result cache and feature store
+disabled, and once its workers are warm, `--requests` synchronous scoring requests
+are sent over `--concurrency` keep-alive connections, cycling through a synthetic
+corpus. Files are named by path, or uploaded with `--upload`. The throughput, the
+latency percentiles seen by the clients and the metrics of the service are
+reported and saved next to those of `benchmarks.run`.
+
+    python -m benchmarks.service --files 8 --requests 64 --concurrency 8 --jobs 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import pathlib
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from benchmarks.run import RESULTS_DIR, git_commit
+from benchmarks.synthetic import (
+    add_corpus_arguments,
+    corpus_spec_from_args,
+    generate_corpus,
+)
+
+_HOST = "127.0.0.1"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind((_HOST, 0))
+        return s.getsockname()[1]
+
+
+def _get(port: int, path: str) -> Dict:
+    connection = http.client.HTTPConnection(_HOST, port, timeout=10)
+    try:
+        connection.request("GET", path)
+        return json.loads(connection.getresponse().read())
+    finally:
+        connection.close()
+
+
+def _wait_until_healthy(port: int, service: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if service.poll() is not None:
+            raise RuntimeError("The service exited while starting")
+        with contextlib.suppress(OSError):
+            if _get(port, "/health")["status"] == "ok":
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"The service was not healthy within {timeout} s")
+
+
+def _client(
+    port: int, files: List[pathlib.Path], upload: bool
+) -> List[tuple[float, int]]:
+    """Send requests for the files one after another on one connection"""
+    connection = http.client.HTTPConnection(_HOST, port, timeout=600)
+    results = []
+    try:
+        for path in files:
+            if upload:
+                body = path.read_bytes()
+                target = f"/score?name={path.name}"
+                headers = {"Content-Type": "application/octet-stream"}
+            else:
+                body = json.dumps({"path": str(path)}).encode()
+                target = "/score"
+                headers = {"Content-Type": "application/json"}
+            start = time.perf_counter()
+            connection.request("POST", target, body, headers)
+            response = connection.getresponse()
+            response.read()
+            results.append((time.perf_counter() - start, response.status))
+    finally:
+        connection.close()
+    return results
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_corpus_arguments(parser)
+    parser.add_argument(
+        "--corpus",
+        type=pathlib.Path,
+        help="directory to keep the generated corpus in (default: a temporary one)",
+    )
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--upload", action="store_true", help="upload the audio instead of its path"
+    )
+    args = parser.parse_args()
+
+    spec = corpus_spec_from_args(args)
+    port = _free_port()
+    # measure the analysis, not the result cache or the feature store
+    env = {**os.environ, "ACAT_CACHE": "0", "ACAT_FEATURES": "0"}
+
+    with contextlib.ExitStack() as stack:
+        corpus_dir = args.corpus or pathlib.Path(
+            stack.enter_context(tempfile.TemporaryDirectory(prefix="acat-bench-"))
+        )
+        files = generate_corpus(corpus_dir, spec)
+
+        started = time.perf_counter()
+        service = subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                "import sys; from acat.cli import run_cli; sys.exit(run_cli(sys.argv[1:]))",
+                "serve",
+                "--port",
+                str(port),
+                "--jobs",
+                str(args.jobs),
+            ],
+            env=env,
+        )
+        stack.callback(service.wait)
+        stack.callback(service.terminate)
+        _wait_until_healthy(port, service, timeout=120)
+        warm_up_seconds = time.perf_counter() - started
+
+        requested = [files[i % len(files)] for i in range(args.requests)]
+        shares = [requested[i :: args.concurrency] for i in range(args.concurrency)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as executor:
+            responses = [
+                response
+                for results in executor.map(
+                    lambda share: _client(port, share, args.upload), shares
+                )
+                for response in results
+            ]
+        seconds = time.perf_counter() - start
+        metrics = _get(port, "/metrics")
+
+    latencies = sorted(latency for latency, _ in responses)
+    errors = sum(status != 200 for _, status in responses)
+    result = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "corpus": vars(spec),
+        "jobs": args.jobs,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "upload": args.upload,
+        "warm_up_seconds": warm_up_seconds,
+        "requests_per_second": len(responses) / seconds,
+        "errors": errors,
+        "latency_seconds": {
+            "p50": statistics.median(latencies),
+            "p90": _percentile(latencies, 0.9),
+            "p99": _percentile(latencies, 0.99),
+            "max": latencies[-1],
+        },
+        "service": metrics,
+    }
+
+    print(f"{'warm-up':12} {warm_up_seconds:9.2f} s")
+    print(
+        f"{'throughput':12} {result['requests_per_second']:9.2f} requests/s "
+        f"with {args.jobs} workers"
+    )
+    for name, value in result["latency_seconds"].items():
+        print(f"{'latency ' + name:12} {value * 1000:9.1f} ms")
+    print(f"{'utilization':12} {metrics['worker_utilization']:9.2%}")
+    print(f"{'joined':12} {metrics['jobs']['joined']:9d} requests")
+    if errors:
+        print(f"{errors} requests failed")
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    result_path = (
+        RESULTS_DIR
+        / f"service-{time.strftime('%Y%m%d-%H%M%S')}-{result['commit']}.json"
+    )
+    result_path.write_text(json.dumps(result, indent=2))
+    print(f"\nSaved {result_path}")
+
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Check how quickly the GUI window appears
+
+Each run starts a fresh interpreter that creates the main window, shows it and
+processes the first events, then reports which analysis libraries were imported by
+then. The check fails if any of them was, or if the median time to the window
+exceeds the budget. The command line entry point is checked the same way, since
+the GUI goes through it. Results are saved next to those of `benchmarks.run`.
+
+    python -m benchmarks.startup --runs 5 --max-seconds 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from benchmarks.run import RESULTS_DIR, git_commit
+
+# libraries that must not be imported before the window is shown
+HEAVY_MODULES = ("numpy", "pandas", "parselmouth", "praatio", "pydub")
+
+_GUI_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from PyQt6.QtWidgets import QApplication
+app = QApplication([])
+from acat.ui.main_window import MainWindow
+from acat.ui.window_management import set_main_window
+window = MainWindow()
+set_main_window(window)
+window.show()
+app.processEvents()
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "modules": [m for m in HEAVY if m in sys.modules],
+}))
+"""
+
+_CLI_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import acat.main, acat.cli
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "modules": [m for m in HEAVY if m in sys.modules],
+}))
+"""
+
+
+def _probe(code: str) -> Dict:
+    """Run a probe in a fresh interpreter, adding the time it took to start up"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", f"HEAVY = {HEAVY_MODULES!r}\n{code}"],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report["process_seconds"] = time.perf_counter() - start
+    return report
+
+
+def _summarize(reports: List[Dict]) -> Dict:
+    return {
+        "median_seconds": statistics.median(r["seconds"] for r in reports),
+        "median_process_seconds": statistics.median(
+            r["process_seconds"] for r in reports
+        ),
+        "heavy_modules": sorted({m for r in reports for m in r["modules"]}),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=2.0,
+        help="budget for the median time from the first import to the shown window",
+    )
+    args = parser.parse_args()
+
+    result = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "gui": _summarize([_probe(_GUI_PROBE) for _ in range(args.runs)]),
+        "cli": _summarize([_probe(_CLI_PROBE) for _ in range(args.runs)]),
+    }
+
+    failed = False
+    for name, summary in (("gui", result["gui"]), ("cli", result["cli"])):
+        print(
+            f"{name:4} {summary['median_seconds'] * 1000:8.1f} ms to ready, "
+            f"{summary['median_process_seconds'] * 1000:8.1f} ms with interpreter start"
+        )
+        if summary["heavy_modules"]:
+            print(f"     imported too early: {', '.join(summary['heavy_modules'])}")
+            failed = True
+    if result["gui"]["median_seconds"] > args.max_seconds:
+        print(f"The window took longer than {args.max_seconds} s to show")
+        failed = True
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    result_path = (
+        RESULTS_DIR
+        / f"startup-{time.strftime('%Y%m%d-%H%M%S')}-{result['commit']}.json"
+    )
+    result_path.write_text(json.dumps(result, indent=2))
+    print(f"\nSaved {result_path}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
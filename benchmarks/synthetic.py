@@ -0,0 +1,165 @@
+"""Synthetic speech-like audio for benchmarking
+
+The signal is a harmonic voice source with a drifting F0, shaped by three drifting
+formants and an amplitude envelope of syllables at about four per second, grouped
+into phrases separated by pauses over a low noise floor. It is not speech, but the
+syllable nuclei script finds syllables, pauses, pitch and formants in it, which is
+what the benchmarks need. Generation is deterministic given the seed.
+
+    python -m benchmarks.synthetic OUT_DIR --files 8 --seconds 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import pathlib
+import wave
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+# samples are synthesized this many at a time to bound memory for long files
+_BLOCK_SIZE = 1 << 16
+_N_HARMONICS = 40
+
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    """What kind of files to generate"""
+
+    files: int = 8
+    seconds: float = 20.0
+    sample_rate: int = 16000
+    channels: int = 1
+    seed: int = 0
+
+    def file_name(self, index: int) -> str:
+        return (
+            f"synth_{self.seconds:g}s_{self.sample_rate}hz_{self.channels}ch_"
+            f"{self.seed}_{index:03d}.wav"
+        )
+
+
+def _phrase_gate(n_samples: int, sample_rate: int, rng: np.random.Generator):
+    """1 during phrases of 1-4 s, 0 during pauses of 0.3-1.5 s"""
+    gate = np.zeros(n_samples)
+    position = int(rng.uniform(0.2, 0.6) * sample_rate)
+    while position < n_samples:
+        length = int(rng.uniform(1.0, 4.0) * sample_rate)
+        gate[position : position + length] = 1.0
+        position += length + int(rng.uniform(0.3, 1.5) * sample_rate)
+    return gate
+
+
+def _formant_gain(frequencies: np.ndarray, formants: np.ndarray) -> np.ndarray:
+    """Sum of resonance peaks at the formants, with bandwidths growing with frequency"""
+    gain = np.zeros_like(frequencies)
+    for formant in formants:
+        bandwidth = 60.0 + 0.06 * formant
+        gain += 1.0 / (1.0 + ((frequencies - formant) / bandwidth) ** 2)
+    return gain
+
+
+def synthesize(seconds: float, sample_rate: int, seed: int) -> np.ndarray:
+    """Synthesize a mono signal in [-1, 1]"""
+    rng = np.random.default_rng(seed)
+    n_samples = int(seconds * sample_rate)
+    t = np.arange(n_samples) / sample_rate
+
+    f0 = (
+        rng.uniform(100, 220)
+        + 25 * np.sin(2 * np.pi * rng.uniform(0.1, 0.4) * t)
+        + 10 * np.sin(2 * np.pi * rng.uniform(1.0, 3.0) * t)
+    )
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    formants = np.stack(
+        [
+            base + spread * np.sin(2 * np.pi * rate * t + rng.uniform(0, 2 * np.pi))
+            for base, spread, rate in (
+                (600, 200, rng.uniform(2.0, 4.0)),
+                (1500, 400, rng.uniform(2.0, 4.0)),
+                (2600, 300, rng.uniform(1.0, 3.0)),
+            )
+        ]
+    )
+
+    signal = np.zeros(n_samples)
+    nyquist = sample_rate / 2
+    for start in range(0, n_samples, _BLOCK_SIZE):
+        block = slice(start, start + _BLOCK_SIZE)
+        for k in range(1, _N_HARMONICS + 1):
+            frequency = k * f0[block]
+            gain = _formant_gain(frequency, formants[:, block]) / k
+            gain[frequency >= nyquist] = 0.0
+            signal[block] += gain * np.sin(k * phase[block])
+
+    syllable_rate = rng.uniform(3.5, 5.0)
+    envelope = np.clip(np.sin(np.pi * syllable_rate * t), 0, None) ** 2
+    signal *= envelope * _phrase_gate(n_samples, sample_rate, rng)
+    signal *= 0.5 / max(np.max(np.abs(signal)), 1e-9)
+    signal += 0.001 * rng.standard_normal(n_samples)
+    return np.clip(signal, -1.0, 1.0)
+
+
+def write_wav(
+    path: pathlib.Path, signal: np.ndarray, sample_rate: int, channels: int
+) -> None:
+    samples = (signal * 32767).astype("<i2")
+    # channels differ slightly in level, like a real stereo recording would
+    frames = np.stack(
+        [
+            (samples * (1.0 - 0.1 * channel)).astype("<i2")
+            for channel in range(channels)
+        ],
+        axis=1,
+    )
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(frames.tobytes())
+
+
+def generate_corpus(directory: pathlib.Path, spec: CorpusSpec) -> List[pathlib.Path]:
+    """Generate the files of a corpus, reusing files that were generated before"""
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index in range(spec.files):
+        path = directory / spec.file_name(index)
+        if not path.exists():
+            signal = synthesize(
+                spec.seconds, spec.sample_rate, spec.seed * 1000 + index
+            )
+            write_wav(path, signal, spec.sample_rate, spec.channels)
+        paths.append(path)
+    return paths
+
+
+def add_corpus_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = CorpusSpec()
+    parser.add_argument("--files", type=int, default=defaults.files)
+    parser.add_argument("--seconds", type=float, default=defaults.seconds)
+    parser.add_argument("--sample-rate", type=int, default=defaults.sample_rate)
+    parser.add_argument("--channels", type=int, default=defaults.channels)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def corpus_spec_from_args(args: argparse.Namespace) -> CorpusSpec:
+    return CorpusSpec(
+        args.files, args.seconds, args.sample_rate, args.channels, args.seed
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", type=pathlib.Path)
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+
+    for path in generate_corpus(args.directory, corpus_spec_from_args(args)):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
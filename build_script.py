@@ -5,7 +5,7 @@ from pathlib import Path
 from typing import Generator, List
 
 import PyInstaller.__main__
-from acat.backend.utils import get_praat_func_dir
+from acat.backend.utils import get_models_dir, get_praat_func_dir
 
 HERE = Path(__file__).parent.absolute()
 PACKAGE = HERE / "src" / "acat"
@@ -23,6 +23,13 @@ def _praat_resource_path() -> List[str]:
     return [f"--add-data={path}:{package}" for path, package in mapping]
 
 
+def _models_resource_path() -> List[str]:
+    return [
+        f"--add-data={model_file.absolute()}:models/"
+        for model_file in get_models_dir().glob("*.toml")
+    ]
+
+
 def _ffmpeg_resource_path() -> Generator[str, None, None]:
     ffmpeg_path = os.environ.get("_ACAT_FFMPEG_PATH", "")
     ffmpeg_path = pathlib.Path(ffmpeg_path)
@@ -43,6 +50,11 @@ def _ffmpeg_resource_path() -> Generator[str, None, None]:
     if ffmpeg_path is not None:
         yield f"--add-binary={ffmpeg_path}:bin/"
 
+    # ffprobe lets the app read the duration of compressed audio without decoding it
+    ffprobe_path = ffmpeg_path.with_name(ffmpeg_path.name.replace("ffmpeg", "ffprobe"))
+    if ffprobe_path.exists():
+        yield f"--add-binary={ffprobe_path}:bin/"
+
 
 def test_build(log_level: str = "DEBUG"):
     PyInstaller.__main__.run(
@@ -57,6 +69,7 @@ def test_build(log_level: str = "DEBUG"):
             "--clean",
             "--icon=ACAT_ICON.png",
             *_praat_resource_path(),
+            *_models_resource_path(),
             *_ffmpeg_resource_path(),
         ]
     )
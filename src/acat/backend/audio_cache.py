@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import os
+import pathlib
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Tuple
+
+from acat.backend.utils import bind_ffmpeg
+
+if TYPE_CHECKING:
+    from pydub import AudioSegment
+
+_DEFAULT_MAX_SIZE_BYTES = 512 * 1024 * 1024
+
+# a file is identified by its path, size and modification time, so that a file
+# changed on disk is decoded again
+_AudioKey = Tuple[str, int, int]
+
+
+def _audio_key(audio_file_path: pathlib.Path) -> _AudioKey:
+    stat = audio_file_path.stat()
+    return str(audio_file_path.absolute()), stat.st_size, stat.st_mtime_ns
+
+
+class AudioCache:
+    """Decoded audio shared by every handle, within a memory budget
+
+    The decoded samples of a file are kept until the samples of all files grow
+    beyond `max_size_bytes`, when the least recently used files are evicted. A file
+    larger than the whole budget is decoded for each use and never kept.
+    """
+
+    def __init__(self, max_size_bytes: int = _DEFAULT_MAX_SIZE_BYTES) -> None:
+        self.max_size_bytes = max_size_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[_AudioKey, AudioSegment] = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, audio_file_path: pathlib.Path) -> AudioSegment:
+        """The decoded audio of a file, decoding it if it is not cached"""
+        key = _audio_key(audio_file_path)
+        with self._lock:
+            if (audio := self._entries.get(key)) is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return audio
+            self._misses += 1
+
+        # decoded outside the lock, so that other files are served meanwhile
+        from pydub import AudioSegment
+
+        bind_ffmpeg()
+        audio = AudioSegment.from_file(audio_file_path)
+        self._put(key, audio)
+        return audio
+
+    def _put(self, key: _AudioKey, audio: AudioSegment) -> None:
+        size = len(audio.raw_data)
+        if size > self.max_size_bytes:
+            return
+
+        with self._lock:
+            if (previous := self._entries.pop(key, None)) is not None:
+                self._size -= len(previous.raw_data)
+            self._entries[key] = audio
+            self._size += size
+
+            while self._size > self.max_size_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.raw_data)
+
+    def evict(self, audio_file_path: pathlib.Path) -> None:
+        """Drop every cached version of a file"""
+        path = str(audio_file_path.absolute())
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == path]:
+                self._size -= len(self._entries.pop(key).raw_data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_size_bytes": self.max_size_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+_audio_cache: AudioCache | None = None
+_audio_cache_lock = threading.Lock()
+
+
+def get_audio_cache() -> AudioCache:
+    """Get the audio cache of this process
+
+    The memory budget can be set in megabytes with `ACAT_AUDIO_CACHE_MB`.
+    """
+    global _audio_cache
+
+    with _audio_cache_lock:
+        if _audio_cache is None:
+            max_size_mb = os.environ.get("ACAT_AUDIO_CACHE_MB")
+            _audio_cache = AudioCache(
+                int(float(max_size_mb) * 1024 * 1024)
+                if max_size_mb
+                else _DEFAULT_MAX_SIZE_BYTES
+            )
+
+    return _audio_cache
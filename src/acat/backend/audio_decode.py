@@ -0,0 +1,152 @@
+"""Decoding audio files into samples once, for every format
+
+PCM and float WAV files are mapped into memory and read in place. Praat reads the
+other formats it knows, such as MP3 and FLAC, itself. Formats it does not know,
+such as Ogg and M4A, are decoded by ffmpeg into a WAV file on disk, a chunk at a
+time, so that even long recordings are never held in memory whole.
+"""
+
+from __future__ import annotations
+
+import pathlib
+import shutil
+import subprocess
+from dataclasses import dataclass
+
+import numpy as np
+import parselmouth
+
+from acat.backend.audio_probe import WAV_EXTENSIONS, WavLayout, read_wav_layout
+from acat.backend.utils import get_ffmpeg_path_dir
+
+# identifies how files are decoded, since decoders differ slightly, e.g. in how
+# much of the padding of an MP3 file they drop
+DECODER_VERSION = "praat+ffmpeg-s32wav"
+# the formats Praat reads, and streams as a LongSound, itself
+PRAAT_EXTENSIONS = (*WAV_EXTENSIONS, ".aif", ".aiff", ".aifc", ".flac", ".mp3")
+
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_IEEE_FLOAT = 3
+
+
+@dataclass(frozen=True)
+class DecodedAudio:
+    """The samples of an audio file, as a (n_channels x n_samples) array in [-1, 1]"""
+
+    samples: np.ndarray
+    sample_rate: int
+
+    @property
+    def duration(self) -> float:
+        return self.samples.shape[1] / self.sample_rate
+
+    def to_sound(self) -> parselmouth.Sound:
+        # Praat copies the samples into memory of its own, next to the scaled
+        # float64 array `_decode_wav` made from the mapped file
+        return parselmouth.Sound(self.samples, sampling_frequency=self.sample_rate)
+
+
+def _wav_sample_dtype(layout: WavLayout) -> np.dtype | None:
+    """The NumPy type of the samples of a WAV file, if they can be read in place"""
+    bytes_per_sample = layout.bits_per_sample // 8
+    if layout.bits_per_sample % 8 or layout.block_align != (
+        bytes_per_sample * layout.channels
+    ):
+        return None
+    if layout.audio_format == _WAVE_FORMAT_PCM:
+        return {1: np.dtype("u1"), 2: np.dtype("<i2"), 4: np.dtype("<i4")}.get(
+            bytes_per_sample
+        )
+    if layout.audio_format == _WAVE_FORMAT_IEEE_FLOAT:
+        return {4: np.dtype("<f4"), 8: np.dtype("<f8")}.get(bytes_per_sample)
+    return None
+
+
+def _decode_wav(audio_file_path: pathlib.Path) -> DecodedAudio | None:
+    try:
+        layout = read_wav_layout(audio_file_path)
+    except ValueError:
+        return None
+    if (dtype := _wav_sample_dtype(layout)) is None:
+        return None
+
+    frames = np.memmap(
+        audio_file_path,
+        dtype=dtype,
+        mode="r",
+        offset=layout.data_offset,
+        shape=(layout.data_size // layout.block_align, layout.channels),
+    )
+    # scaling makes the one float64 copy of the mapped samples
+    if dtype.kind == "f":
+        samples = frames.T.astype(np.float64)
+    elif dtype.kind == "u":
+        samples = frames.T.astype(np.float64)
+        samples -= 128.0
+        samples /= 128.0
+    else:
+        samples = frames.T / float(2 ** (layout.bits_per_sample - 1))
+    return DecodedAudio(samples, layout.sample_rate)
+
+
+def _ffmpeg_path() -> str | None:
+    if ffmpeg_path := get_ffmpeg_path_dir():
+        return str(ffmpeg_path)
+    return shutil.which("ffmpeg")
+
+
+def decode_to_wav(audio_file_path: pathlib.Path, wav_path: pathlib.Path) -> None:
+    """Decode an audio file with ffmpeg into a 32-bit WAV file at its own rate and
+    channel count
+
+    ffmpeg streams the samples to the file, so memory use does not grow with the
+    length of the recording. `wav_path` is written as WAV whatever its suffix.
+
+    Raises `FileNotFoundError` without ffmpeg, and `subprocess.CalledProcessError`
+    if ffmpeg cannot decode the file.
+    """
+    if (ffmpeg_path := _ffmpeg_path()) is None:
+        raise FileNotFoundError("ffmpeg is needed to decode " + str(audio_file_path))
+
+    subprocess.run(
+        [
+            ffmpeg_path,
+            "-v",
+            "error",
+            "-y",
+            "-i",
+            str(audio_file_path),
+            "-map",
+            "0:a:0",
+            "-c:a",
+            "pcm_s32le",
+            "-f",
+            "wav",
+            str(wav_path),
+        ],
+        capture_output=True,
+        check=True,
+    )
+
+
+def decode_audio(audio_file_path: pathlib.Path) -> DecodedAudio | None:
+    """Read the samples of a PCM or float WAV file in place; `None` for other files"""
+    if audio_file_path.suffix.lower() in WAV_EXTENSIONS:
+        return _decode_wav(audio_file_path)
+    return None
+
+
+def read_sound(audio_file_path: pathlib.Path) -> parselmouth.Sound:
+    """Read an audio file as a Praat sound, letting Praat read it if it cannot be
+    read in place"""
+    if (decoded := decode_audio(audio_file_path)) is not None:
+        return decoded.to_sound()
+    return parselmouth.Sound(str(audio_file_path))
+
+
+def needs_decoding(audio_file_path: pathlib.Path) -> bool:
+    """Whether the file must be decoded by ffmpeg, as Praat cannot read its format"""
+    return (
+        audio_file_path.suffix.lower() not in PRAAT_EXTENSIONS
+        and _ffmpeg_path() is not None
+    )
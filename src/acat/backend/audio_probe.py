@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import json
+import pathlib
+import struct
+import subprocess
+from dataclasses import dataclass
+from typing import BinaryIO, List, Sequence
+
+from acat.backend.utils import bind_ffmpeg, get_ffprobe_path
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".m4a")
+WAV_EXTENSIONS = (".wav", ".wave")
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def find_audio_files(
+    directory: pathlib.Path,
+    recursive: bool = True,
+    extensions: Sequence[str] = AUDIO_EXTENSIONS,
+) -> List[pathlib.Path]:
+    """Find the audio files in a directory, in a stable order"""
+    pattern = "**/*" if recursive else "*"
+    return sorted(
+        path
+        for path in directory.glob(pattern)
+        if path.suffix.lower() in extensions and path.is_file()
+    )
+
+
+@dataclass(frozen=True)
+class AudioMetadata:
+    """Metadata of an audio file that is known without decoding its samples"""
+
+    duration: float
+    sample_rate: int
+    channels: int
+
+
+@dataclass(frozen=True)
+class WavLayout:
+    """Where the PCM samples of a WAV file are and how they are encoded
+
+    For extensible WAV files, `audio_format` is the format of their sub-format.
+    """
+
+    audio_format: int
+    channels: int
+    sample_rate: int
+    block_align: int
+    bits_per_sample: int
+    data_offset: int
+    data_size: int
+
+    @property
+    def duration(self) -> float:
+        return self.data_size / self.block_align / self.sample_rate
+
+
+def _read_chunk_header(f: BinaryIO) -> tuple[bytes, int] | None:
+    header = f.read(8)
+    if len(header) < 8:
+        return None
+    chunk_id, chunk_size = struct.unpack("<4sI", header)
+    return chunk_id, chunk_size
+
+
+def _read_exactly(f: BinaryIO, size: int, audio_file_path: pathlib.Path) -> bytes:
+    data = f.read(size)
+    if len(data) < size:
+        raise ValueError(f"{audio_file_path} has a truncated format chunk")
+    return data
+
+
+def read_wav_layout(audio_file_path: pathlib.Path) -> WavLayout:
+    """Read the layout of a WAV file from its RIFF chunks, without reading samples
+
+    Raises `ValueError` if the file is not a RIFF/WAVE file or its header is
+    truncated.
+    """
+    file_size = audio_file_path.stat().st_size
+
+    with open(audio_file_path, "rb") as f:
+        riff_header = f.read(12)
+        if (
+            len(riff_header) < 12
+            or riff_header[:4] != b"RIFF"
+            or riff_header[8:] != b"WAVE"
+        ):
+            raise ValueError(f"{audio_file_path} is not a RIFF/WAVE file")
+
+        fmt = None
+        while (chunk := _read_chunk_header(f)) is not None:
+            chunk_id, chunk_size = chunk
+            if chunk_id == b"fmt ":
+                if chunk_size < 16:
+                    raise ValueError(f"{audio_file_path} has an invalid format chunk")
+                fmt = struct.unpack("<HHIIHH", _read_exactly(f, 16, audio_file_path))
+                read = 16
+                if fmt[0] == _WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40:
+                    # the format is the first field of the sub-format GUID, after
+                    # the extension size, valid bits and channel mask
+                    f.seek(8, 1)
+                    (sub_format,) = struct.unpack(
+                        "<H", _read_exactly(f, 2, audio_file_path)
+                    )
+                    fmt = (sub_format, *fmt[1:])
+                    read = 26
+                f.seek(chunk_size - read + chunk_size % 2, 1)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError(f"{audio_file_path} has no format chunk")
+                data_offset = f.tell()
+                # recorders that are interrupted leave a wrong data size behind
+                data_size = min(chunk_size, file_size - data_offset)
+                audio_format, channels, sample_rate, _, block_align, bits = fmt
+                if not (channels and sample_rate and block_align):
+                    raise ValueError(f"{audio_file_path} has an invalid format chunk")
+                return WavLayout(
+                    audio_format,
+                    channels,
+                    sample_rate,
+                    block_align,
+                    bits,
+                    data_offset,
+                    data_size - data_size % block_align,
+                )
+            else:
+                f.seek(chunk_size + chunk_size % 2, 1)
+
+    raise ValueError(f"{audio_file_path} has no data chunk")
+
+
+def _probe_with_ffprobe(audio_file_path: pathlib.Path) -> AudioMetadata | None:
+    ffprobe_path = get_ffprobe_path()
+    if ffprobe_path is None:
+        return None
+
+    result = subprocess.run(
+        [
+            str(ffprobe_path),
+            "-v",
+            "error",
+            "-select_streams",
+            "a:0",
+            "-show_entries",
+            "stream=sample_rate,channels,duration:format=duration",
+            "-of",
+            "json",
+            str(audio_file_path),
+        ],
+        capture_output=True,
+        check=True,
+    )
+    info = json.loads(result.stdout)
+    stream = info["streams"][0]
+    duration = stream.get("duration") or info["format"]["duration"]
+
+    return AudioMetadata(
+        float(duration), int(stream["sample_rate"]), int(stream["channels"])
+    )
+
+
+def _probe_by_decoding(audio_file_path: pathlib.Path) -> AudioMetadata:
+    from pydub import AudioSegment
+
+    bind_ffmpeg()
+    audio = AudioSegment.from_file(audio_file_path)
+    return AudioMetadata(len(audio) / 1000.0, audio.frame_rate, audio.channels)
+
+
+def probe_audio(audio_file_path: pathlib.Path) -> AudioMetadata:
+    """Get the duration, sample rate and channel count of an audio file
+
+    WAV files are probed from their RIFF header and other formats with ffprobe.
+    Only if neither works is the file decoded to find out.
+    """
+    if audio_file_path.suffix.lower() in WAV_EXTENSIONS:
+        try:
+            layout = read_wav_layout(audio_file_path)
+            return AudioMetadata(layout.duration, layout.sample_rate, layout.channels)
+        except ValueError:
+            pass
+
+    try:
+        if (metadata := _probe_with_ffprobe(audio_file_path)) is not None:
+            return metadata
+    except (subprocess.CalledProcessError, KeyError, IndexError, ValueError):
+        pass
+
+    return _probe_by_decoding(audio_file_path)
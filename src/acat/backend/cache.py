@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import time
+from typing import Iterator
+
+from acat.backend.praat_score import PraatScore
+from acat.backend.utils import get_cache_dir
+
+_CACHE_FILE_NAME = "results.sqlite3"
+_DEFAULT_MAX_SIZE_BYTES = 256 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    audio_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    analysis_version TEXT NOT NULL,
+    score TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access);
+"""
+
+
+def audio_content_hash(audio_file_path: pathlib.Path) -> str:
+    """Hash the content of an audio file, so that renamed or moved files still hit"""
+    with open(audio_file_path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _to_python_scalar(value):
+    # numpy scalars are not JSON serializable, but all of them have `.item()`
+    return value.item() if hasattr(value, "item") else value
+
+
+class ResultCache:
+    """An on-disk cache of Praat scores backed by SQLite
+
+    Entries are keyed by the content hash of the audio, the language model and the
+    version of the analysis, so editing the Praat script or its parameters never
+    returns stale scores. When the stored scores grow beyond `max_size_bytes`, the
+    least recently used entries are evicted.
+    """
+
+    def __init__(
+        self, path: pathlib.Path, max_size_bytes: int = _DEFAULT_MAX_SIZE_BYTES
+    ) -> None:
+        self.path = path
+        self.max_size_bytes = max_size_bytes
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # a connection per operation, so that the cache can be shared by threads
+        # and processes alike
+        with contextlib.closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            with conn:
+                yield conn
+
+    @staticmethod
+    def make_key(audio_hash: str, model: str, analysis_version: str) -> str:
+        return hashlib.sha256(
+            f"{audio_hash}:{model}:{analysis_version}".encode()
+        ).hexdigest()
+
+    def get(self, key: str) -> PraatScore | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT score FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+
+        return PraatScore(**json.loads(row[0]))
+
+    def put(
+        self,
+        key: str,
+        score: PraatScore,
+        audio_hash: str,
+        model: str,
+        analysis_version: str,
+    ) -> None:
+        payload = json.dumps(
+            {
+                name: _to_python_scalar(value)
+                for name, value in dataclasses.asdict(score).items()
+            }
+        )
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    audio_hash,
+                    model,
+                    analysis_version,
+                    payload,
+                    len(key) + len(payload),
+                    time.time(),
+                ),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        (total_size,) = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()
+        if total_size <= self.max_size_bytes:
+            return
+
+        excess = total_size - self.max_size_bytes
+        freed = 0
+        stale_keys = []
+        for key, size in conn.execute(
+            "SELECT key, size FROM results ORDER BY last_access"
+        ):
+            if freed >= excess:
+                break
+            stale_keys.append((key,))
+            freed += size
+
+        conn.executemany("DELETE FROM results WHERE key = ?", stale_keys)
+
+    def invalidate(
+        self, model: str | None = None, audio_hash: str | None = None
+    ) -> int:
+        """Remove cached scores, optionally only those of a model or of an audio file
+
+        Returns the number of removed entries.
+        """
+        conditions = {"model": model, "audio_hash": audio_hash}
+        conditions = {column: value for column, value in conditions.items() if value}
+        where = " AND ".join(f"{column} = ?" for column in conditions) or "1"
+
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"DELETE FROM results WHERE {where}", tuple(conditions.values())
+            )
+            return cursor.rowcount
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            count, total_size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+        return {
+            "path": str(self.path),
+            "entries": count,
+            "size_bytes": total_size,
+            "max_size_bytes": self.max_size_bytes,
+        }
+
+
+_result_cache: ResultCache | None = None
+
+
+def get_result_cache() -> ResultCache | None:
+    """Get the cache of this process, unless disabled with `ACAT_CACHE=0`
+
+    The size budget can be set in megabytes with `ACAT_CACHE_MAX_MB`.
+    """
+    global _result_cache
+
+    if os.environ.get("ACAT_CACHE", "1") == "0":
+        return None
+
+    if _result_cache is None:
+        max_size_mb = os.environ.get("ACAT_CACHE_MAX_MB")
+        _result_cache = ResultCache(
+            get_cache_dir() / _CACHE_FILE_NAME,
+            int(float(max_size_mb) * 1024 * 1024)
+            if max_size_mb
+            else _DEFAULT_MAX_SIZE_BYTES,
+        )
+
+    return _result_cache
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import enum
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, List
+
+_EXECUTOR_ENV = "ACAT_EXECUTOR"
+_WORKERS_ENV = "ACAT_WORKERS"
+_MAX_JOBS_ENV = "ACAT_WORKER_MAX_JOBS"
+_DEFAULT_MAX_JOBS = 500
+
+
+class ExecutorKind(enum.Enum):
+    """Where the score judging jobs are executed"""
+
+    Thread = "thread"
+    Process = "process"
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+@dataclass
+class ExecutorConfig:
+    """Which executor runs the score judging jobs, and how many jobs run at once"""
+
+    kind: ExecutorKind = ExecutorKind.Process
+    max_workers: int = field(default_factory=default_workers)
+    # jobs the persistent process pool runs before fresh workers replace it
+    max_jobs: int = _DEFAULT_MAX_JOBS
+
+    @classmethod
+    def from_env(cls) -> ExecutorConfig:
+        """Read the configuration from `ACAT_EXECUTOR`, `ACAT_WORKERS` and
+        `ACAT_WORKER_MAX_JOBS`"""
+        config = cls()
+        if kind := os.environ.get(_EXECUTOR_ENV):
+            config.kind = ExecutorKind(kind.lower())
+        if max_workers := os.environ.get(_WORKERS_ENV):
+            config.max_workers = max(1, int(max_workers))
+        if max_jobs := os.environ.get(_MAX_JOBS_ENV):
+            config.max_jobs = max(1, int(max_jobs))
+        return config
+
+
+def _init_worker(warm_up: bool) -> None:
+    """Import the analysis stack once per worker process instead of once per job,
+    and with `warm_up`, run the analysis once before the first job"""
+    import acat.backend.judge_score  # noqa: F401
+
+    if warm_up:
+        from acat.backend.warmup import warm_up_worker
+
+        warm_up_worker()
+
+
+def _noop() -> None:
+    pass
+
+
+def create_process_pool(max_workers: int, warm_up: bool = False) -> ProcessPoolExecutor:
+    """Create a process pool whose workers are ready to judge scores
+
+    Workers are spawned rather than forked, since forking a process that runs Qt
+    threads is not safe. Workers of long-lived pools are best warmed up, which
+    costs each of them an analysis of a short synthetic recording when it starts.
+    """
+    from acat.backend.feature_store import get_feature_store
+
+    # workers only log the warnings of the feature store at debug level
+    get_feature_store()
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(warm_up,),
+    )
+
+
+class RecyclingProcessPool(Executor):
+    """A warm process pool that is replaced by fresh workers every `max_jobs` jobs
+
+    Recycling the workers bounds whatever memory they accumulate over many
+    analyses. `max_tasks_per_child` would recycle them one by one, but it can hang
+    the pool on Python 3.11, so the pool is replaced as a whole instead: the old
+    workers finish the jobs they were given and exit, while the new ones start.
+    """
+
+    def __init__(self, max_workers: int, max_jobs: int = _DEFAULT_MAX_JOBS) -> None:
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._jobs = 0
+        self._pool = self._start_pool()
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        pool = create_process_pool(self.max_workers, warm_up=True)
+        warm_up_pool(pool, self.max_workers)
+        return pool
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        with self._lock:
+            if self._jobs >= self.max_jobs:
+                self._pool.shutdown(wait=False)
+                self._pool = self._start_pool()
+                self._jobs = 0
+            self._jobs += 1
+            return self._pool.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        with self._lock:
+            self._pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+_process_pool: RecyclingProcessPool | None = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool(
+    max_workers: int, max_jobs: int = _DEFAULT_MAX_JOBS
+) -> RecyclingProcessPool:
+    """Get the persistent process pool, (re)creating it if its size has changed
+
+    A new pool starts and warms up its workers in the background right away.
+    """
+    global _process_pool
+
+    with _process_pool_lock:
+        if _process_pool is not None and (
+            _process_pool.max_workers != max_workers
+            or _process_pool.max_jobs != max_jobs
+        ):
+            _shutdown_process_pool()
+
+        if _process_pool is None:
+            _process_pool = RecyclingProcessPool(max_workers, max_jobs)
+
+        return _process_pool
+
+
+def warm_up_pool(executor: Executor, max_workers: int) -> List[Future]:
+    """Start every worker of a pool; the futures are done once they are ready
+
+    Workers are spawned on demand, so keep them all busy once to start them.
+    """
+    return [executor.submit(_noop) for _ in range(max_workers)]
+
+
+def _shutdown_process_pool() -> None:
+    global _process_pool
+
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def shutdown_process_pool() -> None:
+    with _process_pool_lock:
+        _shutdown_process_pool()
@@ -0,0 +1,244 @@
+"""Exporting results row by row as they arrive
+
+An export sink is opened before a batch starts and appends each result as soon as
+it is known, so a crash or a power cut loses at most the last few seconds of a long
+batch. Rows are written through immediately and the file is synced to disk at most
+every `fsync_interval` seconds, and once more when the sink is closed. Nothing is
+held in memory beyond a row, or a row group for Parquet, however many rows there
+are.
+
+The format follows the file suffix: `.csv`, `.jsonl` (or `.ndjson`) or `.parquet`.
+Parquet needs pyarrow (`pip install acat[parquet]`), and since a Parquet file is
+only readable once it is closed, its rows are also journaled to
+`<file>.partial.jsonl`, which is removed when the sink closes and holds every row
+if it never does.
+"""
+
+from __future__ import annotations
+
+import abc
+import csv
+import importlib.util
+import json
+import math
+import os
+import pathlib
+import time
+from typing import IO, Any, Iterable, List, Sequence, TextIO
+
+# the formats offered for export, with Parquet only when pyarrow is installed
+EXPORT_FORMATS = {
+    ".csv": "CSV Files (*.csv)",
+    ".jsonl": "JSON Lines Files (*.jsonl)",
+}
+if importlib.util.find_spec("pyarrow") is not None:
+    EXPORT_FORMATS[".parquet"] = "Parquet Files (*.parquet)"
+_JSON_LINES_SUFFIXES = (".jsonl", ".ndjson")
+# columns exported as text, every other column is a number
+_TEXT_COLUMNS = ("File Name", "File Path", "Model")
+_DEFAULT_FSYNC_INTERVAL = 5.0
+_DEFAULT_ROW_GROUP_SIZE = 1000
+
+
+def _json_value(value: Any) -> Any:
+    # numpy scalars become Python ones, and JSON has no NaN
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _csv_value(value: Any) -> Any:
+    # missing values are empty cells, as pandas writes them
+    if isinstance(value, float) and math.isnan(value):
+        return ""
+    return value
+
+
+class ExportSink(abc.ABC):
+    """Appends rows laid out as `columns` to a file as they arrive"""
+
+    def __init__(
+        self,
+        file: IO,
+        columns: Sequence[str],
+        fsync_interval: float = _DEFAULT_FSYNC_INTERVAL,
+        close_file: bool = True,
+    ) -> None:
+        self.columns = list(columns)
+        self.fsync_interval = fsync_interval
+        self.rows_written = 0
+        self._file = file
+        self._close_file = close_file
+        self._last_sync = time.monotonic()
+
+    @abc.abstractmethod
+    def _write(self, row: Sequence) -> None:
+        """Write one row to the file"""
+
+    def write_row(self, row: Sequence) -> None:
+        if len(row) != len(self.columns):
+            raise ValueError(
+                f"Expected {len(self.columns)} values in a row, got {len(row)}"
+            )
+        self._write(row)
+        self.rows_written += 1
+        self._file.flush()
+        if time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def write_rows(self, rows: Iterable[Sequence]) -> None:
+        for row in rows:
+            self.write_row(row)
+
+    def sync(self) -> None:
+        """Flush the rows written so far to disk"""
+        self._file.flush()
+        try:
+            os.fsync(self._file.fileno())
+        except (OSError, ValueError):
+            # streams like stdout or a pipe cannot be synced
+            pass
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self.sync()
+        if self._close_file:
+            self._file.close()
+
+    def __enter__(self) -> ExportSink:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class CsvExportSink(ExportSink):
+    def __init__(
+        self,
+        file: TextIO,
+        columns: Sequence[str],
+        write_header: bool = True,
+        fsync_interval: float = _DEFAULT_FSYNC_INTERVAL,
+        close_file: bool = True,
+    ) -> None:
+        super().__init__(file, columns, fsync_interval, close_file)
+        self._writer = csv.writer(file)
+        if write_header:
+            self._writer.writerow(self.columns)
+            file.flush()
+
+    def _write(self, row: Sequence) -> None:
+        self._writer.writerow([_csv_value(value) for value in row])
+
+
+def _json_line(columns: Sequence[str], row: Sequence) -> str:
+    record = {column: _json_value(value) for column, value in zip(columns, row)}
+    return json.dumps(record) + "\n"
+
+
+class JsonLinesExportSink(ExportSink):
+    """Writes each row as a JSON object keyed by column"""
+
+    def _write(self, row: Sequence) -> None:
+        self._file.write(_json_line(self.columns, row))
+
+
+class ParquetExportSink(ExportSink):
+    """Writes rows to a Parquet file a row group at a time
+
+    Rows wait in memory until a row group is full, and are journaled as JSON lines
+    meanwhile, since the Parquet file cannot be read before it is closed.
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        columns: Sequence[str],
+        fsync_interval: float = _DEFAULT_FSYNC_INTERVAL,
+        row_group_size: int = _DEFAULT_ROW_GROUP_SIZE,
+    ) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self.row_group_size = row_group_size
+        self._schema = pa.schema(
+            [
+                (column, pa.string() if column in _TEXT_COLUMNS else pa.float64())
+                for column in columns
+            ]
+        )
+        self._writer = pq.ParquetWriter(str(path), self._schema)
+        self._pending: List[Sequence] = []
+
+        self.journal_path = path.with_name(f"{path.name}.partial.jsonl")
+        super().__init__(open(self.journal_path, "w"), columns, fsync_interval)
+
+    def _write(self, row: Sequence) -> None:
+        self._file.write(_json_line(self.columns, row))
+        self._pending.append([_json_value(value) for value in row])
+        if len(self._pending) >= self.row_group_size:
+            self._write_row_group()
+
+    def _write_row_group(self) -> None:
+        import pyarrow as pa
+
+        if not self._pending:
+            return
+        table = pa.Table.from_pylist(
+            [dict(zip(self.columns, row)) for row in self._pending],
+            schema=self._schema,
+        )
+        self._writer.write_table(table)
+        self._pending.clear()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self._write_row_group()
+        self._writer.close()
+        super().close()
+        # the Parquet file is complete, so the journal is no longer needed
+        self.journal_path.unlink(missing_ok=True)
+
+
+def open_export_sink(
+    path: pathlib.Path,
+    columns: Sequence[str],
+    append: bool = False,
+    fsync_interval: float = _DEFAULT_FSYNC_INTERVAL,
+) -> ExportSink:
+    """Open a sink writing to a file, in the format of its suffix
+
+    With `append`, rows are added to the end of an existing CSV or JSON lines file,
+    and a CSV header is only written to a new or empty file. Parquet files cannot
+    be appended to.
+
+    Raises `ValueError` for an unknown suffix or appending to Parquet, and
+    `ImportError` for Parquet without pyarrow.
+    """
+    suffix = path.suffix.lower()
+    if suffix == ".parquet":
+        if append:
+            raise ValueError("Parquet files cannot be appended to")
+        return ParquetExportSink(path, columns, fsync_interval)
+    if suffix not in (".csv", *_JSON_LINES_SUFFIXES):
+        raise ValueError(
+            f"Cannot export to {suffix or 'files without a suffix'}, "
+            f"choose one of {', '.join(EXPORT_FORMATS)}"
+        )
+
+    is_empty = not path.is_file() or path.stat().st_size == 0
+    mode = "a" if append else "w"
+    if suffix == ".csv":
+        return CsvExportSink(
+            open(path, mode, newline=""),
+            columns,
+            write_header=not append or is_empty,
+            fsync_interval=fsync_interval,
+        )
+    return JsonLinesExportSink(open(path, mode), columns, fsync_interval)
@@ -0,0 +1,363 @@
+"""An on-disk store of the features extracted from recordings
+
+Scores are a cheap function of the features, while the features take a Praat
+analysis to extract, so the store keeps the features of every analyzed recording
+and lets a cohort be re-scored with new or re-fitted models without any audio.
+
+The store is a directory of columnar segments per analysis version: a segment with
+the feature vector of each recording, and optionally one with the F0 and formants
+of each of its syllables. Segments are Parquet files when pyarrow or fastparquet is
+installed (`pip install acat[parquet]`), and pickled data frames otherwise. Each
+analyzed recording adds a small segment of its own, which `compact` merges into one.
+
+Loading a pickle can run arbitrary code, so pickled segments are only written to
+and read from a store shared through `ACAT_FEATURES_DIR` with
+`ACAT_FEATURES_PICKLE=1`.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import hashlib
+import importlib.util
+import logging
+import multiprocessing
+import os
+import pathlib
+import tempfile
+import time
+import uuid
+from typing import TYPE_CHECKING, Dict, Iterator, List, Sequence, Tuple
+
+from acat.backend.praat_score import PraatScore
+from acat.backend.scoring import FEATURES
+from acat.backend.utils import get_cache_dir
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+    from acat.backend.language_model import LanguageModel
+
+_FEATURE_STORE_DIR_NAME = "features"
+_VERSION_FILE_NAME = "VERSION"
+_FEATURES_TABLE = "features"
+_SYLLABLES_TABLE = "syllables"
+_COMPACTED_PREFIX = "compacted-"
+
+SYLLABLE_COLUMNS: Tuple[str, ...] = ("F0", "F1", "F2", "F3")
+
+logger = logging.getLogger(__name__)
+
+
+def _warn(msg: str, *args: object) -> None:
+    # every worker process opens the store too, but the parent opens it first and
+    # warns once, see `create_process_pool`
+    in_worker = multiprocessing.parent_process() is not None
+    logger.log(logging.DEBUG if in_worker else logging.WARNING, msg, *args)
+
+
+@functools.cache
+def _segment_suffix() -> str:
+    if any(importlib.util.find_spec(m) for m in ("pyarrow", "fastparquet")):
+        return ".parquet"
+    _warn(
+        "Neither pyarrow nor fastparquet is installed, so the feature store pickles "
+        "its segments; install acat[parquet] to store them as Parquet"
+    )
+    return ".pkl"
+
+
+def _write_segment(frame: pd.DataFrame, path: pathlib.Path) -> None:
+    # written aside and moved into place, so readers never see a partial segment
+    fd, tmp_name = tempfile.mkstemp(prefix=".", suffix=path.suffix, dir=path.parent)
+    os.close(fd)
+    try:
+        if path.suffix == ".parquet":
+            frame.to_parquet(tmp_name, index=False)
+        else:
+            frame.to_pickle(tmp_name)
+        os.replace(tmp_name, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_name)
+        raise
+
+
+def _read_segment(path: pathlib.Path) -> pd.DataFrame:
+    import pandas as pd
+
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+class FeatureStore:
+    """Features of analyzed recordings, keyed by the content hash of the audio
+
+    With `keep_syllables`, the F0, F1, F2 and F3 of each syllable are kept as well.
+    Without `allow_pickle`, pickled segments are left alone, as is the store when it
+    could only pickle them.
+    """
+
+    def __init__(
+        self,
+        root: pathlib.Path,
+        keep_syllables: bool = False,
+        allow_pickle: bool = True,
+    ) -> None:
+        self.root = root
+        self.keep_syllables = keep_syllables
+        self.allow_pickle = allow_pickle
+        self._suffixes = (".parquet", ".pkl") if allow_pickle else (".parquet",)
+        # compacted features of each version directory, loaded on the first miss
+        self._compacted: Dict[pathlib.Path, Tuple[Tuple[str, ...], pd.DataFrame]] = {}
+
+    def _version_dir(self, analysis_version: str, create: bool = False) -> pathlib.Path:
+        directory = (
+            self.root / hashlib.sha256(analysis_version.encode()).hexdigest()[:16]
+        )
+        if create and not directory.is_dir():
+            for table in (_FEATURES_TABLE, _SYLLABLES_TABLE):
+                (directory / table).mkdir(parents=True, exist_ok=True)
+            (directory / _VERSION_FILE_NAME).write_text(analysis_version)
+        return directory
+
+    def versions(self) -> List[str]:
+        """The analysis versions that have stored features"""
+        return sorted(
+            path.read_text()
+            for path in self.root.glob(f"*/{_VERSION_FILE_NAME}")
+            if path.is_file()
+        )
+
+    @property
+    def writable(self) -> bool:
+        return self.allow_pickle or _segment_suffix() != ".pkl"
+
+    def _segments(
+        self, directory: pathlib.Path, compacted: bool | None = None
+    ) -> List[pathlib.Path]:
+        """The segments of a table, compacted ones first since they are older"""
+        segments = [
+            path
+            for path in directory.glob("*")
+            if path.suffix in self._suffixes and not path.name.startswith(".")
+        ]
+        if compacted is not None:
+            segments = [
+                path
+                for path in segments
+                if path.name.startswith(_COMPACTED_PREFIX) == compacted
+            ]
+        return sorted(
+            segments,
+            key=lambda path: (not path.name.startswith(_COMPACTED_PREFIX), path.name),
+        )
+
+    def put(
+        self,
+        audio_hash: str,
+        audio_file_path: pathlib.Path,
+        analysis_version: str,
+        features: Sequence[float],
+        f0_formants: np.ndarray | None = None,
+    ) -> None:
+        import pandas as pd
+
+        if not self.writable:
+            return
+        directory = self._version_dir(analysis_version, create=True)
+        suffix = _segment_suffix()
+
+        row = {
+            "audio_hash": audio_hash,
+            "file_name": audio_file_path.name,
+            "file_path": str(audio_file_path),
+            "extracted": time.time(),
+            **{feature: float(value) for feature, value in zip(FEATURES, features)},
+        }
+        _write_segment(
+            pd.DataFrame([row]), directory / _FEATURES_TABLE / f"{audio_hash}{suffix}"
+        )
+
+        if self.keep_syllables and f0_formants is not None:
+            syllables = pd.DataFrame(f0_formants, columns=list(SYLLABLE_COLUMNS))
+            syllables.insert(0, "syllable", range(len(syllables)))
+            syllables.insert(0, "audio_hash", audio_hash)
+            _write_segment(
+                syllables, directory / _SYLLABLES_TABLE / f"{audio_hash}{suffix}"
+            )
+
+    def get(self, audio_hash: str, analysis_version: str) -> List[float] | None:
+        """The features of a recording, if they were extracted by this analysis"""
+        directory = self._version_dir(analysis_version) / _FEATURES_TABLE
+        for suffix in self._suffixes:
+            path = directory / f"{audio_hash}{suffix}"
+            if path.is_file():
+                return _read_segment(path).loc[0, list(FEATURES)].tolist()
+
+        compacted = self._compacted_features(directory)
+        if compacted is None or audio_hash not in compacted.index:
+            return None
+        return compacted.loc[audio_hash, list(FEATURES)].tolist()
+
+    def _compacted_features(self, directory: pathlib.Path) -> pd.DataFrame | None:
+        segments = self._segments(directory, compacted=True)
+        if not segments:
+            return None
+
+        names = tuple(path.name for path in segments)
+        cached = self._compacted.get(directory)
+        if cached is None or cached[0] != names:
+            frame = self._latest(self._concat(segments)).set_index("audio_hash")
+            self._compacted[directory] = cached = (names, frame)
+        return cached[1]
+
+    @staticmethod
+    def _concat(segments: List[pathlib.Path]) -> pd.DataFrame:
+        """Concatenate segments, numbering the rows of each in a "segment" column"""
+        import pandas as pd
+
+        frames = []
+        for index, path in enumerate(segments):
+            # a segment may be compacted away while it is being listed
+            with contextlib.suppress(FileNotFoundError):
+                frames.append(_read_segment(path).assign(segment=index))
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def _latest(features: pd.DataFrame) -> pd.DataFrame:
+        """Keep the most recent features of each recording"""
+        if features.empty:
+            return features
+        return (
+            features.sort_values("extracted")
+            .drop_duplicates("audio_hash", keep="last")
+            .drop(columns="segment")
+        )
+
+    def read_features(self, analysis_version: str) -> pd.DataFrame:
+        """The features of every recording analyzed by this analysis, a row each"""
+        import pandas as pd
+
+        directory = self._version_dir(analysis_version) / _FEATURES_TABLE
+        features = self._latest(self._concat(self._segments(directory)))
+        if features.empty:
+            return pd.DataFrame(
+                columns=["audio_hash", "file_name", "file_path", "extracted", *FEATURES]
+            )
+        return features.reset_index(drop=True)
+
+    def read_syllables(self, analysis_version: str) -> pd.DataFrame:
+        """The F0 and formants of every kept syllable, a row each"""
+        import pandas as pd
+
+        directory = self._version_dir(analysis_version) / _SYLLABLES_TABLE
+        syllables = self._concat(self._segments(directory))
+        if syllables.empty:
+            return pd.DataFrame(columns=["audio_hash", "syllable", *SYLLABLE_COLUMNS])
+        # recordings analyzed again replace all of their syllables in later segments
+        latest = syllables.groupby("audio_hash")["segment"].transform("max")
+        return (
+            syllables[syllables["segment"] == latest]
+            .drop(columns="segment")
+            .reset_index(drop=True)
+        )
+
+    def compact(self, analysis_version: str) -> int:
+        """Merge the segments of each table into one; returns the number merged"""
+        directory = self._version_dir(analysis_version)
+        merged = 0
+        for table, read in (
+            (_FEATURES_TABLE, self.read_features),
+            (_SYLLABLES_TABLE, self.read_syllables),
+        ):
+            segments = self._segments(directory / table)
+            if len(segments) < 2 or not self.writable:
+                continue
+            # segments written while compacting are newer than the merged ones and
+            # are kept, since only the listed segments are removed afterwards
+            frame = read(analysis_version)
+            _write_segment(
+                frame,
+                directory
+                / table
+                / f"{_COMPACTED_PREFIX}{uuid.uuid4().hex}{_segment_suffix()}",
+            )
+            for path in segments:
+                with contextlib.suppress(FileNotFoundError):
+                    path.unlink()
+            merged += len(segments)
+        return merged
+
+    def stats(self) -> dict:
+        segments = list(self.root.glob("*/*/*"))
+        suffix = _segment_suffix()
+        return {
+            "path": str(self.root),
+            "format": "parquet"
+            if suffix == ".parquet"
+            else "pickle (no Parquet engine)",
+            "pickle": "allowed" if self.allow_pickle else "ignored",
+            "versions": len(self.versions()),
+            "segments": len(segments),
+            "size_bytes": sum(path.stat().st_size for path in segments),
+        }
+
+
+def rescore(
+    features: pd.DataFrame, models: Sequence[LanguageModel]
+) -> Iterator[Tuple[pathlib.Path, Dict[LanguageModel, PraatScore]]]:
+    """Score stored features with language models, without analyzing any audio
+
+    The whole cohort is scored in one matrix product. Yields the path of each
+    recording and its score by each model.
+    """
+    from acat.backend.language_model import get_scoring_engine
+
+    matrix = features[list(FEATURES)].to_numpy(dtype=float)
+    scores = get_scoring_engine(models).score(matrix) if len(matrix) else []
+    for path, vector, file_scores in zip(features["file_path"], matrix, scores):
+        yield (
+            pathlib.Path(path),
+            {
+                model: PraatScore(*model_scores, *vector.tolist())
+                for model, model_scores in zip(models, file_scores.tolist())
+            },
+        )
+
+
+_feature_store: FeatureStore | None = None
+
+
+def get_feature_store() -> FeatureStore | None:
+    """Get the feature store of this process, unless disabled with `ACAT_FEATURES=0`
+
+    The store is kept in the cache directory unless `ACAT_FEATURES_DIR` is set, and
+    keeps per-syllable tables with `ACAT_FEATURES_SYLLABLES=1`. A store in
+    `ACAT_FEATURES_DIR` only uses pickled segments with `ACAT_FEATURES_PICKLE=1`.
+    """
+    global _feature_store
+
+    if os.environ.get("ACAT_FEATURES", "1") == "0":
+        return None
+
+    if _feature_store is None:
+        root = os.environ.get("ACAT_FEATURES_DIR")
+        _feature_store = FeatureStore(
+            pathlib.Path(root) if root else get_cache_dir() / _FEATURE_STORE_DIR_NAME,
+            os.environ.get("ACAT_FEATURES_SYLLABLES", "0") == "1",
+            allow_pickle=not root or os.environ.get("ACAT_FEATURES_PICKLE") == "1",
+        )
+        if _segment_suffix() == ".pkl" and not _feature_store.writable:
+            _warn(
+                "Not storing features in %s without a Parquet engine; set "
+                "ACAT_FEATURES_PICKLE=1 to pickle them if the directory is trusted",
+                root,
+            )
+
+    return _feature_store
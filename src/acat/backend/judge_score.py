@@ -1,18 +1,367 @@
-import enum
 import pathlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Tuple
 
-from acat.backend.praat_score_judging_japanese import generate_praat_score_japanese_impl
-from acat.ui.audio_file import PraatScore
+from acat.backend.audio_probe import probe_audio
+from acat.backend.cache import ResultCache, audio_content_hash, get_result_cache
+from acat.backend.feature_store import FeatureStore, get_feature_store
+from acat.backend.language_model import LanguageModel, get_scoring_engine, load_model
+from acat.backend.long_recording import LongRecordingOptions, analyze_long_recording
+from acat.backend.praat_score import PraatScore
+from acat.backend.praat_score_judging_japanese import (
+    RecordingAnalysis,
+    analysis_version,
+    analyze_recording,
+    analyze_recordings,
+    features_from_analysis,
+)
+from acat.backend.preprocess import PreprocessOptions
+from acat.backend.tracing import JobTrace, resume_job, share_trace, stage, trace_job
 
+__all__ = [
+    "LanguageModel",
+    "generate_praat_score",
+    "generate_praat_score_traced",
+    "generate_praat_scores_batch_traced",
+    "generate_praat_scores",
+    "generate_praat_scores_traced",
+    "score_features",
+]
 
-class LanguageModel(enum.Enum):
-    Japanese = "Japanese"
+
+def _analyze(
+    audio_file_path: pathlib.Path,
+    save_text_grid: bool,
+    long_recording: LongRecordingOptions | None,
+    preprocess: PreprocessOptions | None,
+) -> RecordingAnalysis:
+    if long_recording is not None:
+        return analyze_long_recording(audio_file_path, long_recording, preprocess)
+    return analyze_recording(audio_file_path, save_text_grid, preprocess)
+
+
+def score_features(
+    features: List[float], models: Sequence[LanguageModel]
+) -> Dict[LanguageModel, PraatScore]:
+    """Score the features of one file with every given model at once"""
+    with stage("scoring"):
+        scores = get_scoring_engine(models).score(features)[0]
+
+    return {
+        model: PraatScore(*model_scores, *features)
+        for model, model_scores in zip(models, scores)
+    }
+
+
+def generate_praat_scores_traced(
+    audio_file_path: pathlib.Path,
+    models: Sequence[LanguageModel] | None = None,
+    save_text_grid: bool = False,
+    use_cache: bool = True,
+    long_recording: LongRecordingOptions | None = None,
+    preprocess: PreprocessOptions | None = None,
+) -> Tuple[Dict[LanguageModel, PraatScore], JobTrace]:
+    """Judge the scores of an audio file like `generate_praat_scores`, also returning
+    the trace of the job
+
+    The trace is not passed to the sinks, so that a job run in a worker process can
+    be emitted by the process that submitted it.
+    """
+    models = list(LanguageModel) if models is None else list(models)
+    attributes = {"model": ",".join(model.value for model in models)}
+    with trace_job(str(audio_file_path), **attributes) as trace:
+        scores = _judge_with_cache(
+            audio_file_path,
+            models,
+            save_text_grid,
+            use_cache,
+            long_recording,
+            preprocess,
+        )
+    return scores, trace
+
+
+def generate_praat_scores(
+    audio_file_path: pathlib.Path,
+    models: Sequence[LanguageModel] | None = None,
+    save_text_grid: bool = False,
+    use_cache: bool = True,
+    long_recording: LongRecordingOptions | None = None,
+    preprocess: PreprocessOptions | None = None,
+) -> Dict[LanguageModel, PraatScore]:
+    """Judge the scores of an audio file with several models, all of them by default
+
+    The features are extracted once and scored with every model in one pass, so
+    each additional model costs no Praat analysis.
+    """
+    models = list(LanguageModel) if models is None else list(models)
+    attributes = {"model": ",".join(model.value for model in models)}
+    with trace_job(str(audio_file_path), emit_trace=True, **attributes):
+        return _judge_with_cache(
+            audio_file_path,
+            models,
+            save_text_grid,
+            use_cache,
+            long_recording,
+            preprocess,
+        )
+
+
+def generate_praat_score_traced(
+    audio_file_path: pathlib.Path,
+    model: LanguageModel,
+    save_text_grid: bool = False,
+    use_cache: bool = True,
+    long_recording: LongRecordingOptions | None = None,
+    preprocess: PreprocessOptions | None = None,
+) -> Tuple[PraatScore, JobTrace]:
+    """Judge the score of an audio file like `generate_praat_score`, also returning
+    the trace of the job"""
+    scores, trace = generate_praat_scores_traced(
+        audio_file_path, [model], save_text_grid, use_cache, long_recording, preprocess
+    )
+    return scores[model], trace
 
 
 def generate_praat_score(
-    audio_file_path: pathlib.Path, model: LanguageModel
+    audio_file_path: pathlib.Path,
+    model: LanguageModel,
+    save_text_grid: bool = False,
+    use_cache: bool = True,
+    long_recording: LongRecordingOptions | None = None,
+    preprocess: PreprocessOptions | None = None,
 ) -> PraatScore:
-    if model == LanguageModel.Japanese:
-        return generate_praat_score_japanese_impl(audio_file_path)
-    else:
-        raise ValueError("Unknown Language Model")
+    """Judge the score of an audio file, reusing its cached score if there is one
+
+    The cache is bypassed when the TextGrid is to be saved, since a cached score
+    comes without running the analysis that produces the TextGrid. Without a cached
+    score, the features are read from the feature store if they were extracted
+    before, and stored otherwise. `use_cache=False` analyzes the file regardless.
+
+    With `long_recording` options, recordings long enough are analyzed in windows
+    on several processes, unless the TextGrid is to be saved, which the windowed
+    analysis does not produce.
+
+    With `preprocess` options, recordings are mixed down and resampled to the
+    analysis rate first.
+
+    The job is traced and its trace passed to the registered trace sinks.
+    """
+    return generate_praat_scores(
+        audio_file_path, [model], save_text_grid, use_cache, long_recording, preprocess
+    )[model]
+
+
+@dataclass
+class _Lookup:
+    """The options that apply to a file, and its results found in the result cache
+    or the feature store"""
+
+    audio_file_path: pathlib.Path
+    long_recording: LongRecordingOptions | None
+    preprocess: PreprocessOptions | None
+    cache: ResultCache | None = None
+    store: FeatureStore | None = None
+    audio_hash: str = ""
+    version: str = ""
+    keys: Dict[LanguageModel, str] = field(default_factory=dict)
+    versions: Dict[LanguageModel, str] = field(default_factory=dict)
+    scores: Dict[LanguageModel, PraatScore] | None = None
+    features: List[float] | None = None
+
+
+def _resolve_options(
+    audio_file_path: pathlib.Path,
+    save_text_grid: bool,
+    long_recording: LongRecordingOptions | None,
+    preprocess: PreprocessOptions | None,
+) -> Tuple[LongRecordingOptions | None, PreprocessOptions | None]:
+    if long_recording is not None and (
+        save_text_grid or not long_recording.applies_to(audio_file_path)
+    ):
+        long_recording = None
+    # recordings already at the analysis rate share their results with full rate
+    if preprocess is not None and not preprocess.applies_to(
+        probe_audio(audio_file_path)
+    ):
+        preprocess = None
+    return long_recording, preprocess
+
+
+def _look_up(
+    audio_file_path: pathlib.Path,
+    models: List[LanguageModel],
+    use_cache: bool,
+    long_recording: LongRecordingOptions | None,
+    preprocess: PreprocessOptions | None,
+) -> _Lookup:
+    """Look up the scores of a file, or else its features"""
+    lookup = _Lookup(
+        audio_file_path,
+        *_resolve_options(audio_file_path, False, long_recording, preprocess),
+        cache=get_result_cache() if use_cache else None,
+        store=get_feature_store(),
+    )
+    if lookup.cache is None and lookup.store is None:
+        return lookup
+
+    lookup.version = analysis_version()
+    if lookup.long_recording is not None:
+        lookup.version = f"{lookup.version}+{lookup.long_recording.version_tag()}"
+    if lookup.preprocess is not None:
+        lookup.version = f"{lookup.version}+{lookup.preprocess.version_tag()}"
+
+    with stage("hash"):
+        lookup.audio_hash = audio_content_hash(audio_file_path)
+
+    if lookup.cache is not None:
+        # the model's coefficients are part of the version, so edits to them re-score
+        lookup.versions = {
+            model: f"{lookup.version}+{load_model(model).digest}" for model in models
+        }
+        lookup.keys = {
+            model: lookup.cache.make_key(
+                lookup.audio_hash, model.value, lookup.versions[model]
+            )
+            for model in models
+        }
+        with stage("cache"):
+            scores = {model: lookup.cache.get(lookup.keys[model]) for model in models}
+        if all(score is not None for score in scores.values()):
+            lookup.scores = scores
+            return lookup
+
+    # re-fitted or new models miss the cache, but find the features in the store
+    if lookup.store is not None and use_cache:
+        with stage("features"):
+            lookup.features = lookup.store.get(lookup.audio_hash, lookup.version)
+    return lookup
+
+
+def _analyze_looked_up(lookup: _Lookup) -> RecordingAnalysis:
+    return _analyze(
+        lookup.audio_file_path, False, lookup.long_recording, lookup.preprocess
+    )
+
+
+def _score_looked_up(
+    lookup: _Lookup,
+    models: List[LanguageModel],
+    analysis: RecordingAnalysis | None,
+) -> Dict[LanguageModel, PraatScore]:
+    """Score a file from its stored features or its analysis, and keep the results"""
+    features = lookup.features
+    if features is None:
+        features = features_from_analysis(analysis)
+        if lookup.store is not None:
+            with stage("features"):
+                lookup.store.put(
+                    lookup.audio_hash,
+                    lookup.audio_file_path,
+                    lookup.version,
+                    features,
+                    analysis.f0_formants,
+                )
+
+    scores = score_features(features, models)
+    if lookup.cache is not None:
+        with stage("cache"):
+            for model, score in scores.items():
+                lookup.cache.put(
+                    lookup.keys[model],
+                    score,
+                    lookup.audio_hash,
+                    model.value,
+                    lookup.versions[model],
+                )
+    return scores
+
+
+def _judge_with_cache(
+    audio_file_path: pathlib.Path,
+    models: List[LanguageModel],
+    save_text_grid: bool,
+    use_cache: bool,
+    long_recording: LongRecordingOptions | None,
+    preprocess: PreprocessOptions | None,
+) -> Dict[LanguageModel, PraatScore]:
+    if save_text_grid:
+        long_recording, preprocess = _resolve_options(
+            audio_file_path, save_text_grid, long_recording, preprocess
+        )
+        analysis = _analyze(audio_file_path, save_text_grid, long_recording, preprocess)
+        return score_features(features_from_analysis(analysis), models)
+
+    lookup = _look_up(audio_file_path, models, use_cache, long_recording, preprocess)
+    if lookup.scores is not None:
+        return lookup.scores
+    analysis = None if lookup.features is not None else _analyze_looked_up(lookup)
+    return _score_looked_up(lookup, models, analysis)
+
+
+def generate_praat_scores_batch_traced(
+    audio_file_paths: Sequence[pathlib.Path],
+    models: Sequence[LanguageModel] | None = None,
+    use_cache: bool = True,
+    long_recording: LongRecordingOptions | None = None,
+    preprocess: PreprocessOptions | None = None,
+) -> List[Tuple[Dict[LanguageModel, PraatScore] | None, JobTrace, Exception | None]]:
+    """Judge the scores of several audio files like `generate_praat_scores_traced`,
+    running the Praat analysis of all of them that need one at once
+
+    Files are looked up in the result cache and the feature store first, and the
+    rest are analyzed by a single run of the Praat script, whose time is split
+    evenly among their traces. Recordings analyzed in windows are analyzed on their
+    own. If the batch fails, its files are analyzed one by one, so that a file that
+    cannot be analyzed only fails itself.
+
+    Returns the scores, the trace and the error, if any, of each file.
+    """
+    models = list(LanguageModel) if models is None else list(models)
+    attributes = {"model": ",".join(model.value for model in models)}
+    traces = [JobTrace(str(path), dict(attributes)) for path in audio_file_paths]
+    scores: List[Dict[LanguageModel, PraatScore] | None] = [None] * len(traces)
+    errors: List[Exception | None] = [None] * len(traces)
+
+    lookups: Dict[int, _Lookup] = {}
+    for i, (path, trace) in enumerate(zip(audio_file_paths, traces)):
+        try:
+            with resume_job(trace):
+                lookup = _look_up(path, models, use_cache, long_recording, preprocess)
+                if lookup.scores is not None:
+                    scores[i] = lookup.scores
+                elif lookup.features is not None:
+                    scores[i] = _score_looked_up(lookup, models, None)
+                else:
+                    lookups[i] = lookup
+        except Exception as e:
+            errors[i] = e
+
+    batch = [i for i, lookup in lookups.items() if lookup.long_recording is None]
+    analyses: Dict[int, RecordingAnalysis] = {}
+    if len(batch) > 1:
+        shared = JobTrace("batch")
+        try:
+            # files the analysis rate does not reduce are staged as they are anyway
+            with resume_job(shared):
+                batch_analyses = analyze_recordings(
+                    [audio_file_paths[i] for i in batch], preprocess
+                )
+            analyses = dict(zip(batch, batch_analyses))
+        except Exception:
+            # the files of the batch are analyzed one by one below
+            pass
+        share_trace(shared, [traces[i] for i in batch])
+
+    for i, lookup in lookups.items():
+        try:
+            with resume_job(traces[i]):
+                if i in analyses:
+                    analysis = analyses[i]
+                else:
+                    analysis = _analyze_looked_up(lookup)
+                scores[i] = _score_looked_up(lookup, models, analysis)
+        except Exception as e:
+            errors[i] = e
+
+    return list(zip(scores, traces, errors))
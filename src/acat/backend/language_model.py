@@ -0,0 +1,148 @@
+"""The registry of language models
+
+A language model is a TOML file in `models/` (or in a directory listed in
+`ACAT_MODEL_DIRS`) holding the features it uses, the intercept and weights of each
+output and the rubric bands that explain its scores. The file name is the name of
+the model. Models are discovered by their file names when this module is imported,
+and each file is only parsed when its model is first used.
+"""
+
+from __future__ import annotations
+
+import enum
+import functools
+import hashlib
+import os
+import pathlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple
+
+import tomllib
+
+from acat.backend.utils import get_models_dir
+
+if TYPE_CHECKING:
+    from acat.backend.scoring import ScoringEngine, ScoringModel
+
+_MODEL_DIRS_ENV = "ACAT_MODEL_DIRS"
+
+
+def get_model_dirs() -> List[pathlib.Path]:
+    """The directories models are read from; later ones override earlier ones"""
+    extra_dirs = os.environ.get(_MODEL_DIRS_ENV, "")
+    return [
+        get_models_dir(),
+        *(pathlib.Path(path) for path in extra_dirs.split(os.pathsep) if path),
+    ]
+
+
+def _discover_models() -> Dict[str, pathlib.Path]:
+    models = {}
+    for directory in get_model_dirs():
+        if directory.is_dir():
+            for path in sorted(directory.glob("*.toml")):
+                models[path.stem] = path
+    return models
+
+
+_MODEL_FILES = _discover_models()
+
+# the members are created from the discovered files, and pickle by name like the
+# members of any other enum, so worker processes find the same models
+LanguageModel = enum.Enum(
+    "LanguageModel",
+    [(name, name) for name in _MODEL_FILES],
+    module=__name__,
+    qualname="LanguageModel",
+)
+
+
+def default_model() -> LanguageModel:
+    return next(iter(LanguageModel))
+
+
+@dataclass(frozen=True)
+class ModelDefinition:
+    """A parsed model file"""
+
+    name: str
+    description: str
+    features: Tuple[str, ...]
+    intercepts: Dict[str, float]
+    weights: Dict[str, Tuple[float, ...]]
+    # the (score band, interpretation) rows of each output
+    rubrics: Dict[str, Tuple[Tuple[str, str], ...]]
+    # identifies the content of the file, so cached scores follow edits to it
+    digest: str
+
+    def scoring_model(self) -> ScoringModel:
+        """The model as a row of weights per output over all extracted features"""
+        import numpy as np
+
+        from acat.backend.scoring import FEATURES, OUTPUTS, ScoringModel
+
+        if unknown := set(self.features) - set(FEATURES):
+            raise ValueError(f"{self.name}: unknown features {sorted(unknown)}")
+        if set(self.intercepts) != set(OUTPUTS):
+            raise ValueError(f"{self.name}: expected the outputs {list(OUTPUTS)}")
+
+        # features the model does not use get a weight of zero
+        weights = np.zeros((len(OUTPUTS), len(FEATURES)))
+        for row, output in enumerate(OUTPUTS):
+            for feature, weight in zip(self.features, self.weights[output]):
+                weights[row, FEATURES.index(feature)] = weight
+
+        return ScoringModel(
+            self.name,
+            np.array([self.intercepts[output] for output in OUTPUTS]),
+            weights,
+        )
+
+
+def _parse_model(name: str, content: bytes) -> ModelDefinition:
+    data = tomllib.loads(content.decode("utf-8"))
+    features = tuple(data["features"])
+
+    intercepts, weights = {}, {}
+    for output, coefficients in data["outputs"].items():
+        intercepts[output] = float(coefficients["intercept"])
+        weights[output] = tuple(float(w) for w in coefficients["weights"])
+        if len(weights[output]) != len(features):
+            raise ValueError(f"{name}: expected one {output} weight per feature")
+
+    rubrics = {
+        output: tuple((band["score"], band["interpretation"]) for band in bands)
+        for output, bands in data.get("rubrics", {}).items()
+    }
+
+    return ModelDefinition(
+        name,
+        data.get("description", ""),
+        features,
+        intercepts,
+        weights,
+        rubrics,
+        hashlib.sha256(content).hexdigest(),
+    )
+
+
+@functools.cache
+def load_model(model: LanguageModel) -> ModelDefinition:
+    """Parse the file of a model; raises `ValueError` if it is malformed"""
+    path = _MODEL_FILES[model.value]
+    try:
+        return _parse_model(model.value, path.read_bytes())
+    except (KeyError, TypeError, tomllib.TOMLDecodeError) as e:
+        raise ValueError(f"Invalid model file {path}: {e!r}") from e
+
+
+@functools.cache
+def _get_scoring_engine(models: Tuple[LanguageModel, ...]) -> ScoringEngine:
+    from acat.backend.scoring import ScoringEngine
+
+    return ScoringEngine([load_model(model).scoring_model() for model in models])
+
+
+def get_scoring_engine(models: Sequence[LanguageModel]) -> ScoringEngine:
+    """A scoring engine for the given models, built once per combination"""
+    return _get_scoring_engine(tuple(models))
@@ -0,0 +1,333 @@
+"""Windowed analysis of long recordings
+
+A long recording is cut into windows at pauses, the windows are analyzed in parallel
+and the partial analyses are merged into the analysis of the whole recording:
+
+- Cuts are placed in the middle of pauses, and windows only overlap by silence
+  around the cuts. Syllable nuclei are attributed to the window whose core (the part
+  between its cuts) contains them, so none is counted twice.
+- The per-syllable F0 and formant values of all windows are concatenated, so their
+  means and standard deviations are pooled over the whole recording rather than
+  averaged over windows.
+- The syllable tier intervals are shifted to recording time and the two halves of
+  each cut pause are joined again, so syllable durations are unaffected by the cuts.
+- The script does not count the silence at either end of a file as a pause, so each
+  cut adds the pause it was placed in.
+
+Syllable detection is relative to the loudest part of the analyzed sound, so the
+merged analysis can differ slightly from a whole-file analysis when the loudness
+varies a lot between windows.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import multiprocessing
+import pathlib
+import tempfile
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Iterator, List, Sequence, Tuple
+
+import numpy as np
+import parselmouth
+
+from acat.backend.audio_decode import decode_to_wav, needs_decoding, read_sound
+from acat.backend.audio_probe import probe_audio
+from acat.backend.executor import create_process_pool, default_workers
+from acat.backend.praat_score_judging_japanese import (
+    RecordingAnalysis,
+    analyze_recording,
+)
+from acat.backend.preprocess import PreprocessOptions
+from acat.backend.tracing import stage
+
+# recordings are read this many seconds at a time when looking for pauses
+_SCAN_CHUNK_SECONDS = 60.0
+
+
+@dataclass(frozen=True)
+class LongRecordingOptions:
+    """When and how long recordings are split into windows"""
+
+    # recordings shorter than this are analyzed as a whole
+    min_duration_seconds: float = 900.0
+    window_seconds: float = 300.0
+    # only pauses at least this long are cut
+    min_pause_seconds: float = 1.0
+    # silence kept on each side of a cut, at most half the pause
+    overlap_seconds: float = 0.25
+    silence_threshold_db: float = -25.0
+    jobs: int = field(default_factory=default_workers)
+
+    def applies_to(self, audio_file_path: pathlib.Path) -> bool:
+        return probe_audio(audio_file_path).duration >= self.min_duration_seconds
+
+    def version_tag(self) -> str:
+        """Identify the settings that can change the merged analysis"""
+        return (
+            f"windows({self.window_seconds},{self.min_pause_seconds},"
+            f"{self.overlap_seconds},{self.silence_threshold_db})"
+        )
+
+
+@dataclass(frozen=True)
+class Window:
+    """A part of a recording to analyze, in seconds from the start of the recording
+
+    `start` and `end` include the silence around the cuts, `core_start` and
+    `core_end` are the cuts themselves.
+    """
+
+    start: float
+    end: float
+    core_start: float
+    core_end: float
+
+
+def _open_sound(
+    audio_file_path: pathlib.Path, directory: pathlib.Path
+) -> parselmouth.Data:
+    """Open a recording as a LongSound, which reads its samples a chunk at a time
+
+    Formats Praat cannot read are first decoded by ffmpeg into a WAV file in
+    `directory`. Only if Praat cannot stream the file is it read into memory whole.
+    """
+    if needs_decoding(audio_file_path):
+        decoded_path = directory / "decoded.wav"
+        decode_to_wav(audio_file_path, decoded_path)
+        audio_file_path = decoded_path
+    try:
+        return parselmouth.praat.call("Open long sound file", str(audio_file_path))
+    except parselmouth.PraatError:
+        return read_sound(audio_file_path)
+
+
+def _extract_part(
+    sound: parselmouth.Data, start: float, end: float, preserve_times: bool
+) -> parselmouth.Sound:
+    if sound.class_name == "LongSound":
+        return parselmouth.praat.call(sound, "Extract part", start, end, preserve_times)
+    return sound.extract_part(start, end, preserve_times=preserve_times)
+
+
+def _total_duration(sound: parselmouth.Data) -> float:
+    return parselmouth.praat.call(sound, "Get total duration")
+
+
+def find_pauses(
+    sound: parselmouth.Data, options: LongRecordingOptions
+) -> List[Tuple[float, float]]:
+    """Find the pauses long enough to cut at, as (start, end) times
+
+    Silence is relative to the loudest part of the whole recording, which is read a
+    chunk at a time.
+    """
+    duration = _total_duration(sound)
+    times, values = [], []
+    for chunk_start in np.arange(0.0, duration, _SCAN_CHUNK_SECONDS):
+        chunk_end = min(chunk_start + _SCAN_CHUNK_SECONDS, duration)
+        chunk = _extract_part(sound, chunk_start, chunk_end, preserve_times=True)
+        intensity = chunk.to_intensity(minimum_pitch=100.0)
+        times.append(intensity.xs())
+        values.append(intensity.values[0])
+    times = np.concatenate(times)
+    values = np.concatenate(values)
+    if not len(values):
+        return []
+
+    silent = values < np.max(values) + options.silence_threshold_db
+    # indices where a run of silent frames starts and where it stops
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], silent.astype(int), [0]])))
+    pauses = []
+    for first, stop in zip(edges[::2], edges[1::2]):
+        start, end = times[first], times[stop - 1]
+        if end - start >= options.min_pause_seconds:
+            pauses.append((float(start), float(end)))
+    return pauses
+
+
+def plan_windows(
+    duration: float,
+    pauses: Sequence[Tuple[float, float]],
+    options: LongRecordingOptions,
+) -> List[Window]:
+    """Cut a recording into windows of about `window_seconds` in the middle of pauses
+
+    Cuts are never placed less than half a window from another cut or from either
+    end of the recording. Without a pause to cut at, a window grows until there is
+    one.
+    """
+    half_window = options.window_seconds / 2
+    cuts: List[Tuple[float, float]] = []
+    last_cut = 0.0
+    while duration - last_cut > options.window_seconds + half_window:
+        target = last_cut + options.window_seconds
+        eligible = [
+            (start, end)
+            for start, end in pauses
+            if last_cut + half_window < (start + end) / 2 < duration - half_window
+        ]
+        if not eligible:
+            break
+        cut = min(eligible, key=lambda pause: abs((pause[0] + pause[1]) / 2 - target))
+        cuts.append(cut)
+        last_cut = (cut[0] + cut[1]) / 2
+
+    points = [0.0, *((start + end) / 2 for start, end in cuts), duration]
+    padding = [
+        0.0,
+        *(min(options.overlap_seconds, (end - start) / 2) for start, end in cuts),
+        0.0,
+    ]
+    return [
+        Window(
+            points[i] - padding[i],
+            points[i + 1] + padding[i + 1],
+            points[i],
+            points[i + 1],
+        )
+        for i in range(len(points) - 1)
+    ]
+
+
+def _save_windows(
+    sound: parselmouth.Data,
+    windows: Sequence[Window],
+    directory: pathlib.Path,
+    preprocess: PreprocessOptions | None = None,
+) -> List[pathlib.Path]:
+    paths = []
+    for i, window in enumerate(windows):
+        path = directory / f"window{i:04d}.wav"
+        part = _extract_part(sound, window.start, window.end, preserve_times=False)
+        if preprocess is not None:
+            with stage("preprocess"):
+                part = preprocess.apply(part)
+        part.save(str(path), "WAV")
+        paths.append(path)
+    return paths
+
+
+def _in_core(times: np.ndarray, window: Window) -> np.ndarray:
+    return (times >= window.core_start) & (times < window.core_end)
+
+
+def _meet_at_cut(before: np.ndarray, after: np.ndarray, window: Window) -> bool:
+    """Whether the intervals before and after the cut at the start of a window are
+    the two halves of one interval"""
+    return (
+        len(before) > 0
+        and len(after) > 0
+        and np.isclose(before[-1, 1], window.core_start)
+        and np.isclose(after[0, 0], window.core_start)
+        and before[-1, 2] == after[0, 2]
+    )
+
+
+def merge_analyses(
+    windows: Sequence[Window], analyses: Sequence[RecordingAnalysis]
+) -> RecordingAnalysis:
+    """Merge the analyses of the windows of a recording into one"""
+    duration = windows[-1].core_end - windows[0].core_start
+    n_syllables = 0
+    f0_formants, nuclei, intervals = [], [], []
+
+    for window, analysis in zip(windows, analyses):
+        window_nuclei = analysis.nuclei + window.start
+        in_core = _in_core(window_nuclei, window)
+        n_syllables += np.count_nonzero(in_core)
+        nuclei.append(window_nuclei[in_core])
+        # the syllable table has a row per nucleus, unless the script left some out
+        if len(analysis.f0_formants) == len(in_core):
+            f0_formants.append(analysis.f0_formants[in_core])
+        else:
+            f0_formants.append(analysis.f0_formants)
+
+        window_intervals = analysis.intervals.copy()
+        window_intervals[:, :2] = np.clip(
+            window_intervals[:, :2] + window.start, window.core_start, window.core_end
+        )
+        window_intervals = window_intervals[
+            window_intervals[:, 1] > window_intervals[:, 0]
+        ]
+        if intervals and _meet_at_cut(intervals[-1], window_intervals, window):
+            # join the two halves of the pause the cut was placed in
+            intervals[-1][-1, 1] = window_intervals[0, 1]
+            window_intervals = window_intervals[1:]
+        intervals.append(window_intervals)
+
+    return RecordingAnalysis(
+        n_syllables / duration,
+        sum(analysis.n_pauses for analysis in analyses) + len(windows) - 1,
+        sum(analysis.n_filled_pauses for analysis in analyses),
+        np.concatenate(f0_formants),
+        np.concatenate(nuclei),
+        np.concatenate(intervals),
+    )
+
+
+_window_executor: contextvars.ContextVar[Executor | None] = contextvars.ContextVar(
+    "acat_window_executor", default=None
+)
+
+
+@contextlib.contextmanager
+def window_executor(executor: Executor) -> Iterator[None]:
+    """Analyze the windows of the long recordings analyzed in this context on
+    `executor`, e.g. the process pool that analyzes the other files, instead of a
+    pool of their own"""
+    token = _window_executor.set(executor)
+    try:
+        yield
+    finally:
+        _window_executor.reset(token)
+
+
+def _analyze_windows(
+    paths: List[pathlib.Path], options: LongRecordingOptions
+) -> List[RecordingAnalysis]:
+    executor = _window_executor.get()
+    if executor is None and multiprocessing.parent_process() is not None:
+        # a worker of a pool already, whose other workers keep the CPUs busy, so
+        # a pool of its own would only start up to jobs * jobs processes. Each
+        # analysis records its own stages, so "windows" would count them twice
+        return [analyze_recording(path) for path in paths]
+    # the other processes do not trace their stages, so only the wait is recorded
+    with stage("windows"):
+        if executor is not None:
+            return list(executor.map(analyze_recording, paths))
+        with create_process_pool(min(options.jobs, len(paths))) as pool:
+            return list(pool.map(analyze_recording, paths))
+
+
+def analyze_long_recording(
+    audio_file_path: pathlib.Path,
+    options: LongRecordingOptions,
+    preprocess: PreprocessOptions | None = None,
+) -> RecordingAnalysis:
+    """Analyze a recording in windows on a process pool and merge the results
+
+    The windows are analyzed on the executor set by `window_executor`, or else on a
+    pool of `options.jobs` processes. Inside a worker process, they are analyzed
+    one after another.
+
+    With `preprocess`, each window is mixed down and resampled before it is saved.
+    """
+    with tempfile.TemporaryDirectory(prefix="acat-windows-") as directory:
+        with stage("decode"):
+            sound = _open_sound(audio_file_path, pathlib.Path(directory))
+            windows = plan_windows(
+                _total_duration(sound), find_pauses(sound, options), options
+            )
+        if len(windows) == 1:
+            del sound
+            return analyze_recording(audio_file_path, preprocess=preprocess)
+
+        with stage("decode"):
+            paths = _save_windows(sound, windows, pathlib.Path(directory), preprocess)
+            del sound
+        analyses = _analyze_windows(paths, options)
+
+    return merge_analyses(windows, analyses)
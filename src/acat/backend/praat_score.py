@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import pathlib
+from dataclasses import dataclass
+from typing import Iterable, List
+
+EXPORT_COLUMNS = [
+    "File Name",
+    "File Path",
+    "Comprehensibility Score",
+    "Nativelikeness Score",
+    "speechrate",
+    "pauses",
+    "rangef0",
+    "sdsylldur",
+    "coeff1",
+    "coeff2",
+    "coeff3",
+]
+
+
+@dataclass
+class PraatScore:
+    """Scores generated from Praat analysis that will be displayed and export as CSV"""
+
+    comprehensibility: float
+    nativelikeness: float
+    speechrate: float
+    pauses: float
+    rangef0: float
+    sdsylldur: float
+    coeff1: float
+    coeff2: float
+    coeff3: float
+
+    @property
+    def all_data(self) -> Iterable[float]:
+        """Get all data conveniently as a iterable that can be serialized easily"""
+        return [
+            self.comprehensibility,
+            self.nativelikeness,
+            self.speechrate,
+            self.pauses,
+            self.rangef0,
+            self.sdsylldur,
+            self.coeff1,
+            self.coeff2,
+            self.coeff3,
+        ]
+
+    @staticmethod
+    def all_data_or_none(obj: PraatScore | None) -> Iterable[float | None]:
+        """get all data as an iterable or an iterable of None"""
+        if obj is None:
+            return [None for _ in range(9)]
+        return obj.all_data
+
+
+def export_row(path: pathlib.Path, score: PraatScore | None) -> List:
+    """Make a row of the exported results, laid out as `EXPORT_COLUMNS`"""
+    return [path.name, str(path), *PraatScore.all_data_or_none(score)]
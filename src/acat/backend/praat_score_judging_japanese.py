@@ -1,196 +1,393 @@
-import io
+import contextlib
+import functools
+import hashlib
+import os
 import pathlib
+import shutil
+import tempfile
+import warnings
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Tuple
+from typing import Dict, Iterator, List, Sequence, Tuple
 
 import numpy as np
-import pandas as pd
 import parselmouth
-from praatio import textgrid
 
+from acat.backend.audio_decode import (
+    DECODER_VERSION,
+    decode_to_wav,
+    needs_decoding,
+    read_sound,
+)
+from acat.backend.audio_probe import probe_audio
+from acat.backend.praat_table import extract_rows, table_column_labels, table_columns
+from acat.backend.preprocess import PreprocessOptions
+from acat.backend.scoring import FEATURES
+from acat.backend.tracing import stage
 from acat.backend.utils import get_praat_func_dir
-from acat.ui.audio_file import PraatScore
 
 _ANALYSIS_PRAAT_SCRIPT = get_praat_func_dir() / "SyllableNucleiv3.praat"
 _ANALYSIS_PRAAT_SCRIPT_STR = str(_ANALYSIS_PRAAT_SCRIPT.absolute())
-
-with open(_ANALYSIS_PRAAT_SCRIPT_STR, "rb") as f:
-    f.read()
-
-
-def _generate_file_spec(audio_file_path: Path) -> str:
-    # TODO: change this to a more restrictive file spec
-    return f"{str(audio_file_path.absolute())}*"
+_SUMMARY_TABLE_COLUMN = "speechrate(nsyll/dur)"
+_SUMMARY_COLUMNS = [_SUMMARY_TABLE_COLUMN, "npause", "nrFP"]
+_STAGED_SUFFIX = ".wav"
+
+# pre-processing, silence threshold (dB), minimum dip near peak (dB),
+# minimum pause duration (s), detect filled pauses, language,
+# filled pause threshold, data output, data collection type
+_ANALYSIS_PARAMETERS = (
+    "None",
+    -25,
+    2,
+    0.4,
+    True,
+    "English",
+    1,
+    "Table",
+    "OverWriteData",
+)
+
+
+def _generate_file_spec(staging_dir: Path) -> str:
+    """Match the recordings staged in a staging directory, and nothing else
+
+    Praat lists files by a wildcard and cannot match a path exactly, but the
+    staging directory is private and only holds the staged recordings, all of them
+    WAV files, and the TextGrids the script writes next to them.
+    """
+    return str(staging_dir.absolute() / f"*{_STAGED_SUFFIX}")
 
 
 def _get_text_grid_path(audio_file_path: Path) -> Path:
     return audio_file_path.absolute().with_suffix(".auto.TextGrid")
 
 
-def _run_praat_script(audio_file_path: Path) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    audio_file_path_str = _generate_file_spec(audio_file_path)
-    tab1 = parselmouth.praat.run_file(
-        _ANALYSIS_PRAAT_SCRIPT_STR,
-        audio_file_path_str,
-        "None",
-        -25,
-        2,
-        0.4,
-        True,
-        "English",
-        1,
-        "Table",
-        "OverWriteData",
-        True,
-    )
-
-    tab2 = parselmouth.praat.run_file(
-        _ANALYSIS_PRAAT_SCRIPT_STR,
-        audio_file_path_str,
-        "None",
-        -25,
-        2,
-        0.4,
-        True,
-        "English",
-        1,
-        "Table",
-        "OverWriteData",
-        False,
-    )
-
-    return pd.read_table(
-        io.StringIO(parselmouth.praat.call(tab1[2], "List", False))
-    ), pd.read_table(io.StringIO(parselmouth.praat.call(tab2[0], "List", False)))
-
-
-def _analysis_from_praat_script(
-    audio_file_path: Path,
-) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    true_data, false_data = _run_praat_script(audio_file_path)
-
-    selected_cols = ["type", "F0", "F1", "F2", "F3"]
-    true_data = true_data[selected_cols]
-
+def _stage_sound(sound: parselmouth.Sound, staged_path: Path) -> None:
+    parselmouth.praat.call(sound, "Save as 32-bit WAV file", str(staged_path))
+
+
+def _stage_recording(
+    audio_file_path: Path, staged_path: Path, preprocess: PreprocessOptions | None
+) -> None:
+    source_path = audio_file_path
+    if needs_decoding(audio_file_path):
+        # out of the staging directory itself, so that the script does not list it
+        source_path = staged_path.parent / "decoded" / staged_path.name
+        source_path.parent.mkdir(exist_ok=True)
+        with stage("decode"):
+            decode_to_wav(audio_file_path, source_path)
+
+    if preprocess is not None and preprocess.applies_to(probe_audio(source_path)):
+        with stage("decode"):
+            sound = read_sound(source_path)
+        with stage("preprocess"):
+            sound = preprocess.apply(sound)
+        with stage("decode"):
+            _stage_sound(sound, staged_path)
+        return
+
+    if source_path != audio_file_path:
+        source_path.rename(staged_path)
+        return
+    try:
+        os.symlink(audio_file_path.absolute(), staged_path)
+    except OSError:
+        shutil.copyfile(audio_file_path, staged_path)
+
+
+@contextlib.contextmanager
+def _staged_audio(
+    audio_file_paths: Sequence[Path], preprocess: PreprocessOptions | None = None
+) -> Iterator[List[Path]]:
+    """Expose the audio files inside a private temporary directory
+
+    The Praat script writes its TextGrid next to the audio it analyzes, so pointing it
+    at a staged link keeps those writes out of the audio directory, which may be
+    read-only or on a network mount. The link falls back to a copy on platforms
+    where symlinks are not available.
+
+    Files in formats Praat cannot read are decoded by ffmpeg instead, if it is
+    available, into a WAV file in the staging directory. Files that `preprocess`
+    reduces are staged as a 32-bit WAV file, after they are reduced.
+
+    The files are staged under numbered names, which sort like the given files, so
+    that the script lists them in that order.
+    """
+    with tempfile.TemporaryDirectory(prefix="acat-") as staging_dir:
+        staged_paths = [
+            Path(staging_dir) / f"{i:06d}{_STAGED_SUFFIX}"
+            for i in range(len(audio_file_paths))
+        ]
+        for audio_file_path, staged_path in zip(audio_file_paths, staged_paths):
+            _stage_recording(audio_file_path, staged_path, preprocess)
+        yield staged_paths
+
+
+@functools.cache
+def analysis_version() -> str:
+    """Identify the analysis by the content of the Praat script and its parameters"""
+    digest = hashlib.sha256()
+    with open(_ANALYSIS_PRAAT_SCRIPT_STR, "rb") as f:
+        digest.update(f.read())
+    digest.update(repr(_ANALYSIS_PARAMETERS).encode())
+    digest.update(DECODER_VERSION.encode())
+    return digest.hexdigest()
+
+
+def _praat_script_args(staging_dir: Path, keep_objects: bool) -> List:
+    return [_generate_file_spec(staging_dir), *_ANALYSIS_PARAMETERS, keep_objects]
+
+
+def _find_summary_table(objects: List[parselmouth.Data]) -> parselmouth.Data | None:
+    """Find the summary table (speechrate, npause, nrFP) among the objects kept by
+    the script"""
+    for obj in objects:
+        if obj.class_name != "Table":
+            continue
+        if _SUMMARY_TABLE_COLUMN in table_column_labels(obj):
+            return obj
+    return None
+
+
+def _find_text_grid(
+    objects: List[parselmouth.Data], audio_file_path: Path
+) -> parselmouth.TextGrid:
+    """Find the TextGrid among the objects kept by the script
+
+    Falls back to reading the TextGrid the script saved next to the (staged) audio.
+    """
+    for obj in objects:
+        if obj.class_name == "TextGrid":
+            return obj
+    return parselmouth.read(str(_get_text_grid_path(audio_file_path)))
+
+
+def _split_by_recording(
+    objects: List[parselmouth.Data], n_recordings: int
+) -> List[List[parselmouth.Data]]:
+    """Split the objects kept by the script into those of each recording
+
+    The objects of a recording follow its Sound, in the order the recordings were
+    listed. The objects of a single recording are taken as they are.
+    """
+    if n_recordings == 1:
+        return [objects]
+
+    groups: List[List[parselmouth.Data]] = []
+    for obj in objects:
+        if obj.class_name == "Sound":
+            groups.append([])
+        if groups:
+            groups[-1].append(obj)
+    if len(groups) != n_recordings:
+        raise RuntimeError(
+            f"The Praat script kept the objects of {len(groups)} recordings, "
+            f"expected {n_recordings}"
+        )
+    return groups
+
+
+def _run_praat_script(
+    staged_paths: List[Path],
+) -> Tuple[List[Tuple[parselmouth.Data, parselmouth.TextGrid]], parselmouth.Data]:
+    """Run the syllable nuclei script on the staged recordings and return the
+    per-syllable table and the TextGrid of each of them, and the summary table
+
+    The script is run once with its objects kept, which leaves both the per-syllable
+    tables and the summary table in the object list. Only if the summary table cannot
+    be found among the kept objects is the script run a second time without keeping
+    objects, which is how the summary table used to be obtained. Either way, every
+    staged recording is analyzed in the same run.
+    """
+    staging_dir = staged_paths[0].parent
+    with stage("praat_syllable_pass"):
+        objects = parselmouth.praat.run_file(
+            _ANALYSIS_PRAAT_SCRIPT_STR, *_praat_script_args(staging_dir, True)
+        )
+        outputs = [
+            (group[2], _find_text_grid(group, staged_path))
+            for group, staged_path in zip(
+                _split_by_recording(objects, len(staged_paths)), staged_paths
+            )
+        ]
+
+    with stage("praat_summary_pass"):
+        summary_table = _find_summary_table(objects)
+        if summary_table is None:
+            summary_table = parselmouth.praat.run_file(
+                _ANALYSIS_PRAAT_SCRIPT_STR, *_praat_script_args(staging_dir, False)
+            )[0]
+
+    return outputs, summary_table
+
+
+def _summary_values(summary_table: parselmouth.Data, n_recordings: int) -> np.ndarray:
+    """The speech rate and numbers of pauses and filled pauses of each recording
+
+    The summary table has a row per recording, in the order they were listed.
+    """
+    values = table_columns(summary_table, _SUMMARY_COLUMNS)
+    if len(values) < n_recordings:
+        raise RuntimeError(
+            f"The Praat script summarized {len(values)} recordings, "
+            f"expected {n_recordings}"
+        )
+    return values[:n_recordings]
+
+
+def _syllable_statistics(f0_formants: np.ndarray) -> Dict[str, float]:
+    """Compute the F0 and formant features from a (n_syllables x 4) F0/F1/F2/F3 array"""
+    with warnings.catch_warnings():
+        # files without any voiced syllable give NaN features, as they used to
+        warnings.simplefilter("ignore", RuntimeWarning)
+        means = np.nanmean(f0_formants, axis=0)
+        sds = np.nanstd(f0_formants, axis=0, ddof=1)
+        min_f0 = np.nanmin(f0_formants[:, 0]) if len(f0_formants) else np.nan
+        max_f0 = np.nanmax(f0_formants[:, 0]) if len(f0_formants) else np.nan
+        coeffs = np.log10(sds[1:] / means[1:])
+
+    return {
+        "rangef0": max_f0 - min_f0,
+        "coeff1": coeffs[0],
+        "coeff2": coeffs[1],
+        "coeff3": coeffs[2],
+    }
+
+
+@dataclass
+class RecordingAnalysis:
+    """What the Praat analysis measured in a recording, before it is reduced to features
+
+    `f0_formants` holds the F0, F1, F2 and F3 of each syllable, `nuclei` the time of
+    each syllable nucleus, and `intervals` the start time, end time and syllable flag
+    of each interval of the syllable tier.
+    """
+
+    speechrate: float
+    n_pauses: float
+    n_filled_pauses: float
+    f0_formants: np.ndarray
+    nuclei: np.ndarray
+    intervals: np.ndarray
+
+
+def _nuclei_times(text_grid: parselmouth.TextGrid) -> np.ndarray:
+    # syllable nuclei are the points of the second tier
+    tier = parselmouth.praat.call(text_grid, "Extract one tier", 2)
+    points = parselmouth.praat.call(tier, "Down to Table", False, 17, False, False)
+    return table_columns(points, ["tmin"])[:, 0]
+
+
+def _syllable_intervals(text_grid: parselmouth.TextGrid) -> np.ndarray:
     # TODO: this is a temporary fix. To be confirmed this is the right way to do it.
-    true_data = true_data[true_data["type"] == "?"]  # syll are labeled as ?
-
-    true_data.replace("--undefined--", np.nan, inplace=True)
-    true_data = true_data.astype({"F0": float, "F1": float, "F2": float, "F3": float})
-
-    true_data_sub = pd.DataFrame(
-        {
-            "meanf0": true_data["F0"].mean(skipna=True),
-            "meanf1": true_data["F1"].mean(skipna=True),
-            "meanf2": true_data["F2"].mean(skipna=True),
-            "meanf3": true_data["F3"].mean(skipna=True),
-            "sdf0": true_data["F0"].std(skipna=True),
-            "sdf1": true_data["F1"].std(skipna=True),
-            "sdf2": true_data["F2"].std(skipna=True),
-            "sdf3": true_data["F3"].std(skipna=True),
-            "minf0": true_data["F0"].min(skipna=True),
-            "maxf0": true_data["F0"].max(skipna=True),
-        },
-        index=[0],
+    # syll are labeled as "" or "syll" on the third tier
+    tier = parselmouth.praat.call(text_grid, "Extract one tier", 3)
+    intervals = parselmouth.praat.call(tier, "Down to Table", False, 17, False, True)
+    parselmouth.praat.call(intervals, "Append column", "syll")
+    parselmouth.praat.call(
+        intervals,
+        "Formula",
+        "syll",
+        'if self$["text"] = "" or self$["text"] = "syll" then 1 else 0 fi',
     )
 
-    true_data_sub["rangef0"] = true_data_sub["maxf0"] - true_data_sub["minf0"]
-    true_data_sub["coeff1"] = np.log10(true_data_sub["sdf1"] / true_data_sub["meanf1"])
-    true_data_sub["coeff2"] = np.log10(true_data_sub["sdf2"] / true_data_sub["meanf2"])
-    true_data_sub["coeff3"] = np.log10(true_data_sub["sdf3"] / true_data_sub["meanf3"])
-    true_data_sub = true_data_sub[["rangef0", "coeff1", "coeff2", "coeff3"]]
-
-    false_data.columns = false_data.columns.str.strip()
-    false_data = false_data.rename(columns={"speechrate(nsyll/dur)": "speechrate"})
-    false_data["pauses"] = false_data["npause"] + false_data["nrFP"]
-    false_data = false_data[["speechrate", "pauses"]]
-
-    return true_data_sub, false_data
-
+    return table_columns(intervals, ["tmin", "tmax", "syll"])
 
-def _analyze_text_grid(text_grid_path: pathlib.Path) -> pd.DataFrame:
-    text_grid_path_str = str(text_grid_path.absolute())
 
+def _recording_analysis(
+    syllable_table: parselmouth.Data,
+    summary: np.ndarray,
+    text_grid: parselmouth.TextGrid,
+) -> RecordingAnalysis:
     # TODO: this is a temporary fix. To be confirmed this is the right way to do it.
-    # syll are labeled as ""
-    tg = textgrid.openTextgrid(text_grid_path_str, includeEmptyIntervals=True)
-
-    tier = tg.getTier(tg.tierNames[2])
-
-    start_times = []
-    end_times = []
-    labels = []
-
-    for interval in tier.entries:
-        start_times.append(interval[0])
-        end_times.append(interval[1])
-        labels.append(interval[2])
-
-    textgrid_df = pd.DataFrame(
-        np.column_stack(
-            [start_times, end_times, labels, np.subtract(end_times, start_times)]
-        ),
-        columns=["start", "stop", "type", "diff"],
+    # syll are labeled as ?, which is how Praat lists an empty label
+    syllables = extract_rows(
+        syllable_table, 'self$["type"] = "" or self$["type"] = "?"'
     )
-    textgrid_df = textgrid_df.astype({"start": float, "stop": float, "diff": float})
-
-    # TODO: this is a temporary fix. To be confirmed this is the right way to do it.
-    textgrid_df = textgrid_df[
-        (textgrid_df["type"] == "syll") | (textgrid_df["type"] == "")
-    ]  # syll are labeled as ""
-    textgrid_df.replace("--undefined--", np.nan, inplace=True)
-
-    df_sub = pd.DataFrame(
-        {"sdsylldur": np.log10(textgrid_df["diff"].std(skipna=True))}, index=[0]
+    speechrate, n_pauses, n_filled_pauses = summary
+
+    return RecordingAnalysis(
+        speechrate,
+        n_pauses,
+        n_filled_pauses,
+        table_columns(syllables, ["F0", "F1", "F2", "F3"]),
+        _nuclei_times(text_grid),
+        _syllable_intervals(text_grid),
     )
 
-    return df_sub
 
-
-def generate_praat_score_japanese_impl(audio_file_path: pathlib.Path) -> PraatScore:
-    df1, df2 = _analysis_from_praat_script(audio_file_path)
-    df3 = _analyze_text_grid(_get_text_grid_path(audio_file_path))
-    final = pd.concat([df2, df3, df1], axis=1)
-
-    comp_avg = (
-        2.138
-        + (2.701 * final["speechrate"])
-        + (0.015 * final["pauses"])
-        + (-0.020 * final["rangef0"])
-        + (3.821 * final["sdsylldur"])
-        + (-1.414 * final["coeff1"])
-        + (-5.549 * final["coeff2"])
-        + (3.228 * final["coeff3"])
-    )
-    comp_score = comp_avg.iloc[0]
-
-    native_avg = (
-        -0.537
-        + (2.654 * final["speechrate"])
-        + (-0.001 * final["pauses"])
-        + (-0.019 * final["rangef0"])
-        + (3.170 * final["sdsylldur"])
-        + (-0.622 * final["coeff1"])
-        + (-8.016 * final["coeff2"])
-        + (3.575 * final["coeff3"])
-    )
-    native_score = native_avg.iloc[0]
-
-    partial_data = map(
-        lambda x: x[0],
-        [
-            final["speechrate"],
-            final["pauses"],
-            final["rangef0"],
-            final["sdsylldur"],
-            final["coeff1"],
-            final["coeff2"],
-            final["coeff3"],
-        ],
-    )
-
-    return PraatScore(
-        comp_score,
-        native_score,
-        *partial_data,
-    )
+def analyze_recording(
+    audio_file_path: pathlib.Path,
+    save_text_grid: bool = False,
+    preprocess: PreprocessOptions | None = None,
+) -> RecordingAnalysis:
+    """Run the Praat analysis on an audio file
+
+    The analysis runs on a staged link to the audio, so nothing is written next to
+    the audio file unless `save_text_grid` asks for the TextGrid to be saved there.
+    With `preprocess`, the audio is mixed down and resampled before the analysis.
+    """
+    with _staged_audio([audio_file_path], preprocess) as staged_paths:
+        outputs, summary_table = _run_praat_script(staged_paths)
+    ((syllable_table, text_grid),) = outputs
+
+    if save_text_grid:
+        text_grid.save(str(_get_text_grid_path(audio_file_path)))
+
+    with stage("tables"):
+        summary = _summary_values(summary_table, 1)[0]
+        return _recording_analysis(syllable_table, summary, text_grid)
+
+
+def analyze_recordings(
+    audio_file_paths: Sequence[pathlib.Path],
+    preprocess: PreprocessOptions | None = None,
+) -> List[RecordingAnalysis]:
+    """Run the Praat analysis on several audio files in a single run of the script
+
+    Analyzing a batch of recordings in one run pays for starting the script once,
+    which matters for short recordings. The tables of the run are split back into
+    the analysis of each file. If any file cannot be analyzed, the whole batch fails.
+    """
+    with _staged_audio(audio_file_paths, preprocess) as staged_paths:
+        outputs, summary_table = _run_praat_script(staged_paths)
+
+    with stage("tables"):
+        summaries = _summary_values(summary_table, len(audio_file_paths))
+        return [
+            _recording_analysis(syllable_table, summary, text_grid)
+            for (syllable_table, text_grid), summary in zip(outputs, summaries)
+        ]
+
+
+def _analyze_text_grid(intervals: np.ndarray) -> Dict[str, float]:
+    syllables = intervals[intervals[:, 2] == 1]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        sdsylldur = np.log10(np.nanstd(syllables[:, 1] - syllables[:, 0], ddof=1))
+
+    return {"sdsylldur": sdsylldur}
+
+
+def features_from_analysis(analysis: RecordingAnalysis) -> List[float]:
+    """Reduce an analysis to its features, ordered as `scoring.FEATURES`"""
+    with stage("text_grid"):
+        text_grid_features = _analyze_text_grid(analysis.intervals)
+    with stage("syllable_statistics"):
+        syllable_features = _syllable_statistics(analysis.f0_formants)
+
+    features = {
+        "speechrate": analysis.speechrate,
+        "pauses": analysis.n_pauses + analysis.n_filled_pauses,
+        **text_grid_features,
+        **syllable_features,
+    }
+
+    return [features[feature] for feature in FEATURES]
+
+
+def extract_features(
+    audio_file_path: pathlib.Path, save_text_grid: bool = False
+) -> List[float]:
+    """Extract the features of an audio file, ordered as `scoring.FEATURES`"""
+    return features_from_analysis(analyze_recording(audio_file_path, save_text_grid))
@@ -0,0 +1,36 @@
+"""Numeric access to Praat Table objects
+
+Praat tables are converted to a Praat Matrix, whose values parselmouth exposes as a
+NumPy array without copying. This avoids listing tables as text and parsing the
+text back. Cells that are undefined or not numeric become NaN.
+"""
+
+from __future__ import annotations
+
+from typing import List, Sequence
+
+import numpy as np
+import parselmouth
+
+
+def table_column_labels(table: parselmouth.Data) -> List[str]:
+    n_columns = parselmouth.praat.call(table, "Get number of columns")
+    return [
+        parselmouth.praat.call(table, "Get column label", i).strip()
+        for i in range(1, n_columns + 1)
+    ]
+
+
+def extract_rows(table: parselmouth.Data, formula: str) -> parselmouth.Data:
+    """Extract the rows of a table for which a Praat formula holds"""
+    return parselmouth.praat.call(table, "Extract rows where", formula)
+
+
+def table_columns(table: parselmouth.Data, columns: Sequence[str]) -> np.ndarray:
+    """Read columns of a table as an (n_rows x n_columns) array of floats
+
+    Columns are looked up by their label, ignoring surrounding whitespace.
+    """
+    labels = table_column_labels(table)
+    values = parselmouth.praat.call(table, "Down to Matrix").values
+    return values[:, [labels.index(column) for column in columns]]
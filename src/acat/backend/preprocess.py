@@ -0,0 +1,163 @@
+"""Preprocessing recordings down to what the analysis needs
+
+The syllable nuclei script measures intensity, pitch and formants up to about
+5.5 kHz, while recordings often arrive as 44.1 or 48 kHz stereo. Mixing them down
+to mono and resampling them to an analysis rate before the script runs saves most
+of the samples Praat would otherwise go through. It changes the features slightly,
+so it is optional, and `compare_preprocessing` reports by how much on a sample of
+recordings.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import pathlib
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple
+
+import parselmouth
+
+from acat.backend.audio_probe import AudioMetadata
+
+if TYPE_CHECKING:
+    from acat.backend.language_model import LanguageModel
+
+_ANALYSIS_RATE_ENV = "ACAT_ANALYSIS_RATE"
+# twice the highest formant ceiling of the script, below which formants are lost
+MIN_ANALYSIS_RATE = 11025
+
+
+@dataclass(frozen=True)
+class PreprocessOptions:
+    """How recordings are reduced before they are analyzed"""
+
+    # recordings sampled faster than this are resampled to it
+    sample_rate: int = 16000
+    mono: bool = True
+
+    def __post_init__(self) -> None:
+        if self.sample_rate < MIN_ANALYSIS_RATE:
+            raise ValueError(
+                f"The analysis rate must be at least {MIN_ANALYSIS_RATE} Hz, "
+                "or the higher formants are lost"
+            )
+
+    @classmethod
+    def from_env(cls) -> PreprocessOptions | None:
+        """Read the analysis rate from `ACAT_ANALYSIS_RATE`; `None` if it is not set"""
+        if sample_rate := os.environ.get(_ANALYSIS_RATE_ENV):
+            return cls(int(sample_rate))
+        return None
+
+    def applies_to(self, metadata: AudioMetadata) -> bool:
+        return (self.mono and metadata.channels > 1) or (
+            metadata.sample_rate > self.sample_rate
+        )
+
+    def apply(self, sound: parselmouth.Sound) -> parselmouth.Sound:
+        if self.mono and sound.n_channels > 1:
+            sound = sound.convert_to_mono()
+        if sound.sampling_frequency > self.sample_rate:
+            sound = sound.resample(self.sample_rate)
+        return sound
+
+    def version_tag(self) -> str:
+        """Identify the settings that can change the analysis"""
+        return f"preprocess({self.sample_rate},{'mono' if self.mono else 'all'})"
+
+
+@dataclass
+class FileComparison:
+    """The features and scores of a recording analyzed at full rate and preprocessed"""
+
+    path: pathlib.Path
+    full: List[float]
+    preprocessed: List[float]
+    full_seconds: float
+    preprocessed_seconds: float
+    # the (full, preprocessed) scores of each model and output
+    scores: Dict[str, Tuple[float, float]] = field(default_factory=dict)
+
+
+def _compare_file(
+    audio_file_path: pathlib.Path,
+    options: PreprocessOptions,
+    models: Sequence[LanguageModel],
+) -> FileComparison:
+    from acat.backend.judge_score import score_features
+    from acat.backend.praat_score_judging_japanese import (
+        analyze_recording,
+        features_from_analysis,
+    )
+
+    features, seconds = [], []
+    for preprocess in (None, options):
+        start = time.perf_counter()
+        analysis = analyze_recording(audio_file_path, preprocess=preprocess)
+        seconds.append(time.perf_counter() - start)
+        features.append(features_from_analysis(analysis))
+
+    comparison = FileComparison(audio_file_path, *features, *seconds)
+    full_scores = score_features(comparison.full, models)
+    preprocessed_scores = score_features(comparison.preprocessed, models)
+    for model in models:
+        for output in ("comprehensibility", "nativelikeness"):
+            comparison.scores[f"{model.value} {output}"] = (
+                getattr(full_scores[model], output),
+                getattr(preprocessed_scores[model], output),
+            )
+    return comparison
+
+
+def compare_preprocessing(
+    files: Sequence[pathlib.Path],
+    options: PreprocessOptions,
+    models: Sequence[LanguageModel],
+    jobs: int,
+) -> List[FileComparison]:
+    """Analyze each file at full rate and preprocessed, on a process pool"""
+    from acat.backend.executor import create_process_pool
+
+    models = list(models)
+    with create_process_pool(jobs) as executor:
+        futures = [
+            executor.submit(_compare_file, path, options, models) for path in files
+        ]
+        return [future.result() for future in futures]
+
+
+def summarize_comparisons(comparisons: Sequence[FileComparison]) -> Dict[str, Dict]:
+    """The mean and largest absolute difference of each feature and score, and the
+    speedup of the analysis"""
+    from acat.backend.scoring import FEATURES
+
+    differences: Dict[str, List[float]] = {}
+    for comparison in comparisons:
+        pairs = [
+            *zip(FEATURES, zip(comparison.full, comparison.preprocessed)),
+            *comparison.scores.items(),
+        ]
+        for name, (full, preprocessed) in pairs:
+            differences.setdefault(name, []).append(abs(preprocessed - full))
+
+    # features that are undefined in a recording, e.g. without voiced syllables,
+    # are left out
+    summary = {}
+    for name, values in differences.items():
+        values = [value for value in values if not math.isnan(value)]
+        summary[name] = {
+            "files": len(values),
+            "mean_abs_diff": statistics.fmean(values) if values else math.nan,
+            "max_abs_diff": max(values, default=math.nan),
+        }
+    full_seconds = sum(comparison.full_seconds for comparison in comparisons)
+    preprocessed_seconds = sum(c.preprocessed_seconds for c in comparisons)
+    summary["analysis"] = {
+        "full_seconds": full_seconds,
+        "preprocessed_seconds": preprocessed_seconds,
+        "speedup": full_seconds / preprocessed_seconds if preprocessed_seconds else 0,
+    }
+    return summary
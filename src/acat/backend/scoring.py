@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Sequence, Tuple
+
+import numpy as np
+
+FEATURES: Tuple[str, ...] = (
+    "speechrate",
+    "pauses",
+    "rangef0",
+    "sdsylldur",
+    "coeff1",
+    "coeff2",
+    "coeff3",
+)
+OUTPUTS: Tuple[str, ...] = ("comprehensibility", "nativelikeness")
+
+
+@dataclass(frozen=True)
+class ScoringModel:
+    """The linear regression of a language model, one row of weights per output
+
+    Models are defined in files, see `acat.backend.language_model`.
+    """
+
+    name: str
+    intercepts: np.ndarray
+    weights: np.ndarray
+
+    def __post_init__(self) -> None:
+        if self.intercepts.shape != (len(OUTPUTS),):
+            raise ValueError(f"{self.name}: expected one intercept per output")
+        if self.weights.shape != (len(OUTPUTS), len(FEATURES)):
+            raise ValueError(f"{self.name}: expected one weight per output and feature")
+
+
+class ScoringEngine:
+    """Scores feature vectors with several models at once
+
+    The weights of all models are stacked into one coefficient matrix, so scoring
+    any number of files against every model is a single matrix multiplication.
+    """
+
+    def __init__(self, models: Sequence[ScoringModel]) -> None:
+        self.model_names = [model.name for model in models]
+        self._intercepts = np.concatenate([model.intercepts for model in models])
+        self._weights = np.concatenate([model.weights for model in models])
+
+    def score(self, features: np.ndarray) -> np.ndarray:
+        """Score an (n_files x n_features) matrix
+
+        Returns an (n_files x n_models x n_outputs) array.
+        """
+        features = np.atleast_2d(np.asarray(features, dtype=float))
+        if features.shape[1] != len(FEATURES):
+            raise ValueError(f"Expected {len(FEATURES)} features per file")
+
+        scores = features @ self._weights.T + self._intercepts
+        return scores.reshape(len(features), len(self.model_names), len(OUTPUTS))
+
+    def score_model(self, model_name: str, features: np.ndarray) -> np.ndarray:
+        """Score an (n_files x n_features) matrix with one model only
+
+        Returns an (n_files x n_outputs) array.
+        """
+        return self.score(features)[:, self.model_names.index(model_name)]
@@ -0,0 +1,563 @@
+"""A local HTTP service scoring audio files for other tools
+
+The service listens on localhost only and speaks just enough HTTP/1.1 for scripts
+and load testers, without dependencies beyond asyncio:
+
+- `POST /score` scores a file. The body is either JSON naming a file on this
+  machine, `{"path": "...", "model": "Japanese", "async": false}`, or the audio
+  itself, with the model, `async` and a file `name` in the query string. Models
+  default to the default model, and `"all"` scores every model. A synchronous
+  request answers with the scores and features, an asynchronous one with a job
+  ID to poll.
+- `GET /jobs/{id}` reports the state of a job, and its result once done.
+- `GET /health` tells whether the workers are warmed up yet.
+- `GET /metrics` reports the queue depth, latency percentiles and how busy the
+  workers were.
+
+Jobs run on a process pool whose workers are started and warmed up as the service
+starts listening, and replaced by fresh ones every `ACAT_WORKER_MAX_JOBS` jobs.
+Requests that arrive while the workers warm up wait in the queue.
+
+At most one batch of jobs per worker is handed to the pool, so the other jobs wait
+in the queue of the service, where they are counted. When a worker frees up, it
+takes the next queued job together with further queued jobs for the same models,
+as many as the queue holds per worker and at most `max_batch_size`, and analyzes
+them with a single run of the Praat script. A lightly loaded service thus analyzes
+each file on its own, while a busy one saves starting the script for every file.
+Requests for a file and models that are already queued or running join that job.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import dataclasses
+import hashlib
+import itertools
+import json
+import math
+import os
+import pathlib
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Deque, Dict, List, Sequence, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from acat.backend.audio_probe import AUDIO_EXTENSIONS
+from acat.backend.executor import ExecutorConfig, RecyclingProcessPool, warm_up_pool
+from acat.backend.language_model import LanguageModel, default_model
+from acat.backend.praat_score import PraatScore
+
+if TYPE_CHECKING:
+    from acat.backend.preprocess import PreprocessOptions
+
+HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+_REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    422: "Unprocessable Content",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+# latencies the percentiles are computed over
+_LATENCY_WINDOW = 1000
+# finished jobs that can still be looked up
+_KEEP_FINISHED_JOBS = 10000
+
+# a job is identified by the file, its size and modification time, and the models
+_JobKey = Tuple[str, int, int, Tuple[str, ...]]
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class _Request:
+    method: str
+    path: str
+    query: Dict[str, str]
+    headers: Dict[str, str]
+    body: bytes
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get("connection", "").lower() != "close"
+
+
+async def _read_request(
+    reader: asyncio.StreamReader, max_body_bytes: int
+) -> _Request | None:
+    """Read one request, or `None` when the client closed the connection"""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise HttpError(411, "Chunked request bodies are not supported")
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise HttpError(400, "Malformed Content-Length")
+    if length > max_body_bytes:
+        raise HttpError(413, f"Request bodies are limited to {max_body_bytes} bytes")
+    body = await reader.readexactly(length) if length else b""
+
+    url = urlsplit(target)
+    return _Request(method.upper(), url.path, dict(parse_qsl(url.query)), headers, body)
+
+
+def _json_safe(value):
+    # JSON has no NaN, which features are when a recording has no voiced syllables
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    return value
+
+
+def _write_response(
+    writer: asyncio.StreamWriter, status: int, body: Dict, keep_alive: bool
+) -> None:
+    payload = json.dumps(_json_safe(body)).encode()
+    head = (
+        f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + payload)
+
+
+def parse_models(value: str | Sequence[str] | None) -> List[LanguageModel]:
+    """The models asked for, the default model if none"""
+    if value is None:
+        return [default_model()]
+    if value == "all":
+        return list(LanguageModel)
+    names = [value] if isinstance(value, str) else value
+    try:
+        return [LanguageModel(name) for name in names]
+    except ValueError:
+        known = ", ".join(model.value for model in LanguageModel)
+        raise HttpError(400, f"Unknown model, choose from {known} or all")
+
+
+def _is_true(value) -> bool:
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def _score_in_worker(
+    audio_file_paths: List[pathlib.Path],
+    models: List[LanguageModel],
+    preprocess: PreprocessOptions | None,
+) -> List[Tuple[Dict[LanguageModel, PraatScore] | None, str | None]]:
+    """Score a batch of files, returning the scores or the error of each"""
+    from acat.backend.judge_score import generate_praat_scores_batch_traced
+
+    results = generate_praat_scores_batch_traced(
+        audio_file_paths, models, preprocess=preprocess
+    )
+    return [
+        (scores, None if error is None else f"{type(error).__name__}: {error}")
+        for scores, _, error in results
+    ]
+
+
+@dataclass(eq=False)
+class ServiceJob:
+    job_id: str
+    path: pathlib.Path
+    models: List[LanguageModel]
+    # the name of uploaded audio, which is deleted once the job is over
+    upload_name: str | None = None
+    status: str = "queued"
+    submitted: float = field(default_factory=time.monotonic)
+    started: float | None = None
+    finished: float | None = None
+    scores: Dict[LanguageModel, PraatScore] | None = None
+    error: str | None = None
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def to_dict(self) -> Dict:
+        result = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "file": str(self.path) if self.upload_name is None else self.upload_name,
+            "models": [model.value for model in self.models],
+        }
+        if self.started is not None:
+            result["queued_seconds"] = self.started - self.submitted
+        if self.finished is not None and self.started is not None:
+            result["analysis_seconds"] = self.finished - self.started
+        if self.error is not None:
+            result["error"] = self.error
+        if self.scores:
+            result["scores"] = {
+                model.value: {
+                    "comprehensibility": score.comprehensibility,
+                    "nativelikeness": score.nativelikeness,
+                }
+                for model, score in self.scores.items()
+            }
+            features = dataclasses.asdict(next(iter(self.scores.values())))
+            del features["comprehensibility"], features["nativelikeness"]
+            result["features"] = features
+        return result
+
+
+def _percentiles(values: Sequence[float]) -> Dict[str, float | int | None]:
+    ordered = sorted(values)
+
+    def rank(q: float) -> float | None:
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+    return {
+        "count": len(ordered),
+        "p50": rank(0.5),
+        "p90": rank(0.9),
+        "p99": rank(0.99),
+        "max": ordered[-1] if ordered else None,
+    }
+
+
+class ScoringService:
+    """Scores audio files for HTTP clients on a warm process pool"""
+
+    def __init__(
+        self,
+        max_workers: int,
+        preprocess: PreprocessOptions | None = None,
+        max_queue: int = 1000,
+        max_upload_bytes: int = 256 * 1024 * 1024,
+        max_batch_size: int = 8,
+    ) -> None:
+        self.max_workers = max_workers
+        self.preprocess = preprocess
+        self.max_queue = max_queue
+        self.max_upload_bytes = max_upload_bytes
+        self.max_batch_size = max_batch_size
+        self.ready = False
+
+        self._warm_up: asyncio.Task | None = None
+        self._executor: RecyclingProcessPool | None = None
+        self._upload_dir: pathlib.Path | None = None
+        self._jobs: OrderedDict[str, ServiceJob] = OrderedDict()
+        self._active: Dict[_JobKey, ServiceJob] = {}
+        self._queue: Deque[Tuple[ServiceJob, _JobKey]] = deque()
+        # when each batch that is on a worker started
+        self._running: Dict[int, float] = {}
+        self._batch_ids = itertools.count()
+        self._started = time.monotonic()
+        self._busy_seconds = 0.0
+        self._latencies: Deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self._queue_waits: Deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self._counts = {
+            "submitted": 0,
+            "joined": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "batches": 0,
+        }
+
+    def start(self) -> None:
+        """Start the workers, which are `ready` once all of them are warmed up"""
+        self._upload_dir = pathlib.Path(tempfile.mkdtemp(prefix="acat-service-"))
+        self._executor = RecyclingProcessPool(
+            self.max_workers, ExecutorConfig.from_env().max_jobs
+        )
+        self._warm_up = asyncio.get_running_loop().create_task(self._wait_warm())
+
+    async def _wait_warm(self) -> None:
+        await asyncio.gather(
+            *(
+                asyncio.wrap_future(future)
+                for future in warm_up_pool(self._executor, self.max_workers)
+            )
+        )
+        self._started = time.monotonic()
+        self.ready = True
+
+    def close(self) -> None:
+        self.ready = False
+        if self._warm_up is not None:
+            self._warm_up.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._upload_dir is not None:
+            shutil.rmtree(self._upload_dir, ignore_errors=True)
+
+    async def serve(self, port: int = DEFAULT_PORT) -> asyncio.Server:
+        return await asyncio.start_server(self._handle_connection, HOST, port)
+
+    def submit(
+        self,
+        path: pathlib.Path,
+        models: List[LanguageModel],
+        upload_name: str | None = None,
+        content_hash: str | None = None,
+    ) -> ServiceJob:
+        """Queue the scoring of a file, joining the job of the same file and models
+
+        Uploads, whose file belongs to their job, are told apart by `content_hash`.
+        """
+        model_names = tuple(model.value for model in models)
+        if content_hash is not None:
+            key = (f"upload:{content_hash}", 0, 0, model_names)
+        else:
+            stat = path.stat()
+            key = (str(path.absolute()), stat.st_size, stat.st_mtime_ns, model_names)
+
+        job = self._active.get(key)
+        if job is None and len(self._queue) >= self.max_queue:
+            self._counts["rejected"] += 1
+            if upload_name is not None:
+                path.unlink(missing_ok=True)
+            raise HttpError(503, f"The queue is full with {len(self._queue)} jobs")
+        if job is not None:
+            self._counts["joined"] += 1
+            # the running job has a copy of the upload of its own
+            if upload_name is not None:
+                path.unlink(missing_ok=True)
+            return job
+
+        job = ServiceJob(uuid.uuid4().hex, path, models, upload_name)
+        self._jobs[job.job_id] = job
+        self._active[key] = job
+        self._queue.append((job, key))
+        self._counts["submitted"] += 1
+        self._dispatch()
+        return job
+
+    def _next_batch(self) -> List[Tuple[ServiceJob, _JobKey]]:
+        """Take the next queued job, and queued jobs for the same models with it"""
+        size = min(self.max_batch_size, math.ceil(len(self._queue) / self.max_workers))
+        batch = [self._queue.popleft()]
+        models = batch[0][0].models
+        for queued in list(self._queue):
+            if len(batch) >= size:
+                break
+            if queued[0].models == models:
+                self._queue.remove(queued)
+                batch.append(queued)
+        return batch
+
+    def _dispatch(self) -> None:
+        while self._queue and len(self._running) < self.max_workers:
+            # the worker is taken right away, before the task gets to run
+            batch_id = next(self._batch_ids)
+            self._running[batch_id] = time.monotonic()
+            batch = self._next_batch()
+            asyncio.get_running_loop().create_task(self._run(batch_id, batch))
+
+    async def _run(
+        self, batch_id: int, batch: List[Tuple[ServiceJob, _JobKey]]
+    ) -> None:
+        started = self._running[batch_id]
+        jobs = [job for job, _ in batch]
+        for job in jobs:
+            job.status = "running"
+            job.started = started
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._executor,
+                _score_in_worker,
+                [job.path for job in jobs],
+                jobs[0].models,
+                self.preprocess,
+            )
+        except Exception as e:
+            results = [(None, f"{type(e).__name__}: {e}")] * len(jobs)
+
+        finished = time.monotonic()
+        del self._running[batch_id]
+        self._busy_seconds += finished - started
+        self._counts["batches"] += 1
+        for (job, key), (scores, error) in zip(batch, results):
+            job.finished = finished
+            if error is None:
+                job.status = "done"
+                job.scores = scores
+                self._counts["completed"] += 1
+            else:
+                job.status = "failed"
+                job.error = error
+                self._counts["failed"] += 1
+            self._queue_waits.append(job.started - job.submitted)
+            self._latencies.append(job.finished - job.submitted)
+            self._active.pop(key, None)
+            if job.upload_name is not None:
+                with contextlib.suppress(OSError):
+                    job.path.unlink()
+            job.done.set()
+        self._forget_finished_jobs()
+        self._dispatch()
+
+    def _forget_finished_jobs(self) -> None:
+        finished = [
+            job_id for job_id, job in self._jobs.items() if job.finished is not None
+        ]
+        for job_id in finished[: max(0, len(finished) - _KEEP_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def metrics(self) -> Dict:
+        uptime = time.monotonic() - self._started
+        # batches still running count with the time they have been running so far
+        now = time.monotonic()
+        busy = self._busy_seconds + sum(
+            now - started for started in self._running.values()
+        )
+        return {
+            "uptime_seconds": uptime,
+            "workers": self.max_workers,
+            "workers_busy": len(self._running),
+            "worker_utilization": busy / (self.max_workers * uptime) if uptime else 0,
+            "queue_depth": len(self._queue),
+            "jobs": dict(self._counts),
+            "latency_seconds": _percentiles(self._latencies),
+            "queue_wait_seconds": _percentiles(self._queue_waits),
+        }
+
+    def _save_upload(self, request: _Request) -> Tuple[pathlib.Path, str]:
+        if not request.body:
+            raise HttpError(400, "The request has no audio")
+        suffix = pathlib.Path(request.query.get("name", "")).suffix.lower() or ".wav"
+        if suffix not in AUDIO_EXTENSIONS:
+            raise HttpError(400, f"Unsupported audio format {suffix}")
+        path = self._upload_dir / f"{uuid.uuid4().hex}{suffix}"
+        path.write_bytes(request.body)
+        # hashed, so that the same upload joins a job that is already running
+        return path, hashlib.sha256(request.body).hexdigest()
+
+    async def _score(self, request: _Request) -> Tuple[int, Dict]:
+        is_json = request.headers.get("content-type", "").startswith("application/json")
+        if is_json:
+            try:
+                options = json.loads(request.body or b"{}")
+            except json.JSONDecodeError:
+                raise HttpError(400, "The body is not valid JSON")
+            if not isinstance(options, dict) or "path" not in options:
+                raise HttpError(400, 'The body needs the "path" of an audio file')
+        else:
+            options = request.query
+        models = parse_models(options.get("model"))
+
+        if is_json:
+            path = pathlib.Path(options["path"])
+            if not await asyncio.to_thread(path.is_file):
+                raise HttpError(404, f"{path} is not a file")
+            job = self.submit(path, models)
+        else:
+            # written in a thread, since uploads can be large
+            path, content_hash = await asyncio.to_thread(self._save_upload, request)
+            upload_name = request.query.get("name", "upload")
+            job = self.submit(path, models, upload_name, content_hash)
+
+        if _is_true(options.get("async", False)):
+            return 202, {"job_id": job.job_id, "status": job.status}
+
+        await job.done.wait()
+        return (200 if job.status == "done" else 422), job.to_dict()
+
+    async def _route(self, request: _Request) -> Tuple[int, Dict]:
+        routes = {"/health": "GET", "/metrics": "GET", "/score": "POST"}
+        if request.path.startswith("/jobs/"):
+            expected = "GET"
+        elif (expected := routes.get(request.path)) is None:
+            raise HttpError(404, f"No such endpoint {request.path}")
+        if request.method != expected:
+            raise HttpError(405, f"{request.path} only accepts {expected}")
+
+        if request.path == "/health":
+            status = "ok" if self.ready else "starting"
+            return (200 if self.ready else 503), {
+                "status": status,
+                "workers": self.max_workers,
+                "queue_depth": len(self._queue),
+            }
+        if request.path == "/metrics":
+            return 200, self.metrics()
+        if request.path == "/score":
+            return await self._score(request)
+
+        job = self._jobs.get(request.path.removeprefix("/jobs/"))
+        if job is None:
+            raise HttpError(404, "No such job")
+        return 200, job.to_dict()
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await _read_request(reader, self.max_upload_bytes)
+                    if request is None:
+                        break
+                    keep_alive = request.keep_alive
+                    status, body = await self._route(request)
+                except HttpError as e:
+                    status, body = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, body = 500, {"error": f"{type(e).__name__}: {e}"}
+                _write_response(writer, status, body, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def run_service(service: ScoringService, port: int = DEFAULT_PORT) -> None:
+    """Serve requests until cancelled or terminated, while the workers warm up"""
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    # SIGTERM stops the service like cancelling it does, where signals can be handled
+    with contextlib.suppress(NotImplementedError):
+        loop.add_signal_handler(signal.SIGTERM, task.cancel)
+    try:
+        service.start()
+        server = await service.serve(port)
+        print(
+            f"Serving on http://{HOST}:{port} with {service.max_workers} workers, "
+            "which are warming up",
+            file=sys.stderr,
+        )
+        async with server:
+            await server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        service.close()
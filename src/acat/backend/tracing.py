@@ -0,0 +1,280 @@
+"""Tracing of scoring jobs
+
+A scoring job runs inside `trace_job`, and the code it calls marks its stages with
+`stage`, which records the wall time, CPU time and resident memory of the stage
+into the trace of the current job. Outside of a job, `stage` does nothing, so
+instrumented code costs next to nothing when it is not traced.
+
+Finished traces are passed to the registered sinks: `JsonLinesSink` appends them to
+a file, and `TraceAggregator` keeps per-stage statistics and the slowest jobs in
+memory. Setting `ACAT_TRACE_FILE` registers a `JsonLinesSink` for that file.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import json
+import os
+import pathlib
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Protocol, Tuple
+
+_TRACE_FILE_ENV = "ACAT_TRACE_FILE"
+
+# the stages of a scoring job, in the order they run
+STAGES: Tuple[str, ...] = (
+    "hash",
+    "cache",
+    "features",
+    "decode",
+    "preprocess",
+    "windows",
+    "praat_syllable_pass",
+    "praat_summary_pass",
+    "tables",
+    "text_grid",
+    "syllable_statistics",
+    "scoring",
+)
+
+
+def _current_rss_mb() -> float | None:
+    """The resident memory of this process, if the platform tells"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # only the peak is available elsewhere; kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+@dataclass
+class StageTiming:
+    name: str
+    wall: float
+    cpu: float
+    rss_mb: float | None
+    rss_delta_mb: float | None
+
+
+@dataclass
+class JobTrace:
+    """The stages of one scoring job"""
+
+    job: str
+    attributes: Dict[str, str] = field(default_factory=dict)
+    started: float = field(default_factory=time.time)
+    wall: float = 0.0
+    cpu: float = 0.0
+    error: str | None = None
+    stages: List[StageTiming] = field(default_factory=list)
+
+    def stage_totals(self) -> Dict[str, float]:
+        """The wall time of each stage, summed over the stage's runs"""
+        totals: Dict[str, float] = {}
+        for timing in self.stages:
+            totals[timing.name] = totals.get(timing.name, 0.0) + timing.wall
+        return totals
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+_current_trace: contextvars.ContextVar[JobTrace | None] = contextvars.ContextVar(
+    "acat_current_trace", default=None
+)
+
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Record a stage into the trace of the current job, if there is one"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    rss_before = _current_rss_mb()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield
+    finally:
+        rss_after = _current_rss_mb()
+        trace.stages.append(
+            StageTiming(
+                name,
+                time.perf_counter() - wall_start,
+                time.process_time() - cpu_start,
+                rss_after,
+                None if rss_after is None else rss_after - rss_before,
+            )
+        )
+
+
+@contextlib.contextmanager
+def trace_job(
+    job: str, emit_trace: bool = False, **attributes: str
+) -> Iterator[JobTrace]:
+    """Trace a job, recording the stages run inside of it
+
+    With `emit_trace`, the trace is passed to the sinks when the job ends, even if
+    it fails.
+    """
+    trace = JobTrace(job, attributes)
+    try:
+        with resume_job(trace):
+            yield trace
+    finally:
+        if emit_trace:
+            emit(trace)
+
+
+@contextlib.contextmanager
+def resume_job(trace: JobTrace) -> Iterator[JobTrace]:
+    """Record more stages into the trace of a job that runs in several steps"""
+    token = _current_trace.set(trace)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield trace
+    except Exception as e:
+        trace.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        trace.wall += time.perf_counter() - wall_start
+        trace.cpu += time.process_time() - cpu_start
+        _current_trace.reset(token)
+
+
+def share_trace(shared: JobTrace, traces: List[JobTrace]) -> None:
+    """Split the time of a step shared by several jobs evenly among their traces"""
+    for trace in traces:
+        trace.wall += shared.wall / len(traces)
+        trace.cpu += shared.cpu / len(traces)
+        trace.stages.extend(
+            StageTiming(
+                timing.name,
+                timing.wall / len(traces),
+                timing.cpu / len(traces),
+                timing.rss_mb,
+                timing.rss_delta_mb,
+            )
+            for timing in shared.stages
+        )
+
+
+class TraceSink(Protocol):
+    def emit(self, trace: JobTrace) -> None: ...
+
+
+class JsonLinesSink:
+    """Appends each trace to a file as one line of JSON"""
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, trace: JobTrace) -> None:
+        line = json.dumps(trace.to_dict())
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+
+class TraceAggregator:
+    """Keeps statistics of each stage and the slowest jobs in memory"""
+
+    def __init__(self, keep_slowest: int = 10) -> None:
+        self.keep_slowest = keep_slowest
+        self._lock = threading.Lock()
+        self._jobs = 0
+        self._errors = 0
+        self._stages: Dict[str, Dict[str, float]] = {}
+        self._slowest: List[JobTrace] = []
+
+    def emit(self, trace: JobTrace) -> None:
+        with self._lock:
+            self._jobs += 1
+            self._errors += trace.error is not None
+            for timing in trace.stages:
+                stats = self._stages.setdefault(
+                    timing.name, {"count": 0, "wall": 0.0, "cpu": 0.0, "max_wall": 0.0}
+                )
+                stats["count"] += 1
+                stats["wall"] += timing.wall
+                stats["cpu"] += timing.cpu
+                stats["max_wall"] = max(stats["max_wall"], timing.wall)
+
+            self._slowest.append(trace)
+            self._slowest.sort(key=lambda job: job.wall, reverse=True)
+            del self._slowest[self.keep_slowest :]
+
+    def summary(self) -> Dict:
+        """The number of jobs and errors, and the count, total and mean of each stage"""
+        with self._lock:
+            return {
+                "jobs": self._jobs,
+                "errors": self._errors,
+                "stages": {
+                    name: {**stats, "mean_wall": stats["wall"] / stats["count"]}
+                    for name, stats in self._stages.items()
+                },
+            }
+
+    def slowest(self) -> List[JobTrace]:
+        with self._lock:
+            return list(self._slowest)
+
+
+_sinks: List[TraceSink] = []
+_sinks_lock = threading.Lock()
+
+
+def add_sink(sink: TraceSink) -> None:
+    with _sinks_lock:
+        _sinks.append(sink)
+
+
+def remove_sink(sink: TraceSink) -> None:
+    with _sinks_lock:
+        if sink in _sinks:
+            _sinks.remove(sink)
+
+
+def emit(trace: JobTrace) -> None:
+    """Pass a finished trace to every sink"""
+    with _sinks_lock:
+        sinks = list(_sinks)
+    for sink in sinks:
+        sink.emit(trace)
+
+
+def timing_columns() -> List[str]:
+    """Export columns holding the time spent in each stage"""
+    return ["Total Time (s)", *(f"{name} (s)" for name in STAGES)]
+
+
+def timing_row(trace: JobTrace | None) -> List[float | None]:
+    """The values of `timing_columns` for a job"""
+    if trace is None:
+        return [None for _ in timing_columns()]
+    totals = trace.stage_totals()
+    return [trace.wall, *(totals.get(name) for name in STAGES)]
+
+
+def _add_sinks_from_env() -> None:
+    if trace_file := os.environ.get(_TRACE_FILE_ENV):
+        add_sink(JsonLinesSink(pathlib.Path(trace_file)))
+
+
+_add_sinks_from_env()
@@ -1,3 +1,6 @@
+import functools
+import os
+import shutil
 import sys
 from pathlib import Path
 
@@ -13,6 +16,19 @@ def get_praat_func_dir() -> Path:
         return _SUPPORT_FUNC_PATH
 
 
+def get_models_dir() -> Path:
+    try:
+        return Path(sys._MEIPASS) / "models"
+    except AttributeError:
+        return Path(__file__).parent / "models"
+
+
+def get_cache_dir() -> Path:
+    if cache_dir := os.environ.get("ACAT_CACHE_DIR"):
+        return Path(cache_dir)
+    return Path.home() / ".cache" / "acat"
+
+
 def get_ffmpeg_path_dir() -> Path | None:
     try:
         bin_path = Path(sys._MEIPASS) / "bin"
@@ -29,7 +45,23 @@ def get_ffmpeg_path_dir() -> Path | None:
         return None
 
 
+def get_ffprobe_path() -> Path | None:
+    """Find ffprobe next to the bundled ffmpeg, or on the PATH"""
+    if ffmpeg_path := get_ffmpeg_path_dir():
+        ffprobe_path = ffmpeg_path.with_name(
+            ffmpeg_path.name.replace("ffmpeg", "ffprobe")
+        )
+        if ffprobe_path.exists():
+            return ffprobe_path
+
+    if ffprobe_path := shutil.which("ffprobe"):
+        return Path(ffprobe_path)
+    return None
+
+
+@functools.cache
 def bind_ffmpeg() -> None:
+    """Point pydub at the bundled ffmpeg; pydub is only imported here, on first use"""
     from pydub import AudioSegment
 
     if ffmpeg_path := get_ffmpeg_path_dir():
@@ -0,0 +1,80 @@
+"""Import the analysis stack in the background
+
+The UI imports none of the analysis libraries itself, so its window appears before
+they are loaded. Warming them up in a thread afterwards keeps the first judging or
+export from paying for the imports; whatever is not warmed up yet is imported on
+first use instead.
+
+Worker processes warm up further, by analyzing a short synthetic recording and
+scoring it with every model before their first job.
+"""
+
+from __future__ import annotations
+
+import importlib
+import logging
+import pathlib
+import tempfile
+import threading
+from typing import TYPE_CHECKING
+
+from acat.backend.utils import bind_ffmpeg
+
+if TYPE_CHECKING:
+    import numpy as np
+
+_BACKEND_MODULES = ("acat.backend.judge_score", "pandas", "pydub")
+_WARM_UP_SAMPLE_RATE = 16000
+_WARM_UP_SECONDS = 2.0
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_up() -> None:
+    try:
+        for module in _BACKEND_MODULES:
+            importlib.import_module(module)
+        bind_ffmpeg()
+    except Exception:
+        # the same import fails again, visibly, when the module is first used
+        logger.exception("Warming up the analysis stack failed")
+
+
+def start_backend_warmup() -> threading.Thread:
+    thread = threading.Thread(target=_warm_up, name="acat-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def _warm_up_samples() -> np.ndarray:
+    import numpy as np
+
+    t = np.arange(int(_WARM_UP_SECONDS * _WARM_UP_SAMPLE_RATE)) / _WARM_UP_SAMPLE_RATE
+    # a 150 Hz buzz swelling into about four syllables a second
+    return 0.3 * np.sign(np.sin(2 * np.pi * 150 * t)) * np.sin(2 * np.pi * 2 * t) ** 2
+
+
+def warm_up_worker() -> None:
+    """Analyze a synthetic recording and score it with every model
+
+    This loads the models and runs every Praat command of the analysis once, in
+    this process, without touching the result cache or the feature store. A
+    failure is logged, and left for the first job to run into.
+    """
+    try:
+        import parselmouth
+
+        from acat.backend.judge_score import LanguageModel, score_features
+        from acat.backend.praat_score_judging_japanese import (
+            analyze_recording,
+            features_from_analysis,
+        )
+
+        with tempfile.TemporaryDirectory(prefix="acat-warmup-") as directory:
+            path = pathlib.Path(directory) / "warmup.wav"
+            sound = parselmouth.Sound(_warm_up_samples(), _WARM_UP_SAMPLE_RATE)
+            sound.save(str(path), parselmouth.SoundFileFormat.WAV)
+            analysis = analyze_recording(path)
+        score_features(features_from_analysis(analysis), list(LanguageModel))
+    except Exception:
+        logger.exception("Warming up the worker failed")
@@ -0,0 +1,413 @@
+"""Watching a directory for recordings to score
+
+New and changed audio files are noticed through inotify on Linux, and by polling
+the modification times of the directories elsewhere, so the directory is listed
+once when the watch starts and then only where something changed. A file is handed
+out once its size and modification time have not changed for a settle time, so
+that recordings still being copied in are not scored half-written. A ledger next to
+the results remembers the path and content fingerprint of every scored file, so
+restarting the watch skips them.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import json
+import os
+import pathlib
+import select
+import struct
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Protocol, Sequence, Set, Tuple
+
+from acat.backend.audio_probe import AUDIO_EXTENSIONS
+from acat.backend.cache import audio_content_hash
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+
+# wd, mask, cookie, length of the name that follows
+_EVENT_HEADER = struct.Struct("iIII")
+
+# known files whose stat the polling watcher checks per poll
+_RECHECK_PER_POLL = 256
+
+# a file's size and modification time, which change while it is being written
+_FileStat = Tuple[int, int]
+
+
+def _file_stat(path: pathlib.Path) -> _FileStat | None:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class _Watcher(Protocol):
+    def start(self) -> List[pathlib.Path]:
+        """Start watching; returns every file that is already there"""
+
+    def read(self, timeout: float) -> List[pathlib.Path]:
+        """Wait up to `timeout` seconds for files that were created or changed"""
+
+    def close(self) -> None: ...
+
+
+def _scan(directory: pathlib.Path) -> Tuple[List[pathlib.Path], List[pathlib.Path]]:
+    """The files and subdirectories of one directory"""
+    files, directories = [], []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(pathlib.Path(entry.path))
+                elif entry.is_file():
+                    files.append(pathlib.Path(entry.path))
+    except OSError:
+        pass
+    return files, directories
+
+
+class _InotifyWatcher:
+    """Watches directories through the inotify API of the Linux kernel"""
+
+    def __init__(self, directory: pathlib.Path, recursive: bool) -> None:
+        self.directory = directory
+        self.recursive = recursive
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._directories: Dict[int, pathlib.Path] = {}
+
+    def _add_tree(self, directory: pathlib.Path) -> List[pathlib.Path]:
+        """Watch a directory, and its subdirectories if recursive, and list them
+
+        The watch is added before the listing, so no file can slip in between.
+        """
+        found = []
+        pending = [directory]
+        while pending:
+            current = pending.pop()
+            wd = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(current), _WATCH_MASK
+            )
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"Cannot watch {current}")
+            self._directories[wd] = current
+            files, directories = _scan(current)
+            found.extend(files)
+            if self.recursive:
+                pending.extend(directories)
+        return found
+
+    def start(self) -> List[pathlib.Path]:
+        return self._add_tree(self.directory)
+
+    def read(self, timeout: float) -> List[pathlib.Path]:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        changed = []
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = buffer[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & _IN_Q_OVERFLOW:
+                # events were dropped, so look at everything once more
+                self._directories.clear()
+                changed.extend(self._add_tree(self.directory))
+                continue
+            if mask & _IN_IGNORED:
+                self._directories.pop(wd, None)
+                continue
+            directory = self._directories.get(wd)
+            if directory is None or not name:
+                continue
+
+            path = directory / os.fsdecode(name)
+            if mask & _IN_ISDIR:
+                if self.recursive and mask & (_IN_CREATE | _IN_MOVED_TO):
+                    changed.extend(self._add_tree(path))
+            else:
+                changed.append(path)
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class _PollingWatcher:
+    """Watches directories by polling their modification times
+
+    A directory is only listed again when its modification time changes, which
+    happens when a file in it is created, replaced, renamed or deleted. Files
+    rewritten in place leave it unchanged, so each poll also checks a bounded
+    slice of the known files, in turn.
+    """
+
+    def __init__(
+        self, directory: pathlib.Path, recursive: bool, interval: float
+    ) -> None:
+        self.directory = directory
+        self.recursive = recursive
+        self.interval = interval
+        self._directories: Dict[pathlib.Path, int] = {}
+        self._files: Dict[pathlib.Path, _FileStat | None] = {}
+        self._next_poll = 0.0
+        self._recheck: List[pathlib.Path] = []
+
+    def _list(self, directory: pathlib.Path) -> List[pathlib.Path]:
+        """List a directory, returning the files that are new or replaced in it"""
+        try:
+            self._directories[directory] = directory.stat().st_mtime_ns
+        except OSError:
+            self._forget(directory)
+            return []
+
+        files, directories = _scan(directory)
+        listed = set(files)
+        for path in [p for p in self._files if p.parent == directory]:
+            if path not in listed:
+                del self._files[path]
+
+        changed = []
+        for path in files:
+            stat = _file_stat(path)
+            if path not in self._files or self._files[path] != stat:
+                self._files[path] = stat
+                changed.append(path)
+        if self.recursive:
+            for subdirectory in directories:
+                if subdirectory not in self._directories:
+                    changed.extend(self._list(subdirectory))
+        return changed
+
+    def _forget(self, directory: pathlib.Path) -> None:
+        self._directories.pop(directory, None)
+        for path in [p for p in self._files if p.parent == directory]:
+            del self._files[path]
+
+    def start(self) -> List[pathlib.Path]:
+        self._next_poll = time.monotonic() + self.interval
+        return self._list(self.directory)
+
+    def read(self, timeout: float) -> List[pathlib.Path]:
+        wait = self._next_poll - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return []
+        time.sleep(max(0.0, wait))
+        self._next_poll = time.monotonic() + self.interval
+
+        changed = []
+        for directory, mtime_ns in list(self._directories.items()):
+            try:
+                current = directory.stat().st_mtime_ns
+            except OSError:
+                self._forget(directory)
+                continue
+            if current != mtime_ns:
+                changed.extend(self._list(directory))
+
+        if not self._recheck:
+            self._recheck = list(self._files)
+        for _ in range(min(_RECHECK_PER_POLL, len(self._recheck))):
+            path = self._recheck.pop()
+            if path in self._files and (stat := _file_stat(path)) != self._files[path]:
+                self._files[path] = stat
+                changed.append(path)
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+def _make_watcher(
+    directory: pathlib.Path, recursive: bool, poll_interval: float, use_inotify: bool
+) -> Tuple[_Watcher, List[pathlib.Path]]:
+    if use_inotify and sys.platform.startswith("linux"):
+        watcher = None
+        try:
+            watcher = _InotifyWatcher(directory, recursive)
+            return watcher, watcher.start()
+        except (OSError, AttributeError):
+            # e.g. the limit of inotify watches was reached, so poll instead
+            if watcher is not None:
+                watcher.close()
+    watcher = _PollingWatcher(directory, recursive, poll_interval)
+    return watcher, watcher.start()
+
+
+@dataclass(frozen=True)
+class LedgerEntry:
+    fingerprint: str
+    size: int
+    mtime_ns: int
+    failed: bool = False
+
+
+@dataclass(frozen=True)
+class WatchedFile:
+    """A file that stopped changing and was not scored yet"""
+
+    path: pathlib.Path
+    fingerprint: str
+    size: int
+    mtime_ns: int
+
+
+class ScoreLedger:
+    """An append-only record of the files that were scored, as JSON lines
+
+    The latest entry of each path counts. A file whose size and modification time
+    match its entry is skipped without hashing it; otherwise its content hash is
+    compared, so a file that was only touched is not scored again.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self._entries: Dict[str, LedgerEntry] = {}
+        if path.is_file():
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # the last line may be cut short by a crash
+                        continue
+                    path_key = record.pop("path")
+                    self._entries[path_key] = LedgerEntry(**record)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, path: pathlib.Path) -> LedgerEntry | None:
+        return self._entries.get(str(path.absolute()))
+
+    def record(self, file: WatchedFile, failed: bool = False) -> None:
+        entry = LedgerEntry(file.fingerprint, file.size, file.mtime_ns, failed)
+        path_key = str(file.path.absolute())
+        self._entries[path_key] = entry
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps({"path": path_key, **entry.__dict__}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class FolderWatcher:
+    """Hands out the audio files of a directory once they stop changing
+
+    The files already in the directory are handed out too, unless the ledger has
+    them. Files being scored are not handed out again until `done` is called for
+    them, unless their content changes meanwhile.
+    """
+
+    def __init__(
+        self,
+        directory: pathlib.Path,
+        ledger: ScoreLedger,
+        recursive: bool = True,
+        extensions: Sequence[str] = AUDIO_EXTENSIONS,
+        settle_seconds: float = 2.0,
+        poll_interval: float = 1.0,
+        use_inotify: bool = True,
+    ) -> None:
+        self.directory = directory
+        self.ledger = ledger
+        self.extensions = tuple(extensions)
+        self.settle_seconds = settle_seconds
+        # the last stat of each file that may be changing, and when it changed
+        self._pending: Dict[pathlib.Path, Tuple[_FileStat | None, float]] = {}
+        self._in_flight: Dict[pathlib.Path, str] = {}
+
+        self._watcher, existing = _make_watcher(
+            directory, recursive, poll_interval, use_inotify
+        )
+        self._notice(existing)
+
+    @property
+    def uses_inotify(self) -> bool:
+        return isinstance(self._watcher, _InotifyWatcher)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _notice(self, paths: Iterable[pathlib.Path]) -> None:
+        now = time.monotonic()
+        for path in paths:
+            # hidden files are the partial files of copies, renamed when complete
+            if path.suffix.lower() in self.extensions and not path.name.startswith("."):
+                self._pending[path] = (None, now)
+
+    def poll(self, timeout: float) -> List[WatchedFile]:
+        """Wait up to `timeout` seconds for files to settle, and return them"""
+        if self._pending:
+            # files are checked again a few times per settle time
+            timeout = min(timeout, self.settle_seconds / 4)
+        self._notice(self._watcher.read(timeout))
+
+        now = time.monotonic()
+        ready = []
+        for path, (last_stat, changed) in list(self._pending.items()):
+            stat = _file_stat(path)
+            if stat is None:
+                del self._pending[path]
+            elif stat != last_stat:
+                self._pending[path] = (stat, now)
+            elif now - changed >= self.settle_seconds:
+                del self._pending[path]
+                if (file := self._unscored(path, stat)) is not None:
+                    ready.append(file)
+        return ready
+
+    def _unscored(self, path: pathlib.Path, stat: _FileStat) -> WatchedFile | None:
+        entry = self.ledger.lookup(path)
+        if entry is not None and (entry.size, entry.mtime_ns) == stat:
+            return None
+        try:
+            fingerprint = audio_content_hash(path)
+        except OSError:
+            return None
+
+        file = WatchedFile(path, fingerprint, *stat)
+        if entry is not None and entry.fingerprint == fingerprint:
+            # only touched, so remember the new stat instead of scoring it again
+            self.ledger.record(file, entry.failed)
+            return None
+        if self._in_flight.get(path) == fingerprint:
+            return None
+        self._in_flight[path] = fingerprint
+        return file
+
+    def done(self, file: WatchedFile, failed: bool = False) -> None:
+        """Record that a file was scored, or could not be"""
+        if self._in_flight.get(file.path) == file.fingerprint:
+            del self._in_flight[file.path]
+        self.ledger.record(file, failed)
+
+    def close(self) -> None:
+        self._watcher.close()
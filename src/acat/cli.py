@@ -0,0 +1,924 @@
+"""Headless command line interface of ACAT
+
+Nothing in here may import PyQt6, so that the scoring can run on machines without a
+display or a Qt installation. The analysis stack is only imported by the commands
+that need it, so that the GUI, which checks for commands first, starts quickly.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import dataclasses
+import math
+import os
+import pathlib
+import signal
+import sys
+import traceback
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Dict, Iterable, List, Sequence, TextIO, Tuple
+
+from acat.backend import tracing
+from acat.backend.audio_probe import AUDIO_EXTENSIONS, find_audio_files
+from acat.backend.cache import ResultCache, audio_content_hash, get_result_cache
+from acat.backend.executor import create_process_pool
+from acat.backend.export import CsvExportSink, ExportSink, open_export_sink
+from acat.backend.language_model import LanguageModel, default_model
+from acat.backend.praat_score import EXPORT_COLUMNS, PraatScore, export_row
+from acat.backend.tracing import JobTrace, timing_columns, timing_row
+
+if TYPE_CHECKING:
+    from acat.backend.feature_store import FeatureStore
+    from acat.backend.long_recording import LongRecordingOptions
+    from acat.backend.preprocess import PreprocessOptions
+
+_ALL_MODELS = "all"
+_DEFAULT_BATCH_SIZE = 8
+
+
+def _score_file(
+    audio_file_path: pathlib.Path,
+    models: Sequence[LanguageModel],
+    use_cache: bool,
+    long_recording: LongRecordingOptions | None,
+    preprocess: PreprocessOptions | None,
+) -> Tuple[
+    pathlib.Path,
+    Dict[LanguageModel, PraatScore] | None,
+    JobTrace | None,
+    str | None,
+]:
+    """Score one file in a worker process, reporting errors instead of raising them"""
+    from acat.backend.judge_score import generate_praat_scores_traced
+
+    try:
+        scores, trace = generate_praat_scores_traced(
+            audio_file_path,
+            models,
+            use_cache=use_cache,
+            long_recording=long_recording,
+            preprocess=preprocess,
+        )
+        return audio_file_path, scores, trace, None
+    except Exception:
+        return audio_file_path, None, None, traceback.format_exc()
+
+
+def _score_batch(
+    audio_file_paths: List[pathlib.Path],
+    models: Sequence[LanguageModel],
+    use_cache: bool,
+    long_recording: LongRecordingOptions | None,
+    preprocess: PreprocessOptions | None,
+) -> List[
+    Tuple[
+        pathlib.Path,
+        Dict[LanguageModel, PraatScore] | None,
+        JobTrace | None,
+        str | None,
+    ]
+]:
+    """Score a batch of files in a worker process like `_score_file`, with a single
+    run of the Praat script"""
+    from acat.backend.judge_score import generate_praat_scores_batch_traced
+
+    results = generate_praat_scores_batch_traced(
+        audio_file_paths,
+        models,
+        use_cache=use_cache,
+        long_recording=long_recording,
+        preprocess=preprocess,
+    )
+    return [
+        (
+            path,
+            scores,
+            trace,
+            "".join(traceback.format_exception(error)) if error else None,
+        )
+        for path, (scores, trace, error) in zip(audio_file_paths, results)
+    ]
+
+
+def _is_long(path: pathlib.Path, long_recording: LongRecordingOptions | None) -> bool:
+    try:
+        return long_recording is not None and long_recording.applies_to(path)
+    except Exception:
+        # reported when the file is analyzed
+        return False
+
+
+def _score_long_file(
+    audio_file_path: pathlib.Path,
+    models: Sequence[LanguageModel],
+    use_cache: bool,
+    long_recording: LongRecordingOptions,
+    preprocess: PreprocessOptions | None,
+    executor: Executor,
+) -> List[
+    Tuple[
+        pathlib.Path,
+        Dict[LanguageModel, PraatScore] | None,
+        JobTrace | None,
+        str | None,
+    ]
+]:
+    """Score a long recording in this process like `_score_file`, analyzing its
+    windows on `executor`"""
+    from acat.backend.long_recording import window_executor
+
+    with window_executor(executor):
+        return [
+            _score_file(audio_file_path, models, use_cache, long_recording, preprocess)
+        ]
+
+
+def _batches(
+    files: List[pathlib.Path], jobs: int, batch_size: int
+) -> List[List[pathlib.Path]]:
+    """Split files into batches of at most `batch_size`, small enough to keep every
+    worker busy"""
+    batch_size = max(1, min(batch_size, math.ceil(len(files) / max(1, jobs))))
+    return [files[i : i + batch_size] for i in range(0, len(files), batch_size)]
+
+
+def score_files(
+    files: Iterable[pathlib.Path],
+    models: Sequence[LanguageModel],
+    jobs: int,
+    out: TextIO | ExportSink,
+    use_cache: bool = True,
+    long_recording: LongRecordingOptions | None = None,
+    timings: bool = False,
+    preprocess: PreprocessOptions | None = None,
+    batch_size: int = 1,
+) -> int:
+    """Score files on a process pool and write a row as each of them completes
+
+    Rows are written to an export sink, or as CSV to a stream. Each file is analyzed
+    once and scored with every model. With several models, a row is written per file
+    and model, and a "Model" column tells them apart.
+
+    With `timings`, the time spent in each stage is exported as extra columns. The
+    trace of each job is passed to the trace sinks of this process.
+
+    With a `batch_size` above one, each worker analyzes a batch of files with a
+    single run of the Praat script, and the rows of a batch are written once all of
+    its files are scored.
+
+    With `long_recording` options, the windows of long recordings are analyzed on
+    the same pool as the other files, rather than on a pool per recording.
+
+    Returns the number of files that could not be analyzed.
+    """
+    models = list(models)
+    if not isinstance(out, ExportSink):
+        out = CsvExportSink(out, _score_columns(models, timings), close_file=False)
+
+    files = list(files)
+    long_files = {path for path in files if _is_long(path, long_recording)}
+    files = [path for path in files if path not in long_files]
+
+    failures = 0
+    with create_process_pool(jobs) as executor, ThreadPoolExecutor(1) as windows:
+        futures = [
+            executor.submit(
+                _score_batch, batch, models, use_cache, long_recording, preprocess
+            )
+            for batch in _batches(files, jobs, batch_size)
+        ]
+        futures.extend(
+            windows.submit(
+                _score_long_file,
+                path,
+                models,
+                use_cache,
+                long_recording,
+                preprocess,
+                executor,
+            )
+            for path in long_files
+        )
+        for future in as_completed(futures):
+            for path, scores, trace, error in future.result():
+                if error is not None:
+                    failures += 1
+                    print(f"Error analyzing {path}:\n{error}", file=sys.stderr)
+                if trace is not None:
+                    tracing.emit(trace)
+
+                out.write_rows(_score_rows(path, scores, trace, models, timings))
+
+    return failures
+
+
+def _score_columns(models: Sequence[LanguageModel], timings: bool) -> List[str]:
+    model_columns = ["Model"] if len(models) > 1 else []
+    return [*EXPORT_COLUMNS, *model_columns, *(timing_columns() if timings else [])]
+
+
+def _score_rows(
+    path: pathlib.Path,
+    scores: Dict[LanguageModel, PraatScore] | None,
+    trace: JobTrace | None,
+    models: Sequence[LanguageModel],
+    timings: bool,
+) -> List[list]:
+    """The CSV rows of a file, one per model"""
+    rows = []
+    for model in models:
+        row = export_row(path, scores[model] if scores else None)
+        if len(models) > 1:
+            row.append(model.value)
+        if timings:
+            row.extend(timing_row(trace))
+        rows.append(row)
+    return rows
+
+
+def _watch_command(args: argparse.Namespace) -> int:
+    from acat.backend.watch import FolderWatcher, ScoreLedger, WatchedFile
+
+    directory: pathlib.Path = args.directory
+    if not directory.is_dir():
+        print(f"{directory} is not a directory", file=sys.stderr)
+        return 2
+
+    models = _models_from_arg(args.model)
+    preprocess = _preprocess_from_args(args)
+    out: pathlib.Path = args.out
+    try:
+        sink = open_export_sink(out, _score_columns(models, args.timings), append=True)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    ledger = ScoreLedger(args.ledger or out.with_name(f"{out.name}.ledger.jsonl"))
+    watcher = FolderWatcher(
+        directory,
+        ledger,
+        recursive=args.recursive,
+        extensions=_extensions_from_args(args),
+        settle_seconds=args.settle_seconds,
+        poll_interval=args.poll_interval,
+        use_inotify=args.inotify,
+    )
+    method = "with inotify" if watcher.uses_inotify else "by polling"
+    print(
+        f"Watching {directory} {method}, {len(ledger)} files scored before",
+        file=sys.stderr,
+    )
+
+    # a daemon is usually stopped with SIGTERM, which stops it like Ctrl-C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    executor = create_process_pool(args.jobs)
+    futures: Dict[Future, WatchedFile] = {}
+    try:
+        with sink:
+            while True:
+                # results are collected between polls, so poll briefly while busy
+                for file in watcher.poll(0.2 if futures else 1.0):
+                    future = executor.submit(
+                        _score_file, file.path, models, args.cache, None, preprocess
+                    )
+                    futures[future] = file
+
+                for future in [future for future in futures if future.done()]:
+                    file = futures.pop(future)
+                    path, scores, trace, error = future.result()
+                    if error is not None:
+                        print(f"Error analyzing {path}:\n{error}", file=sys.stderr)
+                    else:
+                        print(f"Scored {path}", file=sys.stderr)
+                    if trace is not None:
+                        tracing.emit(trace)
+                    sink.write_rows(
+                        _score_rows(path, scores, trace, models, args.timings)
+                    )
+                    watcher.done(file, failed=error is not None)
+    except KeyboardInterrupt:
+        # files being scored are not in the ledger yet, so they are scored again
+        # on the next start
+        print(f"Stopped, {len(futures)} files left unscored", file=sys.stderr)
+    finally:
+        watcher.close()
+        executor.shutdown(wait=False, cancel_futures=True)
+    return 0
+
+
+def _preprocess_from_args(args: argparse.Namespace) -> PreprocessOptions | None:
+    if args.analysis_rate is None:
+        return None
+
+    from acat.backend.preprocess import PreprocessOptions
+
+    return PreprocessOptions(args.analysis_rate, mono=not args.keep_channels)
+
+
+def _find_files_from_args(args: argparse.Namespace) -> List[pathlib.Path] | None:
+    directory: pathlib.Path = args.directory
+    if not directory.is_dir():
+        print(f"{directory} is not a directory", file=sys.stderr)
+        return None
+
+    return find_audio_files(directory, args.recursive, _extensions_from_args(args))
+
+
+def _extensions_from_args(args: argparse.Namespace) -> List[str]:
+    return [
+        ext.lower() if ext.startswith(".") else f".{ext.lower()}"
+        for ext in args.extensions
+    ]
+
+
+def _score_command(args: argparse.Namespace) -> int:
+    if (files := _find_files_from_args(args)) is None:
+        return 2
+    models = _models_from_arg(args.model)
+    long_recording = None
+    if args.window_seconds:
+        from acat.backend.long_recording import LongRecordingOptions
+
+        long_recording = LongRecordingOptions(window_seconds=args.window_seconds)
+        if args.long_recording_seconds is not None:
+            long_recording = dataclasses.replace(
+                long_recording, min_duration_seconds=args.long_recording_seconds
+            )
+
+    preprocess = _preprocess_from_args(args)
+
+    if args.trace:
+        tracing.add_sink(tracing.JsonLinesSink(args.trace))
+
+    if (
+        sink := _open_sink_or_report(args.out, _score_columns(models, args.timings))
+    ) is None:
+        return 2
+    with sink:
+        failures = score_files(
+            files,
+            models,
+            args.jobs,
+            sink,
+            args.cache,
+            long_recording,
+            args.timings,
+            preprocess,
+            args.batch_size,
+        )
+
+    print(f"Scored {len(files) - failures} of {len(files)} files", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def _serve_command(args: argparse.Namespace) -> int:
+    import asyncio
+
+    from acat.backend.service import ScoringService, run_service
+
+    service = ScoringService(
+        args.jobs,
+        preprocess=_preprocess_from_args(args),
+        max_queue=args.max_queue,
+        max_upload_bytes=int(args.max_upload_mb * 1024 * 1024),
+        max_batch_size=args.batch_size,
+    )
+    try:
+        asyncio.run(run_service(service, args.port))
+    except KeyboardInterrupt:
+        pass
+    print("Stopped", file=sys.stderr)
+    return 0
+
+
+def _preprocess_report_command(args: argparse.Namespace) -> int:
+    from acat.backend.preprocess import compare_preprocessing, summarize_comparisons
+    from acat.backend.scoring import FEATURES
+
+    if (files := _find_files_from_args(args)) is None:
+        return 2
+    if args.sample:
+        files = files[:: max(1, len(files) // args.sample)][: args.sample]
+    preprocess = _preprocess_from_args(args)
+    models = _models_from_arg(args.model)
+
+    comparisons = compare_preprocessing(files, preprocess, models, args.jobs)
+
+    if args.out:
+        with open(args.out, "w", newline="") as out:
+            writer = csv.writer(out)
+            names = [*FEATURES, *(comparisons[0].scores if comparisons else [])]
+            writer.writerow(
+                [
+                    "File Path",
+                    "Full Rate Seconds",
+                    "Preprocessed Seconds",
+                    *(f"{name} ({kind})" for name in names for kind in ("full", "pre")),
+                ]
+            )
+            for comparison in comparisons:
+                values = [
+                    *zip(comparison.full, comparison.preprocessed),
+                    *comparison.scores.values(),
+                ]
+                writer.writerow(
+                    [
+                        str(comparison.path),
+                        comparison.full_seconds,
+                        comparison.preprocessed_seconds,
+                        *(value for pair in values for value in pair),
+                    ]
+                )
+
+    summary = summarize_comparisons(comparisons)
+    analysis = summary.pop("analysis")
+    print(f"Compared {len(comparisons)} files at {preprocess.version_tag()}")
+    print(f"{'':32} {'mean abs diff':>14} {'max abs diff':>14}")
+    for name, stats in summary.items():
+        print(f"{name:32} {stats['mean_abs_diff']:14.6g} {stats['max_abs_diff']:14.6g}")
+    print(
+        f"Analysis took {analysis['full_seconds']:.2f} s at full rate and "
+        f"{analysis['preprocessed_seconds']:.2f} s preprocessed "
+        f"({analysis['speedup']:.2f}x)"
+    )
+    return 0
+
+
+def _write_scores(
+    scores: Iterable[Tuple[pathlib.Path, Dict[LanguageModel, PraatScore]]],
+    models: Sequence[LanguageModel],
+    out: ExportSink,
+) -> int:
+    """Write a row per file and model like `score_files`; returns the files"""
+    n_files = 0
+    for path, file_scores in scores:
+        n_files += 1
+        out.write_rows(_score_rows(path, file_scores, None, models, timings=False))
+    return n_files
+
+
+def _open_sink_or_report(out: str, columns: Sequence[str]) -> ExportSink | None:
+    """Open a sink for `--out`, writing CSV to stdout for "-" """
+    if out == "-":
+        return CsvExportSink(sys.stdout, columns, close_file=False)
+    try:
+        return open_export_sink(pathlib.Path(out), columns)
+    except ImportError:
+        print("Exporting to Parquet needs pyarrow", file=sys.stderr)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+    return None
+
+
+def _models_from_arg(model: str) -> List[LanguageModel]:
+    if model == _ALL_MODELS:
+        return list(LanguageModel)
+    return [LanguageModel(model)]
+
+
+def _get_feature_store_or_report() -> FeatureStore | None:
+    from acat.backend.feature_store import get_feature_store
+
+    store = get_feature_store()
+    if store is None:
+        print("The feature store is disabled (ACAT_FEATURES=0)", file=sys.stderr)
+    return store
+
+
+def _stored_version(args: argparse.Namespace, store: FeatureStore) -> str | None:
+    """The analysis version asked for, the current one by default"""
+    if args.analysis_version is None:
+        from acat.backend.praat_score_judging_japanese import analysis_version
+
+        return analysis_version()
+
+    matches = [v for v in store.versions() if v.startswith(args.analysis_version)]
+    if len(matches) != 1:
+        print(
+            f"{args.analysis_version} matches {len(matches)} stored analysis "
+            "versions, see 'acat features info'",
+            file=sys.stderr,
+        )
+        return None
+    return matches[0]
+
+
+def _in_directory(path: str | pathlib.Path, directory: pathlib.Path) -> bool:
+    """Whether a file is in a directory or one of its subdirectories, comparing
+    path components rather than strings, so that /data/cor does not hold
+    /data/corp/a.wav"""
+    return pathlib.Path(path).absolute().is_relative_to(directory.absolute())
+
+
+def _rescore_command(args: argparse.Namespace) -> int:
+    from acat.backend.feature_store import rescore
+
+    if (store := _get_feature_store_or_report()) is None:
+        return 1
+    if (version := _stored_version(args, store)) is None:
+        return 2
+
+    features = store.read_features(version)
+    if args.directory is not None:
+        features = features[
+            features["file_path"].map(lambda path: _in_directory(path, args.directory))
+        ]
+
+    models = _models_from_arg(args.model)
+    if (sink := _open_sink_or_report(args.out, _score_columns(models, False))) is None:
+        return 2
+    with sink:
+        n_files = _write_scores(rescore(features, models), models, sink)
+
+    print(f"Re-scored {n_files} files from stored features", file=sys.stderr)
+    return 0
+
+
+def _features_info_command(args: argparse.Namespace) -> int:
+    if (store := _get_feature_store_or_report()) is None:
+        return 1
+
+    for name, value in store.stats().items():
+        print(f"{name}: {value}")
+    for version in store.versions():
+        print(f"version: {version} ({len(store.read_features(version))} recordings)")
+    return 0
+
+
+def _features_compact_command(args: argparse.Namespace) -> int:
+    if (store := _get_feature_store_or_report()) is None:
+        return 1
+
+    merged = sum(store.compact(version) for version in store.versions())
+    print(f"Merged {merged} segments", file=sys.stderr)
+    return 0
+
+
+def _features_export_command(args: argparse.Namespace) -> int:
+    if (store := _get_feature_store_or_report()) is None:
+        return 1
+    if (version := _stored_version(args, store)) is None:
+        return 2
+
+    frame = (
+        store.read_syllables(version)
+        if args.syllables
+        else store.read_features(version)
+    )
+    if args.out.suffix == ".parquet":
+        try:
+            frame.to_parquet(args.out, index=False)
+        except ImportError:
+            print("Exporting to Parquet needs pyarrow or fastparquet", file=sys.stderr)
+            return 1
+    else:
+        frame.to_csv(args.out, index=False)
+    print(f"Exported {len(frame)} rows to {args.out}", file=sys.stderr)
+    return 0
+
+
+def _get_cache_or_report() -> ResultCache | None:
+    cache = get_result_cache()
+    if cache is None:
+        print("The result cache is disabled (ACAT_CACHE=0)", file=sys.stderr)
+    return cache
+
+
+def _cache_info_command(args: argparse.Namespace) -> int:
+    if (cache := _get_cache_or_report()) is None:
+        return 1
+
+    for name, value in cache.stats().items():
+        print(f"{name}: {value}")
+    return 0
+
+
+def _cache_invalidate_command(args: argparse.Namespace) -> int:
+    if (cache := _get_cache_or_report()) is None:
+        return 1
+
+    audio_hash = audio_content_hash(args.file) if args.file else None
+    removed = cache.invalidate(args.model, audio_hash)
+    print(f"Removed {removed} cached scores", file=sys.stderr)
+    return 0
+
+
+def _add_model_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--model",
+        choices=[*(model.value for model in LanguageModel), _ALL_MODELS],
+        default=default_model().value,
+        help=f"language model to score with, or '{_ALL_MODELS}' to score with "
+        "every model from a single analysis (default: %(default)s)",
+    )
+
+
+def _add_files_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("directory", type=pathlib.Path)
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--recursive", action="store_true", help="also use files in subdirectories"
+    )
+    parser.add_argument(
+        "--extensions",
+        nargs="+",
+        default=list(AUDIO_EXTENSIONS),
+        help="audio file extensions to use",
+    )
+
+
+def _analysis_rate(value: str) -> int:
+    from acat.backend.preprocess import MIN_ANALYSIS_RATE
+
+    sample_rate = int(value)
+    if sample_rate < MIN_ANALYSIS_RATE:
+        raise argparse.ArgumentTypeError(f"must be at least {MIN_ANALYSIS_RATE} Hz")
+    return sample_rate
+
+
+def _add_preprocess_arguments(
+    parser: argparse.ArgumentParser, default_rate: int | None = None
+) -> None:
+    parser.add_argument(
+        "--analysis-rate",
+        type=_analysis_rate,
+        default=default_rate,
+        help="mix recordings down to mono and resample them to this rate in Hz "
+        "before the analysis, at least 11025 "
+        + ("(default: %(default)s)" if default_rate else "(default: full rate)"),
+    )
+    parser.add_argument(
+        "--keep-channels",
+        action="store_true",
+        help="only resample to the analysis rate, without mixing down to mono",
+    )
+
+
+def _add_analysis_version_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--analysis-version",
+        help="use the features of this analysis version, or a prefix of it "
+        "(default: the current analysis)",
+    )
+
+
+def _make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="acat",
+        description="Automated Comprehensibility Assessment Tool. "
+        "Run without arguments to start the graphical interface.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    score_parser = subparsers.add_parser(
+        "score", help="score every audio file in a directory"
+    )
+    _add_files_arguments(score_parser)
+    _add_model_argument(score_parser)
+    score_parser.add_argument(
+        "--out",
+        default="-",
+        help="CSV, JSON lines or Parquet file to write results to, by its suffix "
+        "(default: CSV to stdout)",
+    )
+    _add_preprocess_arguments(score_parser)
+    score_parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="re-analyze files even if their scores are cached",
+    )
+    score_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=_DEFAULT_BATCH_SIZE,
+        help="analyze up to this many files per run of the Praat script, fewer if "
+        "there are too few files to keep every worker busy (default: %(default)s)",
+    )
+    score_parser.add_argument(
+        "--window-seconds",
+        type=float,
+        help="analyze long recordings in windows of about this many seconds, "
+        "in parallel (default: analyze every file as a whole)",
+    )
+    score_parser.add_argument(
+        "--long-recording-seconds",
+        type=float,
+        help="only recordings at least this long are analyzed in windows "
+        "(default: 900)",
+    )
+    score_parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="add the time spent in each stage of the analysis to the CSV",
+    )
+    score_parser.add_argument(
+        "--trace",
+        type=pathlib.Path,
+        help="append a JSON line with the stages of each job to this file",
+    )
+    score_parser.set_defaults(func=_score_command)
+
+    watch_parser = subparsers.add_parser(
+        "watch",
+        help="score the audio files in a directory, and every new or changed one "
+        "as it lands, until stopped",
+    )
+    _add_files_arguments(watch_parser)
+    _add_model_argument(watch_parser)
+    watch_parser.add_argument(
+        "--out",
+        type=pathlib.Path,
+        required=True,
+        help="CSV or JSON lines file to append results to",
+    )
+    watch_parser.add_argument(
+        "--ledger",
+        type=pathlib.Path,
+        help="file recording which files were scored, so that they are skipped "
+        "when the watch is restarted (default: OUT.ledger.jsonl)",
+    )
+    watch_parser.add_argument(
+        "--settle-seconds",
+        type=float,
+        default=2.0,
+        help="score files once they have not changed for this long "
+        "(default: %(default)s)",
+    )
+    watch_parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="seconds between checks for new files when inotify is not available "
+        "(default: %(default)s)",
+    )
+    watch_parser.add_argument(
+        "--no-inotify",
+        dest="inotify",
+        action="store_false",
+        help="poll for new files even where inotify is available",
+    )
+    _add_preprocess_arguments(watch_parser)
+    watch_parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="re-analyze files even if their scores are cached",
+    )
+    watch_parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="add the time spent in each stage of the analysis to the CSV",
+    )
+    watch_parser.set_defaults(func=_watch_command)
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="score audio files for other tools over HTTP on localhost"
+    )
+    serve_parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="port to listen on (default: %(default)s)",
+    )
+    serve_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="number of worker processes (default: number of CPUs)",
+    )
+    serve_parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=1000,
+        help="refuse new jobs while this many are waiting (default: %(default)s)",
+    )
+    serve_parser.add_argument(
+        "--max-upload-mb",
+        type=float,
+        default=256,
+        help="largest audio upload accepted, in megabytes (default: %(default)s)",
+    )
+    serve_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=_DEFAULT_BATCH_SIZE,
+        help="analyze up to this many queued files per run of the Praat script "
+        "while every worker is busy (default: %(default)s)",
+    )
+    _add_preprocess_arguments(serve_parser)
+    serve_parser.set_defaults(func=_serve_command)
+
+    report_parser = subparsers.add_parser(
+        "preprocess-report",
+        help="compare the features and scores of files analyzed at full rate and "
+        "preprocessed to an analysis rate",
+    )
+    _add_files_arguments(report_parser)
+    _add_model_argument(report_parser)
+    report_parser.add_argument(
+        "--sample",
+        type=int,
+        help="only compare this many files, spread over the directory",
+    )
+    report_parser.add_argument(
+        "--out", help="CSV file to write the values of each file to"
+    )
+    _add_preprocess_arguments(report_parser, default_rate=16000)
+    report_parser.set_defaults(func=_preprocess_report_command)
+
+    rescore_parser = subparsers.add_parser(
+        "rescore",
+        help="score stored features again, e.g. with re-fitted models, "
+        "without analyzing any audio",
+    )
+    rescore_parser.add_argument(
+        "directory",
+        type=pathlib.Path,
+        nargs="?",
+        help="only re-score recordings analyzed in this directory (default: all)",
+    )
+    _add_model_argument(rescore_parser)
+    rescore_parser.add_argument(
+        "--out",
+        default="-",
+        help="CSV, JSON lines or Parquet file to write results to, by its suffix "
+        "(default: CSV to stdout)",
+    )
+    _add_analysis_version_argument(rescore_parser)
+    rescore_parser.set_defaults(func=_rescore_command)
+
+    features_parser = subparsers.add_parser(
+        "features", help="manage the store of extracted features"
+    )
+    features_subparsers = features_parser.add_subparsers(
+        dest="features_command", required=True
+    )
+    features_subparsers.add_parser(
+        "info", help="show the location and content of the store"
+    ).set_defaults(func=_features_info_command)
+    features_subparsers.add_parser(
+        "compact", help="merge the segments written per recording"
+    ).set_defaults(func=_features_compact_command)
+    export_parser = features_subparsers.add_parser(
+        "export", help="export stored features to a Parquet or CSV file"
+    )
+    export_parser.add_argument("out", type=pathlib.Path)
+    export_parser.add_argument(
+        "--syllables",
+        action="store_true",
+        help="export the F0 and formants of each syllable instead, if they were "
+        "kept (ACAT_FEATURES_SYLLABLES=1)",
+    )
+    _add_analysis_version_argument(export_parser)
+    export_parser.set_defaults(func=_features_export_command)
+
+    cache_parser = subparsers.add_parser("cache", help="manage the result cache")
+    cache_subparsers = cache_parser.add_subparsers(dest="cache_command", required=True)
+    cache_subparsers.add_parser(
+        "info", help="show the location and size of the cache"
+    ).set_defaults(func=_cache_info_command)
+    invalidate_parser = cache_subparsers.add_parser(
+        "invalidate", help="remove cached scores (all of them by default)"
+    )
+    invalidate_parser.add_argument(
+        "--model",
+        choices=[model.value for model in LanguageModel],
+        help="only remove the scores of this model",
+    )
+    invalidate_parser.add_argument(
+        "--file",
+        type=pathlib.Path,
+        help="only remove the scores of this audio file",
+    )
+    invalidate_parser.set_defaults(func=_cache_invalidate_command)
+
+    return parser
+
+
+COMMANDS = (
+    "score",
+    "watch",
+    "serve",
+    "preprocess-report",
+    "rescore",
+    "features",
+    "cache",
+)
+
+
+def is_cli_invocation(argv: Sequence[str]) -> bool:
+    """Check whether the command line asks for the CLI instead of the UI"""
+    return bool(argv) and argv[0] in (*COMMANDS, "-h", "--help")
+
+
+def run_cli(argv: Sequence[str]) -> int:
+    args = _make_parser().parse_args(argv)
+    return args.func(args)
@@ -1,20 +1,26 @@
-from acat.backend.utils import bind_ffmpeg
-from acat.ui import start_application
-
-
-#def main() -> None:
-#    bind_ffmpeg()
-#    start_application()
-
+import multiprocessing
 import sys
 import traceback
 from pathlib import Path
 
-from acat.backend.utils import bind_ffmpeg
-from acat.ui import start_application
-
 
 def main() -> None:
+    # worker processes of a frozen app re-enter here and must not start the UI
+    multiprocessing.freeze_support()
+
+    argv = sys.argv[1:]
+
+    from acat.cli import is_cli_invocation, run_cli
+
+    if is_cli_invocation(argv):
+        sys.exit(run_cli(argv))
+
+    start_gui()
+
+
+def start_gui() -> None:
+    from acat.ui import start_application
+
     # Create log file in user's home directory so it's accessible
     log_file = Path.home() / "acat_error_log.txt"
     
@@ -24,13 +30,8 @@ def main() -> None:
             f.write(f"Python: {sys.version}\n")
             f.write(f"Platform: {sys.platform}\n\n")
         
-        # Try to bind FFmpeg
-        with open(log_file, "a") as f:
-            f.write("Binding FFmpeg...\n")
-        bind_ffmpeg()
-        
+        # FFmpeg is bound when the analysis stack is warmed up or first used
         with open(log_file, "a") as f:
-            f.write("FFmpeg bound successfully\n")
             f.write("Starting UI...\n")
         
         start_application()
@@ -45,4 +46,4 @@ def main() -> None:
             f.write(traceback.format_exc())
         
         # Re-raise so the app still crashes visibly
-        raise
\ No newline at end of file
+        raise
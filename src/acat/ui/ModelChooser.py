@@ -1,6 +1,6 @@
 from PyQt6.QtWidgets import QComboBox
 
-from acat.backend.judge_score import LanguageModel
+from acat.backend.language_model import LanguageModel
 
 
 class ModelComboChooser(QComboBox):
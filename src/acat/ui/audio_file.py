@@ -2,56 +2,40 @@ from __future__ import annotations
 
 import pathlib
 from dataclasses import dataclass, field
-from typing import Iterable
+from typing import TYPE_CHECKING
 
-from pydub import AudioSegment
+from acat.backend.audio_cache import get_audio_cache
+from acat.backend.audio_probe import AudioMetadata, probe_audio
+from acat.backend.language_model import LanguageModel
+from acat.backend.praat_score import PraatScore
+from acat.backend.tracing import JobTrace
 
-
-@dataclass
-class PraatScore:
-    """Scores generated from Praat analysis that will be displayed and export as CSV"""
-
-    comprehensibility: float
-    nativelikeness: float
-    speechrate: float
-    pauses: float
-    rangef0: float
-    sdsylldur: float
-    coeff1: float
-    coeff2: float
-    coeff3: float
-
-    @property
-    def all_data(self) -> Iterable[float]:
-        """Get all data conveniently as a iterable that can be serialized easily"""
-        return [
-            self.comprehensibility,
-            self.nativelikeness,
-            self.speechrate,
-            self.pauses,
-            self.rangef0,
-            self.sdsylldur,
-            self.coeff1,
-            self.coeff2,
-            self.coeff3,
-        ]
-
-    @staticmethod
-    def all_data_or_none(obj: PraatScore | None) -> Iterable[float | None]:
-        """get all data as an iterable or an iterable of None"""
-        if obj is None:
-            return [None for _ in range(9)]
-        return obj.all_data
+if TYPE_CHECKING:
+    from pydub import AudioSegment
 
 
 @dataclass
 class AudioFileInfo:
+    """An audio file in the content table
+
+    Only the metadata is read when the file is added and kept with the row. The
+    samples are decoded when `audio` is accessed, into the shared audio cache, which
+    evicts them when it runs out of its memory budget.
+    """
+
     path: pathlib.Path
     score: PraatScore | None = field(default=None)
-    audio: AudioSegment | None = field(default=None, init=False)
+    # the language model the score was judged with
+    model: LanguageModel | None = field(default=None)
+    trace: JobTrace | None = field(default=None, repr=False)
+    metadata: AudioMetadata = field(init=False)
 
     def __post_init__(self) -> None:
-        self.audio = AudioSegment.from_file(self.path)
+        self.metadata = probe_audio(self.path)
+
+    @property
+    def audio(self) -> AudioSegment:
+        return get_audio_cache().get(self.path)
 
     @property
     def extension(self) -> str:
@@ -63,7 +47,15 @@ class AudioFileInfo:
 
     @property
     def audio_length(self) -> float:
-        return len(self.audio) / 1000.0
+        return self.metadata.duration
+
+    @property
+    def sample_rate(self) -> int:
+        return self.metadata.sample_rate
+
+    @property
+    def channels(self) -> int:
+        return self.metadata.channels
 
     @property
     def audio_length_str(self) -> str:
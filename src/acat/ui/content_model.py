@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import itertools
+from typing import Any, Dict, Iterable, List, Tuple
+
+from PyQt6.QtCore import (
+    QAbstractTableModel,
+    QEvent,
+    QModelIndex,
+    QObject,
+    QRect,
+    Qt,
+    pyqtSignal,
+)
+from PyQt6.QtGui import QMouseEvent, QPainter
+from PyQt6.QtWidgets import (
+    QAbstractItemView,
+    QApplication,
+    QStyle,
+    QStyledItemDelegate,
+    QStyleOptionButton,
+    QStyleOptionViewItem,
+)
+
+from acat.ui.audio_file import AudioFileInfo
+
+
+class ContentModel(QAbstractTableModel):
+    """The rows of the content table, each identified by a stable row ID
+
+    Row IDs never change while a row exists, unlike row positions, which shift when
+    rows before them are deleted. Jobs therefore refer to rows by ID, and looking a
+    row up by its ID takes constant time.
+    """
+
+    COL_HEADERS = ["File Name", "Audio Length", "Comp Score", "Nat Score", "Actions"]
+    ACTION_COL = 4
+    # whether the row is queued or being judged, if it is either
+    JOB_STATE_ROLE = Qt.ItemDataRole.UserRole
+
+    _CENTERED = Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignHCenter
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._next_id = itertools.count()
+        self._row_ids: List[int] = []
+        self._rows: Dict[int, AudioFileInfo] = {}
+        self._positions: Dict[int, int] = {}
+        self._job_states: Dict[int, str] = {}
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._row_ids)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.COL_HEADERS)
+
+    def headerData(
+        self,
+        section: int,
+        orientation: Qt.Orientation,
+        role: int = Qt.ItemDataRole.DisplayRole,
+    ) -> Any:
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.COL_HEADERS[section]
+        return str(section + 1)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+
+        row_id = self._row_ids[index.row()]
+        row = self._rows[row_id]
+        column = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return row.file_name
+            if column == 1:
+                return row.audio_length_str
+            if column in (2, 3) and row_id in self._job_states:
+                return f"{self._job_states[row_id]}..."
+            if column == 2:
+                return row.comprehensibility_str
+            if column == 3:
+                return row.nativelikeness_str
+        elif role == self.JOB_STATE_ROLE:
+            return self._job_states.get(row_id)
+        elif role == Qt.ItemDataRole.TextAlignmentRole:
+            if column == 0:
+                return Qt.AlignmentFlag.AlignVCenter
+            return self._CENTERED
+        elif role == Qt.ItemDataRole.ToolTipRole and column == 0:
+            return str(row.path)
+
+        return None
+
+    def add_rows(self, rows: Iterable[AudioFileInfo]) -> List[int]:
+        """Append rows and return their row IDs"""
+        rows = list(rows)
+        if not rows:
+            return []
+
+        first = len(self._row_ids)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        row_ids = []
+        for position, row in enumerate(rows, first):
+            row_id = next(self._next_id)
+            self._row_ids.append(row_id)
+            self._rows[row_id] = row
+            self._positions[row_id] = position
+            row_ids.append(row_id)
+        self.endInsertRows()
+
+        return row_ids
+
+    def remove_row(self, row_id: int) -> None:
+        position = self._positions.get(row_id)
+        if position is None:
+            return
+
+        self.beginRemoveRows(QModelIndex(), position, position)
+        del self._row_ids[position]
+        del self._rows[row_id]
+        del self._positions[row_id]
+        self._job_states.pop(row_id, None)
+        for shifted_position in range(position, len(self._row_ids)):
+            self._positions[self._row_ids[shifted_position]] = shifted_position
+        self.endRemoveRows()
+
+    def row_id_at(self, position: int) -> int:
+        return self._row_ids[position]
+
+    def position_of(self, row_id: int) -> int | None:
+        return self._positions.get(row_id)
+
+    def get_row(self, row_id: int) -> AudioFileInfo | None:
+        return self._rows.get(row_id)
+
+    def rows(self) -> List[AudioFileInfo]:
+        return [self._rows[row_id] for row_id in self._row_ids]
+
+    def items(self) -> Iterable[Tuple[int, AudioFileInfo]]:
+        return ((row_id, self._rows[row_id]) for row_id in self._row_ids)
+
+    def set_job_state(self, row_id: int, state: str | None) -> None:
+        """Show that a row is queued or being judged, or neither with `None`"""
+        if row_id not in self._rows:
+            return
+        if state is None:
+            self._job_states.pop(row_id, None)
+        else:
+            self._job_states[row_id] = state
+        self.row_changed(row_id)
+
+    def row_changed(self, row_id: int) -> None:
+        """Repaint a row whose data has changed, if it still exists"""
+        position = self._positions.get(row_id)
+        if position is None:
+            return
+        self.dataChanged.emit(
+            self.index(position, 0), self.index(position, self.columnCount() - 1)
+        )
+
+
+class ActionDelegate(QStyledItemDelegate):
+    """Paints the action buttons of a row and reports which of them was clicked
+
+    The buttons are only painted, so a row costs no widgets no matter how many rows
+    the table has.
+    """
+
+    ACTIONS: Tuple[Tuple[str, str], ...] = (
+        ("Judge", "judge_score"),
+        ("Info", "open_info"),
+        ("Delete", "delete_row"),
+    )
+    # the actions replacing the first ones while a row is queued or being judged
+    JOB_ACTIONS: Tuple[Tuple[str, str], ...] = (("Cancel", "cancel_job"),)
+    SPACING = 5
+    MARGIN = 2
+
+    action_triggered = pyqtSignal(str, QModelIndex)
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._pressed: Tuple[int, int] | None = None
+
+    def _button_rects(self, rect: QRect) -> List[QRect]:
+        count = len(self.ACTIONS)
+        width = (rect.width() - self.SPACING * (count - 1)) // count
+        return [
+            QRect(
+                rect.x() + i * (width + self.SPACING),
+                rect.y() + self.MARGIN,
+                width,
+                rect.height() - 2 * self.MARGIN,
+            )
+            for i in range(count)
+        ]
+
+    def _actions(self, index: QModelIndex) -> Tuple[Tuple[str, str], ...]:
+        if index.data(ContentModel.JOB_STATE_ROLE) is None:
+            return self.ACTIONS
+        return self.JOB_ACTIONS + self.ACTIONS[len(self.JOB_ACTIONS) :]
+
+    def _button_at(self, rect: QRect, event: QMouseEvent) -> int | None:
+        point = event.position().toPoint()
+        for i, button_rect in enumerate(self._button_rects(rect)):
+            if button_rect.contains(point):
+                return i
+        return None
+
+    def paint(
+        self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex
+    ) -> None:
+        style = option.widget.style() if option.widget else QApplication.style()
+
+        for i, ((label, _), rect) in enumerate(
+            zip(self._actions(index), self._button_rects(option.rect))
+        ):
+            button = QStyleOptionButton()
+            button.rect = rect
+            button.text = label
+            button.state = QStyle.StateFlag.State_Enabled
+            if self._pressed == (index.row(), i):
+                button.state |= QStyle.StateFlag.State_Sunken
+            else:
+                button.state |= QStyle.StateFlag.State_Raised
+            style.drawControl(
+                QStyle.ControlElement.CE_PushButton, button, painter, option.widget
+            )
+
+    def editorEvent(
+        self,
+        event: QEvent,
+        model: QAbstractTableModel,
+        option: QStyleOptionViewItem,
+        index: QModelIndex,
+    ) -> bool:
+        if event.type() not in (
+            QEvent.Type.MouseButtonPress,
+            QEvent.Type.MouseButtonRelease,
+        ):
+            return super().editorEvent(event, model, option, index)
+        if event.button() != Qt.MouseButton.LeftButton:
+            return False
+
+        button = self._button_at(option.rect, event)
+        if event.type() == QEvent.Type.MouseButtonPress:
+            self._pressed = None if button is None else (index.row(), button)
+        else:
+            clicked = self._pressed is not None and self._pressed == (
+                index.row(),
+                button,
+            )
+            self._pressed = None
+            if clicked:
+                self.action_triggered.emit(self._actions(index)[button][1], index)
+
+        if isinstance(option.widget, QAbstractItemView):
+            option.widget.viewport().update()
+        return button is not None
@@ -1,135 +1,151 @@
 from __future__ import annotations
 
+import sys
 import traceback
 import weakref
-from typing import Callable, Iterable, List
-
-from PyQt6.QtCore import (
-    QObject,
-    QRunnable,
-    Qt,
-    QThreadPool,
-    pyqtSignal,
-    pyqtSlot,
-)
+from concurrent.futures import Executor
+from typing import Iterable, List, Set
+
+from PyQt6.QtCore import QModelIndex, pyqtSignal
 from PyQt6.QtWidgets import (
-    QHBoxLayout,
+    QAbstractItemView,
+    QHeaderView,
     QMessageBox,
-    QPushButton,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QVBoxLayout,
     QWidget,
 )
 
-from acat.backend.judge_score import LanguageModel, generate_praat_score
+from acat.backend import tracing
+from acat.backend.executor import ExecutorConfig, ExecutorKind, get_process_pool
+from acat.backend.export import ExportSink
+from acat.backend.language_model import LanguageModel
+from acat.backend.praat_score import PraatScore, export_row
+from acat.backend.tracing import JobTrace, timing_row
 from acat.ui.audio_file import AudioFileInfo
+from acat.ui.content_model import ActionDelegate, ContentModel
+from acat.ui.job_scheduler import JobScheduler
 from acat.ui.result_popup import ResultPopup
 from acat.ui.window_management import get_main_window
 
 
-class WorkerSignals(QObject):
-    """A signal object used to passing message between threads"""
+class ContentTable(QTableView):
+    """A content table used for displaying the praat score in the main UI window
 
-    finished = pyqtSignal(int, object)
+    The rows live in a `ContentModel` and the action buttons are painted by an
+    `ActionDelegate`, so the table stays responsive with a large number of rows.
+    Public methods take row positions, while jobs refer to their rows by row ID, so
+    deleting rows never redirects a result to the wrong row.
 
+    Rows are judged through a `JobScheduler`, which runs a limited number of jobs at
+    once, never judges the same file with the same model twice at the same time,
+    and judges the current row next.
+    """
 
-class RowWorker(QRunnable):
-    """A worker thread for background processing Praat scores
+    COL_HEADERS = ContentModel.COL_HEADERS
+    ACTION_COL = ContentModel.ACTION_COL
+    ROW_HEIGHT = 30
 
-    The worker thread, when initialized, executes the `run` function,
-    which contains the actual implementation of the running thread
-    """
+    # jobs done and in total since the table was last idle, and jobs queued
+    progress_changed = pyqtSignal(int, int, int)
 
     def __init__(
         self,
-        row_index: int,
-        data: weakref.ReferenceType[AudioFileInfo],
-        model: LanguageModel,
+        parent: QWidget | None = None,
+        executor_config: ExecutorConfig | None = None,
     ) -> None:
-        super().__init__()
-        self.row_index = row_index
-        self.data = data
-        self.model = model
-        self.signal = WorkerSignals()
-
-    @pyqtSlot()
-    def run(self):
-        """The actual implementation of the thread, which is judging the praat score"""
-        data: AudioFileInfo = self.data()
-        if data is None:
-            return
-
-        try:
-            # chooses which model to run and the path to the audio file
-            data.score = generate_praat_score(data.path, self.model)
-        except Exception as e:
-            print(
-                "Error",
-                "An error occurred while analyzing the audio file. Please notify the developer.",
-                f"Data: {data}",
-            )
-            raise RuntimeError from e
-
-        # sends the score result back to the UI
-        self.signal.finished.emit(self.row_index, data)
-
-
-class ContentTable(QTableWidget):
-    """A content table used for displaying the praat score in the main UI window"""
-
-    COL_HEADERS = ["File Name", "Audio Length", "Comp Score", "Nat Score", "Actions"]
-    ACTION_COL = 4
-
-    def __init__(self, parent: QWidget | None = None) -> None:
         super().__init__(parent)
         self.parent_wrapper = parent
-        self.data: List[AudioFileInfo] = []
+        self._executor_config = executor_config or ExecutorConfig.from_env()
+        self._setup_scheduler()
         self._setup_list()
-        self._thread_pool = QThreadPool()
-        self._threads = []
         self._selected: weakref.ReferenceType[AudioFileInfo] | None = None
+        self._export_sink: ExportSink | None = None
+        self._export_timings = False
+
+    @property
+    def data(self) -> List[AudioFileInfo]:
+        """All rows, in the order they are displayed"""
+        return self._model.rows()
+
+    def set_executor_config(self, config: ExecutorConfig) -> None:
+        """Choose between judging rows in threads and in the process pool"""
+        self._executor_config = config
+        self._scheduler.set_max_workers(config.max_workers)
+
+    def set_export_sink(self, sink: ExportSink | None, timings: bool = False) -> None:
+        """Append the row of each file to `sink` as soon as it is judged
+
+        Rows are laid out as `EXPORT_COLUMNS`, followed by the `timing_columns` with
+        `timings`. The sink is not closed when it is replaced or removed.
+        """
+        self._export_sink = sink
+        self._export_timings = timings
+
+    def _export_row(self, row_data: AudioFileInfo) -> None:
+        if self._export_sink is None:
+            return
+        row = export_row(row_data.path, row_data.score)
+        if self._export_timings:
+            row.extend(timing_row(row_data.trace))
+        self._export_sink.write_row(row)
+
+    def start_workers(self) -> None:
+        """Start the process pool, if rows are judged in one, so that the first
+        judging does not wait for its workers to start and warm up"""
+        self._get_executor()
+
+    def _get_executor(self) -> Executor | None:
+        if self._executor_config.kind == ExecutorKind.Process:
+            return get_process_pool(
+                self._executor_config.max_workers, self._executor_config.max_jobs
+            )
+        return None
 
-    def _setup_list(self) -> None:
-        self.setColumnCount(len(self.COL_HEADERS))
-        self.setHorizontalHeaderLabels(self.COL_HEADERS)
-        self.setColumnWidth(self.ACTION_COL, 200)
+    def _setup_scheduler(self) -> None:
+        self._scheduler = JobScheduler(
+            self._get_executor, self._executor_config.max_workers, self
+        )
+        self._scheduler.job_finished.connect(self._update_score)
+        self._scheduler.job_failed.connect(self._report_failure)
+        self._scheduler.rows_changed.connect(self._update_job_states)
+        self._scheduler.progress_changed.connect(self.progress_changed)
 
-        self.popup = ResultPopup()
+    @property
+    def scheduler(self) -> JobScheduler:
+        return self._scheduler
 
-    def add_row(self, row: AudioFileInfo) -> None:
-        row_position = self.rowCount()
+    def _setup_list(self) -> None:
+        self._model = ContentModel(self)
+        self.setModel(self._model)
 
-        self.insertRow(row_position)
+        self._action_delegate = ActionDelegate(self)
+        self._action_delegate.action_triggered.connect(self._handle_action)
+        self.setItemDelegateForColumn(self.ACTION_COL, self._action_delegate)
 
-        file_name_item = QTableWidgetItem(row.file_name)
-        file_name_item.setTextAlignment(Qt.AlignmentFlag.AlignVCenter)
-        self.setItem(row_position, 0, file_name_item)
+        self.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setColumnWidth(self.ACTION_COL, 200)
 
-        audio_length_item = QTableWidgetItem(row.audio_length_str)
-        audio_length_item.setTextAlignment(
-            Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignHCenter
-        )
-        self.setItem(row_position, 1, audio_length_item)
+        # fixed row heights spare the view from measuring every row
+        vertical_header = self.verticalHeader()
+        vertical_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        vertical_header.setDefaultSectionSize(self.ROW_HEIGHT)
 
-        score_item = QTableWidgetItem(row.comprehensibility_str)
-        score_item.setTextAlignment(
-            Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignHCenter
-        )
-        self.setItem(row_position, 2, score_item)
+        self.selectionModel().currentRowChanged.connect(self._prioritize_current)
 
-        score_item = QTableWidgetItem(row.nativelikeness_str)
-        score_item.setTextAlignment(
-            Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignHCenter
-        )
-        self.setItem(row_position, 3, score_item)
+        self.popup = ResultPopup()
 
-        self.setCellWidget(row_position, 4, self._create_actions())
+    def add_row(self, row: AudioFileInfo) -> None:
+        self._model.add_rows([row])
 
-        self.data.append(row)
+    def add_rows(self, rows: Iterable[AudioFileInfo]) -> None:
+        self._model.add_rows(rows)
 
     def _judge_row(self, row_position: int, model: LanguageModel) -> None:
         row_data = self.get_row(row_position, notify=True)
+        if row_data is None:
+            return
 
         if not row_data.path.exists():
             QMessageBox.critical(
@@ -147,76 +163,64 @@ class ContentTable(QTableWidget):
             )
             return
 
-        thread = RowWorker(row_position, weakref.ref(row_data), model)
-        thread.signal.finished.connect(self._update_score)
-        self._thread_pool.start(thread)
-
-    def _update_score(self, row_index: int, data: AudioFileInfo) -> None:
-        row_data = self.get_row(row_index)
-        if row_data is data:
-            self.setItem(
-                row_index,
-                2,
-                QTableWidgetItem(row_data.comprehensibility_str),
-            )
-            self.setItem(row_index, 3, QTableWidgetItem(row_data.nativelikeness_str))
-
-            if self._selected and self._selected() == data:
-                self.popup.update_content(row_data)
-
-    def _create_actions(self) -> QWidget:
-        button_widget = QWidget()
-        button_layout = QHBoxLayout()
-        button_layout.setContentsMargins(0, 0, 0, 0)
-        button_layout.setSpacing(5)
-
-        judge_score_button = QPushButton("Judge")
-        judge_score_button.clicked.connect(
-            self._gen_handle("judge_score", weakref.ref(button_widget))
-        )
-
-        open_file_info_button = QPushButton("Info")
-        open_file_info_button.clicked.connect(
-            self._gen_handle("open_info", weakref.ref(button_widget))
+        self._scheduler.submit(
+            self._model.row_id_at(row_position), row_data.path, model
         )
 
-        del_row_button = QPushButton("Delete")
-        del_row_button.clicked.connect(
-            self._gen_handle("delete_row", weakref.ref(button_widget))
-        )
-
-        button_layout.addWidget(judge_score_button)
-        button_layout.addWidget(open_file_info_button)
-        button_layout.addWidget(del_row_button)
+    def _prioritize_current(self, current: QModelIndex, _previous: QModelIndex) -> None:
+        if current.isValid():
+            self._scheduler.prioritize(self._model.row_id_at(current.row()))
 
-        button_widget.setLayout(button_layout)
+    def _update_job_states(self, row_ids: Set[int]) -> None:
+        for row_id in row_ids:
+            self._model.set_job_state(row_id, self._scheduler.row_state(row_id))
 
-        return button_widget
+    def _update_score(
+        self,
+        row_ids: Set[int],
+        model: LanguageModel,
+        score: PraatScore,
+        trace: JobTrace,
+    ) -> None:
+        tracing.emit(trace)
+        for row_id in row_ids:
+            row_data = self._model.get_row(row_id)
+            if row_data is None:
+                continue
+            row_data.score, row_data.model, row_data.trace = score, model, trace
+            self._model.row_changed(row_id)
+            self._export_row(row_data)
+
+            if self._selected and self._selected() is row_data:
+                self.popup.update_content(row_data)
 
-    def add_rows(self, rows: Iterable[AudioFileInfo]) -> None:
+    def _report_failure(self, row_ids: Set[int], error: str) -> None:
+        rows = [row for row_id in row_ids if (row := self._model.get_row(row_id))]
+        file_names = [row.file_name for row in rows]
         for row in rows:
-            self.add_row(row)
-
-    def _gen_handle(
-        self, handle_name: str, action_widget: weakref.ReferenceType[QWidget]
-    ) -> Callable:
-        def _inner() -> None:
-            row_index = self._find_row_index(action_widget())
-            getattr(self, handle_name)(row_index)
+            self._export_row(row)
+        print(
+            "An error occurred while analyzing the audio file. "
+            "Please notify the developer.",
+            f"Files: {', '.join(file_names)}",
+            error,
+            sep="\n",
+            file=sys.stderr,
+        )
 
-        return _inner
+    def _handle_action(self, handle_name: str, index: QModelIndex) -> None:
+        getattr(self, handle_name)(index.row())
 
-    def _find_row_index(self, widget: QWidget | None) -> int:
-        if widget is None:
-            return -1
+    def delete_row(self, row_index: int) -> None:
+        row_id = self._model.row_id_at(row_index)
+        self._scheduler.cancel(row_id)
+        self._model.remove_row(row_id)
 
-        for row_index in range(self.rowCount()):
-            if self.cellWidget(row_index, self.ACTION_COL) is widget:
-                return row_index
+    def cancel_job(self, row_index: int) -> None:
+        self._scheduler.cancel(self._model.row_id_at(row_index))
 
-    def delete_row(self, row_index: int) -> None:
-        self.removeRow(row_index)
-        self.data.pop(row_index)
+    def cancel_all_jobs(self) -> None:
+        self._scheduler.cancel_all()
 
     def open_info(self, row_index: int) -> None:
         data = self.get_row(row_index)
@@ -226,7 +230,7 @@ class ContentTable(QTableWidget):
 
     def get_row(self, row_index: int, notify: bool = False) -> AudioFileInfo | None:
         try:
-            return self.data[row_index]
+            return self._model.get_row(self._model.row_id_at(row_index))
         except IndexError as e:
             if notify:
                 QMessageBox.critical(
@@ -249,9 +253,15 @@ class ContentTable(QTableWidget):
             model = get_main_window().get_current_model()
 
         if self._create_reanalyze_confirmation(self._check_if_analyzed()):
-            for row_index in range(len(self.data)):
+            for row_index in range(self._model.rowCount()):
                 self._judge_row(row_index, model)
 
+            # the current row is judged first, if there is one
+            if self.currentIndex().isValid():
+                self._scheduler.prioritize(
+                    self._model.row_id_at(self.currentIndex().row())
+                )
+
     def _create_reanalyze_confirmation(self, files: List[str]) -> bool:
         if files:
             file_names = "\n".join(files)
@@ -274,7 +284,7 @@ class ContentTable(QTableWidget):
             return list(
                 map(
                     lambda row: row.file_name,
-                    filter(lambda row: row.score is not None, self.data),
+                    filter(lambda row: row.score is not None, self._model.rows()),
                 )
             )
 
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import os
+import pathlib
+from typing import Callable, Iterable, List
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+from PyQt6.QtWidgets import QMessageBox, QProgressDialog, QWidget
+
+from acat.backend.audio_probe import find_audio_files
+from acat.ui.audio_file import AudioFileInfo
+
+
+class ImportSignals(QObject):
+    """Signals passing the progress of an import from the worker threads to the UI"""
+
+    scanned = pyqtSignal(int, object)
+    probed = pyqtSignal(int, object)
+    failed = pyqtSignal(int, object, str)
+
+
+class ScanWorker(QRunnable):
+    """A worker expanding the chosen paths into audio files, walking directories"""
+
+    def __init__(
+        self, generation: int, paths: List[pathlib.Path], signals: ImportSignals
+    ) -> None:
+        super().__init__()
+        self.generation = generation
+        self.paths = paths
+        self.signals = signals
+
+    @pyqtSlot()
+    def run(self) -> None:
+        files = []
+        for path in self.paths:
+            if path.is_dir():
+                files.extend(find_audio_files(path, recursive=True))
+            else:
+                files.append(path)
+
+        self.signals.scanned.emit(self.generation, files)
+
+
+class ProbeWorker(QRunnable):
+    """A worker reading the metadata of one audio file"""
+
+    def __init__(
+        self,
+        generation: int,
+        path: pathlib.Path,
+        signals: ImportSignals,
+        is_cancelled: Callable[[int], bool],
+    ) -> None:
+        super().__init__()
+        self.generation = generation
+        self.path = path
+        self.signals = signals
+        self.is_cancelled = is_cancelled
+
+    @pyqtSlot()
+    def run(self) -> None:
+        if self.is_cancelled(self.generation):
+            return
+
+        try:
+            info = AudioFileInfo(self.path)
+        except Exception as e:
+            self.signals.failed.emit(self.generation, self.path, str(e))
+            return
+
+        self.signals.probed.emit(self.generation, info)
+
+
+class FileImporter(QObject):
+    """Import audio files in the background, emitting each file as soon as it is read
+
+    Files are probed in parallel on a thread pool while a progress dialog shows how
+    many are done. Cancelling drops everything that has not been imported yet.
+    """
+
+    file_imported = pyqtSignal(object)
+
+    def __init__(self, parent: QWidget) -> None:
+        super().__init__(parent)
+        self._parent_widget = parent
+        self._thread_pool = QThreadPool()
+        self._thread_pool.setMaxThreadCount(max(4, os.cpu_count() or 1))
+
+        self._signals = ImportSignals()
+        self._signals.scanned.connect(self._on_scanned)
+        self._signals.probed.connect(self._on_probed)
+        self._signals.failed.connect(self._on_failed)
+
+        self._generation = 0
+        self._pending_scans = 0
+        self._total = 0
+        self._done = 0
+        self._failures: List[str] = []
+        self._progress: QProgressDialog | None = None
+
+    def import_paths(self, paths: Iterable[pathlib.Path]) -> None:
+        """Import files and directories; directories are searched recursively"""
+        paths = list(paths)
+        if not paths:
+            return
+
+        self._pending_scans += 1
+        self._show_progress()
+        self._thread_pool.start(ScanWorker(self._generation, paths, self._signals))
+
+    def cancel(self) -> None:
+        self._generation += 1
+        self._thread_pool.clear()
+        self._finish(show_failures=False)
+
+    def _is_cancelled(self, generation: int) -> bool:
+        return generation != self._generation
+
+    def _show_progress(self) -> None:
+        if self._progress is None:
+            self._progress = QProgressDialog(
+                "Importing audio files...", "Cancel", 0, 0, self._parent_widget
+            )
+            self._progress.setWindowTitle("Import")
+            self._progress.setMinimumDuration(500)
+            self._progress.canceled.connect(self.cancel)
+        self._update_progress()
+
+    def _update_progress(self) -> None:
+        if self._progress is None:
+            return
+        # an empty range makes the dialog show a busy indicator while scanning
+        self._progress.setMaximum(self._total if not self._pending_scans else 0)
+        self._progress.setValue(self._done)
+        self._progress.setLabelText(f"Imported {self._done} of {self._total} files")
+
+    def _on_scanned(self, generation: int, files: List[pathlib.Path]) -> None:
+        if self._is_cancelled(generation):
+            return
+
+        self._pending_scans -= 1
+        self._total += len(files)
+        for path in files:
+            self._thread_pool.start(
+                ProbeWorker(generation, path, self._signals, self._is_cancelled)
+            )
+        self._advance()
+
+    def _on_probed(self, generation: int, info: AudioFileInfo) -> None:
+        if self._is_cancelled(generation):
+            return
+
+        self.file_imported.emit(info)
+        self._done += 1
+        self._advance()
+
+    def _on_failed(self, generation: int, path: pathlib.Path, error: str) -> None:
+        if self._is_cancelled(generation):
+            return
+
+        self._failures.append(f"{path.name}: {error}")
+        self._done += 1
+        self._advance()
+
+    def _advance(self) -> None:
+        if self._pending_scans or self._done < self._total:
+            self._update_progress()
+        else:
+            self._finish(show_failures=True)
+
+    def _finish(self, show_failures: bool) -> None:
+        if self._progress is not None:
+            self._progress.canceled.disconnect(self.cancel)
+            self._progress.close()
+            self._progress.deleteLater()
+            self._progress = None
+
+        failures = self._failures
+        self._pending_scans = 0
+        self._total = 0
+        self._done = 0
+        self._failures = []
+
+        if show_failures and failures:
+            QMessageBox.warning(
+                self._parent_widget,
+                "Import",
+                "The following files could not be read:\n" + "\n".join(failures),
+            )
@@ -1,18 +1,23 @@
 from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import QLabel, QVBoxLayout
 
-from acat.ui.rubrics import make_rubrics
+from acat.backend.language_model import LanguageModel
+from acat.ui.rubrics import Rubrics
 from acat.ui.subwindow import SubWindow
 
 
 class HelpWindow(SubWindow):
     """The help window shown at the start of the application"""
 
-    def __init__(self):
+    def __init__(self, model: LanguageModel | None = None):
         super().__init__()
-        self.init_ui()
+        self.init_ui(model)
 
-    def init_ui(self):
+    def set_model(self, model: LanguageModel) -> None:
+        """Show the rubrics of another model"""
+        self._rubrics.set_model(model)
+
+    def init_ui(self, model: LanguageModel | None = None):
         self.setWindowTitle("Help Window")
 
         layout = QVBoxLayout()
@@ -44,6 +49,7 @@ class HelpWindow(SubWindow):
         # layout.addWidget(hyperlink_paragraph)
 
         # Rubrics
-        make_rubrics(layout)
+        self._rubrics = Rubrics(model)
+        layout.addWidget(self._rubrics)
 
         self.setLayout(layout)
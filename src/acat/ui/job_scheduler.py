@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import itertools
+import pathlib
+import traceback
+from collections import deque
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Set, Tuple
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+from acat.backend.language_model import LanguageModel
+
+JobKey = Tuple[pathlib.Path, LanguageModel]
+
+
+@dataclass(eq=False)
+class JudgeJob:
+    """Judging one audio file with one model, on behalf of one or more rows"""
+
+    job_id: int
+    path: pathlib.Path
+    model: LanguageModel
+    row_ids: Set[int] = field(default_factory=set)
+    cancelled: bool = False
+    # the future of the job in the process pool, once it was submitted there
+    future: Future | None = field(default=None, repr=False)
+
+    @property
+    def key(self) -> JobKey:
+        return self.path, self.model
+
+
+class JobSignals(QObject):
+    """Signals passing the results of jobs from the worker threads to the scheduler"""
+
+    finished = pyqtSignal(int, object, object)
+    failed = pyqtSignal(int, str)
+
+
+class JobWorker(QRunnable):
+    """A worker thread judging the score of one job
+
+    When an executor is given, the judging is dispatched to it and the thread only
+    waits for the result, so that a process pool can judge jobs in parallel.
+    """
+
+    def __init__(
+        self, job: JudgeJob, signals: JobSignals, executor: Executor | None = None
+    ) -> None:
+        super().__init__()
+        self.job = job
+        self.signals = signals
+        self.executor = executor
+
+    @pyqtSlot()
+    def run(self) -> None:
+        if self.job.cancelled:
+            # the scheduler still has to learn that the job is over
+            self.signals.finished.emit(self.job.job_id, None, None)
+            return
+
+        # imported here so that the analysis stack is not loaded before the UI shows
+        from acat.backend.judge_score import generate_praat_score_traced
+        from acat.backend.preprocess import PreprocessOptions
+
+        args = (self.job.path, self.job.model)
+        kwargs = {"preprocess": PreprocessOptions.from_env()}
+        try:
+            if self.executor is None:
+                score, trace = generate_praat_score_traced(*args, **kwargs)
+            else:
+                self.job.future = self.executor.submit(
+                    generate_praat_score_traced, *args, **kwargs
+                )
+                score, trace = self.job.future.result()
+        except Exception:
+            self.signals.failed.emit(self.job.job_id, traceback.format_exc())
+            return
+
+        self.signals.finished.emit(self.job.job_id, score, trace)
+
+
+class JobScheduler(QObject):
+    """Queues the judging of rows, running a limited number of jobs at once
+
+    Jobs are keyed by audio file and model, so asking for a file and model that is
+    already queued or running adds the row to that job instead of starting another.
+    Queued jobs can be cancelled or moved to the front of the queue. A running job
+    cannot be interrupted, but cancelling it drops its result.
+    """
+
+    # the row IDs of a job, its model, score and trace
+    job_finished = pyqtSignal(object, object, object, object)
+    # the row IDs of a job and the error
+    job_failed = pyqtSignal(object, str)
+    # the row IDs whose job was queued, started or ended
+    rows_changed = pyqtSignal(object)
+    # jobs done and jobs in total since the scheduler was last idle, jobs queued
+    progress_changed = pyqtSignal(int, int, int)
+
+    def __init__(
+        self,
+        get_executor: Callable[[], Executor | None],
+        max_workers: int,
+        parent: QObject | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self._get_executor = get_executor
+        self._max_workers = max_workers
+        self._thread_pool = QThreadPool()
+        self._thread_pool.setMaxThreadCount(max_workers)
+
+        self._signals = JobSignals()
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+
+        self._next_id = itertools.count()
+        self._queue: Deque[JudgeJob] = deque()
+        self._running: Dict[int, JudgeJob] = {}
+        self._jobs: Dict[JobKey, JudgeJob] = {}
+        self._row_jobs: Dict[int, JudgeJob] = {}
+        self._done = 0
+        self._total = 0
+
+    def set_max_workers(self, max_workers: int) -> None:
+        self._max_workers = max_workers
+        self._thread_pool.setMaxThreadCount(max_workers)
+        self._dispatch()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    def is_busy(self) -> bool:
+        return bool(self._queue or self._running)
+
+    def row_state(self, row_id: int) -> str | None:
+        """ "Queued" or "Judging" while a row has a job, `None` otherwise"""
+        job = self._row_jobs.get(row_id)
+        if job is None:
+            return None
+        return "Judging" if job.job_id in self._running else "Queued"
+
+    def submit(self, row_id: int, path: pathlib.Path, model: LanguageModel) -> None:
+        """Queue the judging of a row, joining the job of the same file and model"""
+        key = (path.absolute(), model)
+        if (current := self._row_jobs.get(row_id)) is not None:
+            if current.key == key:
+                return
+            self._detach_row(row_id)
+
+        job = self._jobs.get(key)
+        if job is None:
+            job = JudgeJob(next(self._next_id), *key)
+            self._jobs[key] = job
+            self._queue.append(job)
+            self._total += 1
+        job.row_ids.add(row_id)
+        self._row_jobs[row_id] = job
+
+        self.rows_changed.emit({row_id})
+        self._dispatch()
+
+    def prioritize(self, row_id: int) -> None:
+        """Move the queued job of a row to the front of the queue"""
+        job = self._row_jobs.get(row_id)
+        if job is None or job.job_id in self._running or self._queue[0] is job:
+            return
+        self._queue.remove(job)
+        self._queue.appendleft(job)
+
+    def cancel(self, row_id: int) -> None:
+        """Stop judging a row; its job is cancelled unless other rows wait for it"""
+        if self._detach_row(row_id):
+            self.rows_changed.emit({row_id})
+            self._dispatch()
+
+    def cancel_all(self) -> None:
+        row_ids = set(self._row_jobs)
+        for job in [*self._queue, *self._running.values()]:
+            self._cancel_job(job)
+        self.rows_changed.emit(row_ids)
+        self._emit_progress()
+        self._dispatch()
+
+    def _detach_row(self, row_id: int) -> bool:
+        job = self._row_jobs.pop(row_id, None)
+        if job is None:
+            return False
+        job.row_ids.discard(row_id)
+        if not job.row_ids:
+            self._cancel_job(job)
+            self._emit_progress()
+        return True
+
+    def _cancel_job(self, job: JudgeJob) -> None:
+        job.cancelled = True
+        for row_id in job.row_ids:
+            self._row_jobs.pop(row_id, None)
+        job.row_ids.clear()
+        if job.future is not None:
+            job.future.cancel()
+
+        self._jobs.pop(job.key, None)
+        if job.job_id in self._running:
+            # the worker cannot be interrupted, so its slot is only freed when it
+            # returns, and its result is dropped then
+            return
+        self._queue.remove(job)
+        self._done += 1
+
+    def _dispatch(self) -> None:
+        executor = None
+        while self._queue and len(self._running) < self._max_workers:
+            job = self._queue.popleft()
+            self._running[job.job_id] = job
+            if executor is None:
+                executor = self._get_executor()
+            self._thread_pool.start(JobWorker(job, self._signals, executor))
+            self.rows_changed.emit(set(job.row_ids))
+        self._emit_progress()
+
+    def _end_job(self, job_id: int) -> JudgeJob:
+        job = self._running.pop(job_id)
+        self._done += 1
+        if not job.cancelled:
+            self._jobs.pop(job.key, None)
+            for row_id in job.row_ids:
+                self._row_jobs.pop(row_id, None)
+        return job
+
+    def _on_finished(self, job_id: int, score, trace) -> None:
+        job = self._end_job(job_id)
+        if not job.cancelled:
+            self.job_finished.emit(set(job.row_ids), job.model, score, trace)
+            self.rows_changed.emit(set(job.row_ids))
+        self._dispatch()
+
+    def _on_failed(self, job_id: int, error: str) -> None:
+        job = self._end_job(job_id)
+        if not job.cancelled:
+            self.job_failed.emit(set(job.row_ids), error)
+            self.rows_changed.emit(set(job.row_ids))
+        self._dispatch()
+
+    def _emit_progress(self) -> None:
+        self.progress_changed.emit(self._done, self._total, len(self._queue))
+        if not self.is_busy():
+            self._done = 0
+            self._total = 0
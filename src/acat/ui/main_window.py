@@ -1,15 +1,29 @@
-import pathlib
-
-import pandas as pd
-from PyQt6.QtGui import QAction
-from PyQt6.QtWidgets import QFileDialog, QMainWindow, QWidget, QWidgetAction
+from __future__ import annotations
 
-from acat.backend.judge_score import LanguageModel
-from acat.ui.audio_file import AudioFileInfo, PraatScore
+import pathlib
+from typing import List
+
+from PyQt6.QtGui import QAction, QCloseEvent, QDragEnterEvent, QDropEvent
+from PyQt6.QtWidgets import (
+    QFileDialog,
+    QMainWindow,
+    QMessageBox,
+    QWidget,
+    QWidgetAction,
+)
+
+from acat.backend.audio_probe import AUDIO_EXTENSIONS
+from acat.backend.export import EXPORT_FORMATS, ExportSink, open_export_sink
+from acat.backend.language_model import LanguageModel
+from acat.backend.praat_score import EXPORT_COLUMNS, export_row
+from acat.backend.tracing import timing_columns, timing_row
 from acat.ui.content_view import ContentView
+from acat.ui.file_import import FileImporter
 from acat.ui.help_window import HelpWindow
 from acat.ui.ModelChooser import ModelComboChooser
 
+_ALL_FILES = "All Files (*)"
+
 
 class MainWindow(QMainWindow):
     """The main UI window of ACAT"""
@@ -18,6 +32,7 @@ class MainWindow(QMainWindow):
         super().__init__()
 
         self._help_window = None
+        self._live_export_sink: ExportSink | None = None
 
         self.setWindowTitle("ACAT")
         self.resize(800, 600)
@@ -25,6 +40,9 @@ class MainWindow(QMainWindow):
         self._create_actions()
         self._make_toolbar()
         self._make_content()
+        self._make_importer()
+
+        self.setAcceptDrops(True)
 
     def show(self) -> None:
         super().show()
@@ -32,7 +50,7 @@ class MainWindow(QMainWindow):
 
     def _show_help_window(self) -> None:
         if self._help_window is None:
-            self._help_window = HelpWindow()
+            self._help_window = HelpWindow(self.get_current_model())
 
         self.show_window(self._help_window)
 
@@ -62,76 +80,146 @@ class MainWindow(QMainWindow):
         self._choose_action = QAction("&Choose Audio", self)
         self._choose_action.triggered.connect(self._choose_file)
 
+        self._choose_folder_action = QAction("Choose &Folder", self)
+        self._choose_folder_action.triggered.connect(self._choose_folder)
+
         self._evaluate_all_action = QAction("&Judge All", self)
         self._evaluate_all_action.triggered.connect(self._judge_all_rows)
 
+        self._cancel_all_action = QAction("&Cancel All", self)
+        self._cancel_all_action.setToolTip("Stop judging every queued or running file")
+        self._cancel_all_action.setEnabled(False)
+
         self._export_action = QAction("&Export", self)
-        self._export_action.triggered.connect(self._export_to_csv)
+        self._export_action.triggered.connect(self._export_results)
+
+        self._live_export_action = QAction("Export &While Judging", self)
+        self._live_export_action.setCheckable(True)
+        self._live_export_action.setToolTip(
+            "Append the results of each file to a file as soon as it is judged"
+        )
+        self._live_export_action.toggled.connect(self._toggle_live_export)
+
+        self._export_timings_action = QAction("Export &Timings", self)
+        self._export_timings_action.setCheckable(True)
+        self._export_timings_action.setToolTip(
+            "Add the time spent in each stage of the analysis to the export"
+        )
 
         self._help_action = QAction("&Help", self)
         self._help_action.triggered.connect(self._show_help_window)
 
         self._model_box = ModelComboChooser()
+        self._model_box.currentTextChanged.connect(self._model_changed)
         self._model_choose_action = QAction("&Choose Native Language", self)
         self._widget_action = QWidgetAction(self)
         self._widget_action.setDefaultWidget(self._model_box)
 
-    def _export_results_as_df(self) -> pd.DataFrame:
-        """Export data score as data frame"""
-        data = []
-
-        # dump scores into a 2d array
-        for audio_file in self._content_view.table.data:
-            file_name = audio_file.file_name
-            file_path = str(audio_file.path)
-
-            all_data = PraatScore.all_data_or_none(audio_file.score)
-
-            data.append([file_name, file_path, *all_data])
-
-        # make a dara frame for dumping
-        df = pd.DataFrame(
-            data,
-            columns=[
-                "File Name",
-                "File Path",
-                "Comprehensibility Score",
-                "Nativelikeness Score",
-                "speechrate",
-                "pauses",
-                "rangef0",
-                "sdsylldur",
-                "coeff1",
-                "coeff2",
-                "coeff3",
-            ],
-        )
-        return df
+    def _export_columns(self) -> List[str]:
+        timings = self._export_timings_action.isChecked()
+        return EXPORT_COLUMNS + (timing_columns() if timings else [])
 
-    def _export_to_csv(self) -> None:
-        """Dump the data into a CSV file"""
-        file_path, _ = QFileDialog.getSaveFileName(
-            self, "Save File", "", "CSV Files (*.csv);;All Files (*)"
+    def _open_export_sink(self) -> ExportSink | None:
+        """Ask for a file to export to, in the format of its suffix"""
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Save File", "", ";;".join([*EXPORT_FORMATS.values(), _ALL_FILES])
+        )
+        if not file_path:
+            return None
+        path = pathlib.Path(file_path)
+        if not path.suffix:
+            # the dialog does not add the suffix of the chosen format everywhere
+            suffixes = {name: suffix for suffix, name in EXPORT_FORMATS.items()}
+            path = path.with_name(path.name + suffixes.get(selected_filter, ".csv"))
+        try:
+            return open_export_sink(path, self._export_columns())
+        except ImportError:
+            QMessageBox.critical(
+                self,
+                "Error",
+                "Exporting to Parquet needs pyarrow, install acat[parquet].",
+            )
+        except (ValueError, OSError) as e:
+            QMessageBox.critical(self, "Error", f"Cannot export there: {e}")
+        return None
+
+    def _export_results(self) -> None:
+        """Write the results of every row to a file, one row at a time"""
+        if (sink := self._open_export_sink()) is None:
+            return
+        timings = self._export_timings_action.isChecked()
+        with sink:
+            for audio_file in self._content_view.table.data:
+                sink.write_row(
+                    export_row(audio_file.path, audio_file.score)
+                    + (timing_row(audio_file.trace) if timings else [])
+                )
+
+    def _toggle_live_export(self, checked: bool) -> None:
+        """Start or stop appending each judged file to an export file"""
+        table = self._content_view.table
+        if not checked:
+            table.set_export_sink(None)
+            self._export_timings_action.setEnabled(True)
+            if self._live_export_sink is not None:
+                self._live_export_sink.close()
+                self._live_export_sink = None
+                self.statusBar().showMessage("Stopped exporting while judging", 5000)
+            return
+
+        self._live_export_sink = self._open_export_sink()
+        if self._live_export_sink is None:
+            # unchecking it again does not open another dialog, since there is no sink
+            self._live_export_action.setChecked(False)
+            return
+        # the timings are part of the layout of the file, so they cannot change
+        self._export_timings_action.setEnabled(False)
+        table.set_export_sink(
+            self._live_export_sink, self._export_timings_action.isChecked()
         )
-        if file_path:
-            df = self._export_results_as_df()
-            df.to_csv(file_path, index=False)
+
+    def closeEvent(self, event: QCloseEvent) -> None:
+        self._live_export_action.setChecked(False)
+        super().closeEvent(event)
 
     def _choose_file(self) -> None:
         files, _ = QFileDialog.getOpenFileNames(
             self,
             "Select Audio Files",
             "",
-            "Audio Files (*.wav *.mp3 *.py)",
+            f"Audio Files ({' '.join(f'*{ext}' for ext in AUDIO_EXTENSIONS)})",
         )
 
-        file_info = [AudioFileInfo(pathlib.Path(file)) for file in files]
+        self._importer.import_paths(pathlib.Path(file) for file in files)
+
+    def _choose_folder(self) -> None:
+        folder = QFileDialog.getExistingDirectory(self, "Select Audio Folder")
+        if folder:
+            self._importer.import_paths([pathlib.Path(folder)])
 
-        self._content_view.table.add_rows(file_info)
+    def dragEnterEvent(self, event: QDragEnterEvent) -> None:
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+
+    def dropEvent(self, event: QDropEvent) -> None:
+        paths = [
+            pathlib.Path(url.toLocalFile())
+            for url in event.mimeData().urls()
+            if url.isLocalFile()
+        ]
+        self._importer.import_paths(paths)
+        event.acceptProposedAction()
 
     def _judge_all_rows(self) -> None:
         self._content_view.table.judge_all_scores(self.get_current_model())
 
+    def _model_changed(self) -> None:
+        if self._help_window is not None:
+            self._help_window.set_model(self.get_current_model())
+
+    def start_workers(self) -> None:
+        self._content_view.table.start_workers()
+
     def get_current_model(self) -> LanguageModel:
         return LanguageModel(self._model_box.currentText())
 
@@ -141,9 +229,11 @@ class MainWindow(QMainWindow):
         top_toolbar.setMovable(False)
         # choose file action
         top_toolbar.addAction(self._choose_action)
+        top_toolbar.addAction(self._choose_folder_action)
         top_toolbar.addSeparator()
         # evaluate all audio action
         top_toolbar.addAction(self._evaluate_all_action)
+        top_toolbar.addAction(self._cancel_all_action)
         top_toolbar.addSeparator()
         # file mode toggle
         # self._file_mode_toggle = FileModeToggle(parent=top_toolbar)
@@ -151,6 +241,8 @@ class MainWindow(QMainWindow):
         # top_toolbar.addSeparator()
         # export results action
         top_toolbar.addAction(self._export_action)
+        top_toolbar.addAction(self._live_export_action)
+        top_toolbar.addAction(self._export_timings_action)
         top_toolbar.addSeparator()
         # help action
         top_toolbar.addAction(self._help_action)
@@ -162,3 +254,23 @@ class MainWindow(QMainWindow):
     def _make_content(self) -> None:
         self._content_view = ContentView()
         self.setCentralWidget(self._content_view)
+
+        table = self._content_view.table
+        self._cancel_all_action.triggered.connect(table.cancel_all_jobs)
+        table.progress_changed.connect(self._show_progress)
+
+    def _show_progress(self, done: int, total: int, queued: int) -> None:
+        """Show how far judging has got in the status bar"""
+        busy = done < total
+        self._cancel_all_action.setEnabled(busy)
+        if busy:
+            self.statusBar().showMessage(
+                f"Judging: {done} of {total} jobs done, {queued} queued"
+            )
+        elif total:
+            self.statusBar().showMessage(f"Finished {total} jobs", 5000)
+
+    def _make_importer(self) -> None:
+        """Files chosen, dropped or found in folders are all imported in the background"""
+        self._importer = FileImporter(self)
+        self._importer.file_imported.connect(self._content_view.table.add_row)
@@ -3,7 +3,7 @@ from typing import Self
 from PyQt6.QtWidgets import QLabel, QVBoxLayout
 
 from acat.ui.audio_file import AudioFileInfo
-from acat.ui.rubrics import make_rubrics
+from acat.ui.rubrics import Rubrics
 from acat.ui.subwindow import SubWindow
 
 
@@ -21,7 +21,8 @@ class ResultPopup(SubWindow):
         self.layout.addWidget(self.comprehensibility_label)
         self.layout.addWidget(self.nativelikeness_label)
 
-        make_rubrics(self.layout)
+        self.rubrics = Rubrics()
+        self.layout.addWidget(self.rubrics)
 
     def update_content(self, audio_info: AudioFileInfo) -> Self:
         self.title_label.setText(f'<h1>The score of "{audio_info.file_name}"</h1>')
@@ -32,6 +33,9 @@ class ResultPopup(SubWindow):
             f"<p>Nativelikeness: <bold>{audio_info.nativelikeness_str}</bold></p>"
         )
 
+        if audio_info.model is not None:
+            self.rubrics.set_model(audio_info.model)
+
         self.setWindowTitle(f"Audio Details Of {audio_info.file_name}")
 
         return self
@@ -1,4 +1,6 @@
-from typing import Iterable, List, Tuple
+from __future__ import annotations
+
+from typing import List, Sequence, Tuple
 
 from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import (
@@ -6,45 +8,51 @@ from PyQt6.QtWidgets import (
     QLayout,
     QTableWidget,
     QTableWidgetItem,
+    QVBoxLayout,
+    QWidget,
 )
 
-COMP_DATA = {
-    "2.171 - 3.409": "Low comprehensibility – representing inexperienced L2 learners’ speech (no immersion experience)",
-    "3.492 - 4.308": "Mid comprehensibility – representing moderately experienced L2 learners’ speech (LOR 1 month to 5 years)",
-    "5.378 - 6.147": "High comprehensibility- representing long-term L2 residents’ speech (LOR 6-18 years)",
-    "7.6": "Near-native L2 speaker (maximum)",
-    "8.714 - 8.926": "Native speakers of English",
-}
+from acat.backend.language_model import LanguageModel, default_model, load_model
 
-NAT_DATA = {
-    "1.445 - 1.955": "Low nativelikeness – representing inexperienced L2 learners’ speech (no immersion experience)",
-    "2.312 - 3.053": "Mid nativelikeness – representing moderately experienced L2 learners’ speech (LOR 1 month to 5 years)",
-    "3.852 - 4.668": "High nativelikeness - representing long-term L2 residents’ speech (LOR 6-18 years)",
-    "6.9": "Near-native L2 speaker (maximum)",
-    "8.450 - 8.930": "Native speakers of English",
-}
 
+def make_rubrics(layout: QLayout, model: LanguageModel | None = None) -> None:
+    """Add the rubric bands of a model (the default one if not given) to a layout"""
+    definition = load_model(model or default_model())
 
-def make_rubrics(layout: QLayout) -> None:
     # Heading
     intro_text = QLabel("<h2>How to interpret</h2>")
     layout.addWidget(intro_text)
 
-    # First Table: Comprehensibility Score
-    comp_label = QLabel("<h3>comprehensibility score</h3>")
-    layout.addWidget(comp_label)
-    comp_headers = ["Comprehensibility Score", "Suggested interpretation"]
-    _create_table(layout, comp_headers, COMP_DATA.items())
+    # A table per output, e.g. comprehensibility and nativelikeness
+    for output, bands in definition.rubrics.items():
+        layout.addWidget(QLabel(f"<h3>{output} score</h3>"))
+        headers = [f"{output.capitalize()} Score", "Suggested interpretation"]
+        _create_table(layout, headers, bands)
+
+
+class Rubrics(QWidget):
+    """The rubrics of a model, which can be switched to those of another model"""
+
+    def __init__(self, model: LanguageModel | None = None) -> None:
+        super().__init__()
+        self._layout = QVBoxLayout(self)
+        self._layout.setContentsMargins(0, 0, 0, 0)
+        self._model: LanguageModel | None = None
+        self.set_model(model or default_model())
+
+    def set_model(self, model: LanguageModel) -> None:
+        if model == self._model:
+            return
+        self._model = model
 
-    # Second Table: Nativelikeness Score
-    nat_label = QLabel("<h3>nativelikeness score</h3>")
-    layout.addWidget(nat_label)
-    nat_headers = ["Nativelikeness Score", "Suggested interpretation"]
-    _create_table(layout, nat_headers, NAT_DATA.items())
+        while (item := self._layout.takeAt(0)) is not None:
+            if widget := item.widget():
+                widget.deleteLater()
+        make_rubrics(self._layout, model)
 
 
 def _create_table(
-    layout: QLayout, headers: List[str], data: Iterable[Tuple[str, str]]
+    layout: QLayout, headers: List[str], data: Sequence[Tuple[str, str]]
 ) -> None:
     table_style = (
         "QTableWidget {border: 1px solid black;}"
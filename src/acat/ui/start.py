@@ -1,5 +1,8 @@
+from PyQt6.QtCore import QTimer
 from PyQt6.QtWidgets import QApplication
 
+from acat.backend.executor import shutdown_process_pool
+from acat.backend.warmup import start_backend_warmup
 from acat.ui.main_window import MainWindow
 from acat.ui.window_management import get_main_window, set_main_window
 
@@ -10,5 +13,11 @@ def start_application() -> None:
 
     set_main_window(MainWindow())
     get_main_window().show()
+    # once the window is up, load the analysis stack and start the workers while
+    # the user picks files
+    QTimer.singleShot(0, start_backend_warmup)
+    QTimer.singleShot(0, get_main_window().start_workers)
 
     app.exec()
+
+    shutdown_process_pool()
@@ -0,0 +1,77 @@
+import os
+import wave
+
+import pytest
+
+from acat.backend.audio_cache import AudioCache
+
+FRAMES = 1000
+# each file decodes to 2000 bytes of 16-bit mono samples
+FILE_SIZE = 2 * FRAMES
+
+
+@pytest.fixture
+def files(tmp_path) -> list:
+    paths = []
+    for name in "abc":
+        path = tmp_path / f"{name}.wav"
+        with wave.open(str(path), "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(8000)
+            f.writeframes(bytes(2 * FRAMES))
+        paths.append(path)
+    return paths
+
+
+def test_hits_return_the_decoded_audio(files):
+    cache = AudioCache()
+
+    audio = cache.get(files[0])
+
+    assert cache.get(files[0]) is audio
+    stats = cache.stats()
+    assert (stats["entries"], stats["size_bytes"]) == (1, FILE_SIZE)
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_evicts_the_least_recently_used_file(files):
+    a, b, c = files
+    cache = AudioCache(max_size_bytes=2 * FILE_SIZE)
+    audio_a = cache.get(a)
+    audio_b = cache.get(b)
+    # using a makes b the least recently used
+    cache.get(a)
+
+    cache.get(c)
+
+    assert cache.stats()["size_bytes"] == 2 * FILE_SIZE
+    assert cache.get(a) is audio_a
+    assert cache.get(b) is not audio_b
+
+
+def test_files_larger_than_the_budget_are_not_kept(files):
+    cache = AudioCache(max_size_bytes=FILE_SIZE - 1)
+
+    assert cache.get(files[0]) is not cache.get(files[0])
+    assert cache.stats()["entries"] == 0
+
+
+def test_changed_files_are_decoded_again(files):
+    cache = AudioCache()
+    audio = cache.get(files[0])
+    stat = files[0].stat()
+    os.utime(files[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert cache.get(files[0]) is not audio
+
+
+def test_evict_drops_a_file(files):
+    cache = AudioCache()
+    audio = cache.get(files[0])
+    cache.get(files[1])
+
+    cache.evict(files[0])
+
+    assert cache.stats()["size_bytes"] == FILE_SIZE
+    assert cache.get(files[0]) is not audio
@@ -0,0 +1,88 @@
+import struct
+import wave
+
+import pytest
+
+from acat.backend.audio_probe import read_wav_layout
+
+
+def _write_wav(path, channels=2, sample_rate=8000, sample_width=2, frames=800):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(channels)
+        f.setsampwidth(sample_width)
+        f.setframerate(sample_rate)
+        f.writeframes(bytes(frames * channels * sample_width))
+
+
+def _riff(*chunks: bytes) -> bytes:
+    body = b"WAVE" + b"".join(chunks)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def _chunk(chunk_id: bytes, data: bytes, size: int | None = None) -> bytes:
+    size = len(data) if size is None else size
+    return chunk_id + struct.pack("<I", size) + data + b"\0" * (len(data) % 2)
+
+
+def test_pcm_layout(tmp_path):
+    path = tmp_path / "a.wav"
+    _write_wav(path)
+
+    layout = read_wav_layout(path)
+
+    assert (layout.audio_format, layout.channels, layout.sample_rate) == (1, 2, 8000)
+    assert (layout.block_align, layout.bits_per_sample) == (4, 16)
+    assert layout.data_offset == 44
+    assert layout.data_size == 3200
+    assert layout.duration == pytest.approx(0.1)
+
+
+def test_extensible_layout_reads_the_sub_format(tmp_path):
+    fmt = struct.pack("<HHIIHH", 0xFFFE, 1, 8000, 32000, 4, 32)
+    extension = struct.pack("<HHI", 22, 32, 4) + struct.pack("<H", 3) + bytes(14)
+    path = tmp_path / "a.wav"
+    path.write_bytes(
+        _riff(_chunk(b"fmt ", fmt + extension), _chunk(b"data", bytes(400)))
+    )
+
+    layout = read_wav_layout(path)
+
+    assert layout.audio_format == 3
+    assert layout.data_size == 400
+
+
+def test_skips_other_chunks_and_clamps_an_interrupted_data_chunk(tmp_path):
+    fmt = struct.pack("<HHIIHH", 1, 1, 8000, 16000, 2, 16)
+    path = tmp_path / "a.wav"
+    path.write_bytes(
+        _riff(
+            _chunk(b"LIST", b"odd"),
+            _chunk(b"fmt ", fmt),
+            # the recorder stopped before writing the size of its samples
+            _chunk(b"data", bytes(101), size=0xFFFFFFFF)[:-1],
+        )
+    )
+
+    layout = read_wav_layout(path)
+
+    assert layout.data_size == 100
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        b"",
+        b"RIFF\0\0\0\0AVI ",
+        _riff(_chunk(b"data", bytes(4))),
+        _riff(_chunk(b"fmt ", bytes(16))),
+        # a format chunk cut off after 10 of its 16 bytes
+        _riff(b"fmt " + struct.pack("<I", 16) + bytes(10)),
+    ],
+    ids=["empty", "not-wave", "no-format", "no-data", "truncated-format"],
+)
+def test_invalid_files_raise_value_error(tmp_path, content):
+    path = tmp_path / "a.wav"
+    path.write_bytes(content)
+
+    with pytest.raises(ValueError):
+        read_wav_layout(path)
@@ -0,0 +1,65 @@
+import pytest
+
+from acat.backend import cache as cache_module
+from acat.backend.cache import ResultCache
+from acat.backend.praat_score import PraatScore
+
+SCORE = PraatScore(7.5, 6.25, 2.5, 3.0, 40.0, -0.5, -0.5, -0.75, -1.25)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Advance the clock of the cache by a second on every reading"""
+    now = iter(range(1_000_000))
+    monkeypatch.setattr(cache_module.time, "time", lambda: float(next(now)))
+
+
+def _put(cache: ResultCache, audio_hash: str, model: str = "model") -> str:
+    key = ResultCache.make_key(audio_hash, model, "v1")
+    cache.put(key, SCORE, audio_hash, model, "v1")
+    return key
+
+
+def _entry_size(tmp_path) -> int:
+    cache = ResultCache(tmp_path / "size.sqlite3")
+    _put(cache, "a" * 64)
+    return cache.stats()["size_bytes"]
+
+
+def test_put_and_get(tmp_path):
+    cache = ResultCache(tmp_path / "results.sqlite3")
+    key = _put(cache, "a" * 64)
+
+    assert cache.get(key) == SCORE
+    assert cache.get(ResultCache.make_key("a" * 64, "model", "v2")) is None
+
+
+def test_evicts_least_recently_used_entries(tmp_path, clock):
+    cache = ResultCache(tmp_path / "results.sqlite3", 2 * _entry_size(tmp_path))
+    first = _put(cache, "a" * 64)
+    second = _put(cache, "b" * 64)
+    # reading the first entry makes the second one the least recently used
+    assert cache.get(first) is not None
+
+    third = _put(cache, "c" * 64)
+
+    assert cache.get(second) is None
+    assert cache.get(first) is not None
+    assert cache.get(third) is not None
+    assert cache.stats()["entries"] == 2
+
+
+def test_invalidate_by_model_and_audio(tmp_path):
+    cache = ResultCache(tmp_path / "results.sqlite3")
+    kept = _put(cache, "a" * 64, "english")
+    by_model = _put(cache, "a" * 64, "japanese")
+    by_audio = _put(cache, "b" * 64, "english")
+
+    assert cache.invalidate(model="japanese") == 1
+    assert cache.get(by_model) is None
+    assert cache.invalidate(audio_hash="b" * 64) == 1
+    assert cache.get(by_audio) is None
+    assert cache.get(kept) is not None
+
+    assert cache.invalidate() == 1
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,19 @@
+import pathlib
+
+from acat.cli import _in_directory
+
+
+def test_in_directory_compares_path_components():
+    directory = pathlib.Path("/data/cor")
+
+    assert _in_directory("/data/cor/a.wav", directory)
+    assert _in_directory("/data/cor/speaker/a.wav", directory)
+    assert not _in_directory("/data/corp/a.wav", directory)
+    assert not _in_directory("/data/a.wav", directory)
+
+
+def test_in_directory_resolves_relative_paths(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    assert _in_directory(tmp_path / "cor" / "a.wav", pathlib.Path("cor"))
+    assert not _in_directory(tmp_path / "corp" / "a.wav", pathlib.Path("cor"))
@@ -0,0 +1,71 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from acat.backend import executor as executor_module
+from acat.backend.executor import ExecutorConfig, ExecutorKind, RecyclingProcessPool
+
+
+class _Pool(ThreadPoolExecutor):
+    """A thread pool standing in for a warm process pool"""
+
+    def __init__(self, max_workers: int) -> None:
+        super().__init__(max_workers)
+        self.is_shut_down = False
+
+    def shutdown(self, wait=True, *, cancel_futures=False) -> None:
+        self.is_shut_down = True
+        super().shutdown(wait, cancel_futures=cancel_futures)
+
+
+@pytest.fixture
+def pools(monkeypatch) -> list:
+    pools = []
+
+    def create_process_pool(max_workers, warm_up=False):
+        assert warm_up
+        pools.append(_Pool(max_workers))
+        return pools[-1]
+
+    monkeypatch.setattr(executor_module, "create_process_pool", create_process_pool)
+    return pools
+
+
+def test_replaces_the_pool_every_max_jobs_jobs(pools):
+    pool = RecyclingProcessPool(max_workers=2, max_jobs=3)
+    # the workers of a new pool are started right away
+    assert len(pools) == 1
+
+    futures = [pool.submit(pow, 2, n) for n in range(7)]
+
+    assert [future.result() for future in futures] == [2**n for n in range(7)]
+    assert len(pools) == 3
+    assert [p.is_shut_down for p in pools] == [True, True, False]
+    pool.shutdown()
+    assert pools[-1].is_shut_down
+
+
+def test_jobs_of_a_replaced_pool_still_finish(pools):
+    release = threading.Event()
+    pool = RecyclingProcessPool(max_workers=1, max_jobs=1)
+
+    running = pool.submit(release.wait, 10)
+    queued = pool.submit(pow, 2, 10)
+    release.set()
+
+    assert running.result() is True
+    assert queued.result() == 1024
+    pool.shutdown()
+
+
+def test_config_from_env(monkeypatch):
+    monkeypatch.setenv("ACAT_EXECUTOR", "Thread")
+    monkeypatch.setenv("ACAT_WORKERS", "0")
+    monkeypatch.setenv("ACAT_WORKER_MAX_JOBS", "20")
+
+    config = ExecutorConfig.from_env()
+
+    assert config.kind == ExecutorKind.Thread
+    assert config.max_workers == 1
+    assert config.max_jobs == 20
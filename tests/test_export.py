@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+
+import numpy as np
+import pytest
+
+from acat.backend.export import ExportSink, open_export_sink
+
+COLUMNS = ["File Name", "Score"]
+
+
+def _read_csv(path) -> list:
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_csv_writes_a_header_and_rows(tmp_path):
+    path = tmp_path / "scores.csv"
+    with open_export_sink(path, COLUMNS) as sink:
+        sink.write_rows([["a.wav", 1.5], ["b.wav", 2.5]])
+
+    assert _read_csv(path) == [COLUMNS, ["a.wav", "1.5"], ["b.wav", "2.5"]]
+
+
+def test_csv_overwrites_without_append(tmp_path):
+    path = tmp_path / "scores.csv"
+    path.write_text("stale\n")
+    with open_export_sink(path, COLUMNS) as sink:
+        sink.write_row(["a.wav", 1.5])
+
+    assert _read_csv(path) == [COLUMNS, ["a.wav", "1.5"]]
+
+
+def test_csv_append_writes_the_header_once(tmp_path):
+    path = tmp_path / "scores.csv"
+    for row in (["a.wav", 1.5], ["b.wav", 2.5]):
+        with open_export_sink(path, COLUMNS, append=True) as sink:
+            sink.write_row(row)
+
+    assert _read_csv(path) == [COLUMNS, ["a.wav", "1.5"], ["b.wav", "2.5"]]
+
+
+def test_csv_append_to_an_empty_file_writes_the_header(tmp_path):
+    path = tmp_path / "scores.csv"
+    path.touch()
+    with open_export_sink(path, COLUMNS, append=True) as sink:
+        sink.write_row(["a.wav", 1.5])
+
+    assert _read_csv(path) == [COLUMNS, ["a.wav", "1.5"]]
+
+
+def test_json_lines_append(tmp_path):
+    path = tmp_path / "scores.jsonl"
+    for row in (["a.wav", 1.5], ["b.wav", 2.5]):
+        with open_export_sink(path, COLUMNS, append=True) as sink:
+            sink.write_row(row)
+
+    assert [json.loads(line) for line in path.read_text().splitlines()] == [
+        {"File Name": "a.wav", "Score": 1.5},
+        {"File Name": "b.wav", "Score": 2.5},
+    ]
+
+
+def test_unknown_suffix_and_parquet_append_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        open_export_sink(tmp_path / "scores.txt", COLUMNS)
+    with pytest.raises(ValueError):
+        open_export_sink(tmp_path / "scores.parquet", COLUMNS, append=True)
+
+
+def test_csv_writes_missing_values_as_empty_cells(tmp_path):
+    path = tmp_path / "scores.csv"
+    with open_export_sink(path, COLUMNS) as sink:
+        sink.write_row(["a.wav", np.float64("nan")])
+        sink.write_row(["b.wav", float("nan")])
+
+    assert _read_csv(path) == [COLUMNS, ["a.wav", ""], ["b.wav", ""]]
+
+
+def test_json_lines_write_missing_values_as_null(tmp_path):
+    path = tmp_path / "scores.jsonl"
+    with open_export_sink(path, COLUMNS) as sink:
+        sink.write_row(["a.wav", np.float64("nan")])
+
+    assert json.loads(path.read_text()) == {"File Name": "a.wav", "Score": None}
+
+
+def test_sinks_must_implement_write():
+    with pytest.raises(TypeError):
+        ExportSink(io.StringIO(), COLUMNS)
@@ -0,0 +1,16 @@
+import logging
+
+from acat.backend import feature_store
+
+
+def test_warnings_are_logged_by_the_parent_process_only(monkeypatch, caplog):
+    caplog.set_level(logging.DEBUG, logger=feature_store.__name__)
+
+    feature_store._warn("in the parent")
+    monkeypatch.setattr(feature_store.multiprocessing, "parent_process", object)
+    feature_store._warn("in a worker")
+
+    assert [(r.levelno, r.message) for r in caplog.records] == [
+        (logging.WARNING, "in the parent"),
+        (logging.DEBUG, "in a worker"),
+    ]
@@ -0,0 +1,121 @@
+import pathlib
+import threading
+import time
+from concurrent.futures import Executor, Future
+
+import pytest
+from PyQt6.QtCore import QCoreApplication
+
+from acat.backend.language_model import LanguageModel
+from acat.ui.job_scheduler import JobScheduler
+
+MODEL = LanguageModel("Japanese")
+A, B, C = (pathlib.Path(f"/data/{name}.wav") for name in "abc")
+
+
+class RecordingExecutor(Executor):
+    """Judges every job at once with a made-up score, recording the files"""
+
+    def __init__(self) -> None:
+        self.paths = []
+        self._lock = threading.Lock()
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        with self._lock:
+            self.paths.append(args[0])
+        future = Future()
+        future.set_result((f"score of {args[0].name}", None))
+        return future
+
+
+@pytest.fixture(scope="module")
+def app() -> QCoreApplication:
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture
+def executor() -> RecordingExecutor:
+    return RecordingExecutor()
+
+
+@pytest.fixture
+def scheduler(app, executor) -> JobScheduler:
+    # no workers, so that jobs stay queued until a test starts them
+    return JobScheduler(lambda: executor, max_workers=0)
+
+
+def _run_until_idle(scheduler: JobScheduler) -> None:
+    deadline = time.monotonic() + 10
+    while scheduler.is_busy():
+        assert time.monotonic() < deadline, "the scheduler did not become idle"
+        QCoreApplication.processEvents()
+        time.sleep(0.001)
+
+
+def test_rows_of_the_same_file_and_model_share_a_job(scheduler, executor):
+    finished = []
+    scheduler.job_finished.connect(lambda rows, *result: finished.append(rows))
+
+    scheduler.submit(1, A, MODEL)
+    scheduler.submit(2, A, MODEL)
+    scheduler.submit(3, B, MODEL)
+
+    assert scheduler.queue_depth == 2
+    assert [scheduler.row_state(row) for row in (1, 2, 3)] == ["Queued"] * 3
+
+    scheduler.set_max_workers(1)
+    _run_until_idle(scheduler)
+
+    assert executor.paths == [A, B]
+    assert finished == [{1, 2}, {3}]
+    assert scheduler.row_state(1) is None
+
+
+def test_submitting_another_file_moves_the_row(scheduler):
+    scheduler.submit(1, A, MODEL)
+    scheduler.submit(1, B, MODEL)
+
+    assert scheduler.queue_depth == 1
+    scheduler.submit(2, A, MODEL)
+    assert scheduler.queue_depth == 2
+
+
+def test_cancel_keeps_jobs_other_rows_wait_for(scheduler, executor):
+    scheduler.submit(1, A, MODEL)
+    scheduler.submit(2, A, MODEL)
+    scheduler.submit(3, B, MODEL)
+
+    scheduler.cancel(1)
+    assert scheduler.queue_depth == 2
+    assert scheduler.row_state(1) is None
+    assert scheduler.row_state(2) == "Queued"
+
+    scheduler.cancel(2)
+    assert scheduler.queue_depth == 1
+
+    scheduler.set_max_workers(1)
+    _run_until_idle(scheduler)
+    assert executor.paths == [B]
+
+
+def test_cancel_all(scheduler, executor):
+    for row, path in enumerate((A, B, C)):
+        scheduler.submit(row, path, MODEL)
+
+    scheduler.cancel_all()
+
+    assert not scheduler.is_busy()
+    scheduler.set_max_workers(1)
+    _run_until_idle(scheduler)
+    assert executor.paths == []
+
+
+def test_prioritize_moves_a_job_to_the_front(scheduler, executor):
+    for row, path in enumerate((A, B, C)):
+        scheduler.submit(row, path, MODEL)
+
+    scheduler.prioritize(2)
+    scheduler.set_max_workers(1)
+    _run_until_idle(scheduler)
+
+    assert executor.paths == [C, A, B]
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from acat.backend import language_model
+from acat.backend.language_model import (
+    LanguageModel,
+    _discover_models,
+    _parse_model,
+    load_model,
+)
+from acat.backend.scoring import FEATURES
+
+JAPANESE_COMPREHENSIBILITY = (2.701, 0.015, -0.020, 3.821, -1.414, -5.549, 3.228)
+
+MODEL = b"""
+description = "Test learners"
+features = ["speechrate", "pauses"]
+
+[outputs.comprehensibility]
+intercept = 1.0
+weights = [2.0, 0.5]
+
+[outputs.nativelikeness]
+intercept = -1.0
+weights = [1.5, -0.25]
+
+[[rubrics.comprehensibility]]
+score = "1 - 2"
+interpretation = "Low"
+"""
+
+
+def test_parse_model():
+    model = _parse_model("Test", MODEL)
+
+    assert model.description == "Test learners"
+    assert model.features == ("speechrate", "pauses")
+    assert model.intercepts == {"comprehensibility": 1.0, "nativelikeness": -1.0}
+    assert model.weights["nativelikeness"] == (1.5, -0.25)
+    assert model.rubrics == {"comprehensibility": (("1 - 2", "Low"),)}
+
+
+def test_digest_follows_the_content():
+    edited = MODEL.replace(b"intercept = 1.0", b"intercept = 1.5")
+
+    assert _parse_model("Test", MODEL).digest != _parse_model("Test", edited).digest
+
+
+def test_unused_features_get_a_weight_of_zero():
+    scoring_model = _parse_model("Test", MODEL).scoring_model()
+
+    np.testing.assert_array_equal(scoring_model.intercepts, [1.0, -1.0])
+    expected = np.zeros((2, len(FEATURES)))
+    expected[:, :2] = [[2.0, 0.5], [1.5, -0.25]]
+    np.testing.assert_array_equal(scoring_model.weights, expected)
+
+
+def test_invalid_models_raise_value_error():
+    with pytest.raises(ValueError):
+        _parse_model("Test", MODEL.replace(b"[2.0, 0.5]", b"[2.0]"))
+    with pytest.raises(ValueError):
+        _parse_model(
+            "Test", MODEL.replace(b'"pauses"]', b'"loudness"]')
+        ).scoring_model()
+    with pytest.raises(ValueError):
+        _parse_model(
+            "Test", MODEL.replace(b"nativelikeness]", b"fluency]")
+        ).scoring_model()
+
+
+def test_bundled_japanese_model():
+    model = load_model(LanguageModel("Japanese"))
+
+    assert model.intercepts == {"comprehensibility": 2.138, "nativelikeness": -0.537}
+    assert model.features == FEATURES
+    assert model.weights["comprehensibility"] == JAPANESE_COMPREHENSIBILITY
+    assert set(model.rubrics) == {"comprehensibility", "nativelikeness"}
+
+
+def test_model_dirs_override_bundled_models(tmp_path, monkeypatch):
+    (tmp_path / "Japanese.toml").write_bytes(MODEL)
+    (tmp_path / "Test.toml").write_bytes(MODEL)
+    (tmp_path / "notes.txt").write_text("not a model")
+    monkeypatch.setenv(language_model._MODEL_DIRS_ENV, str(tmp_path))
+
+    models = _discover_models()
+
+    assert models["Japanese"] == tmp_path / "Japanese.toml"
+    assert models["Test"] == tmp_path / "Test.toml"
+    assert "notes" not in models
@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from acat.backend import long_recording
+from acat.backend.long_recording import (
+    LongRecordingOptions,
+    Window,
+    merge_analyses,
+    window_executor,
+)
+from acat.backend.praat_score_judging_japanese import RecordingAnalysis
+from acat.backend.tracing import stage, trace_job
+
+WINDOWS = [Window(0, 6, 0, 5), Window(4, 11, 5, 10), Window(9, 15, 10, 15)]
+
+
+def _analysis(
+    nuclei=(), intervals=(), n_pauses=0, n_filled_pauses=0
+) -> RecordingAnalysis:
+    nuclei = np.array(nuclei, dtype=float)
+    return RecordingAnalysis(
+        speechrate=0.0,
+        n_pauses=n_pauses,
+        n_filled_pauses=n_filled_pauses,
+        f0_formants=np.zeros((len(nuclei), 4)),
+        nuclei=nuclei,
+        intervals=np.array(intervals, dtype=float).reshape(-1, 3),
+    )
+
+
+def test_merge_counts_nuclei_in_the_core_of_each_window():
+    merged = merge_analyses(
+        WINDOWS,
+        [
+            # the nucleus at 5.5 s is past the cut and counted by the next window
+            _analysis(nuclei=[1.0, 4.0, 5.5], n_pauses=1),
+            _analysis(nuclei=[1.5, 3.0], n_pauses=2, n_filled_pauses=1),
+            _analysis(nuclei=[0.5, 2.0]),
+        ],
+    )
+
+    np.testing.assert_allclose(merged.nuclei, [1.0, 4.0, 5.5, 7.0, 11.0])
+    assert merged.speechrate == pytest.approx(5 / 15)
+    assert len(merged.f0_formants) == 5
+    # each cut is placed in a pause, which both windows around it leave out
+    assert merged.n_pauses == 1 + 2 + 0 + len(WINDOWS) - 1
+    assert merged.n_filled_pauses == 1
+
+
+def test_merge_joins_the_halves_of_an_interval_at_a_cut():
+    merged = merge_analyses(
+        WINDOWS[:2],
+        [
+            _analysis(intervals=[[0, 4, 1], [4, 6, 0]]),
+            _analysis(intervals=[[0, 3, 0], [3, 7, 1]]),
+        ],
+    )
+
+    np.testing.assert_allclose(merged.intervals, [[0, 4, 1], [4, 7, 0], [7, 10, 1]])
+
+
+def test_merge_keeps_intervals_that_do_not_meet_at_a_cut():
+    merged = merge_analyses(
+        WINDOWS[:2],
+        [
+            _analysis(intervals=[[0, 4, 1]]),
+            _analysis(intervals=[[1, 3, 0], [3, 7, 1]]),
+        ],
+    )
+
+    np.testing.assert_allclose(merged.intervals, [[0, 4, 1], [5, 7, 0], [7, 10, 1]])
+
+
+def test_merge_skips_windows_without_intervals():
+    merged = merge_analyses(
+        WINDOWS,
+        [
+            _analysis(intervals=[[0, 6, 0]]),
+            _analysis(),
+            _analysis(intervals=[[0, 6, 0]]),
+        ],
+    )
+
+    np.testing.assert_allclose(merged.intervals, [[0, 5, 0], [10, 15, 0]])
+
+
+def _traced_analysis(path):
+    with stage("praat"):
+        return _analysis()
+
+
+def test_inline_windows_record_only_their_own_stages(monkeypatch):
+    monkeypatch.setattr(long_recording, "analyze_recording", _traced_analysis)
+    monkeypatch.setattr(long_recording.multiprocessing, "parent_process", object)
+
+    with trace_job("long") as trace:
+        long_recording._analyze_windows(["a", "b"], LongRecordingOptions())
+
+    assert [timing.name for timing in trace.stages] == ["praat", "praat"]
+
+
+def test_windows_on_an_executor_record_the_wait(monkeypatch):
+    monkeypatch.setattr(long_recording, "analyze_recording", _traced_analysis)
+
+    with trace_job("long") as trace:
+        with ThreadPoolExecutor(1) as executor, window_executor(executor):
+            long_recording._analyze_windows(["a"], LongRecordingOptions())
+
+    # the executor's threads do not see the trace, like the processes of a pool
+    assert [timing.name for timing in trace.stages] == ["windows"]
@@ -0,0 +1,74 @@
+import numpy as np
+import parselmouth
+import pytest
+
+from acat.backend.praat_score_judging_japanese import (
+    _SUMMARY_TABLE_COLUMN,
+    _split_by_recording,
+    _summary_values,
+)
+
+
+def _sound() -> parselmouth.Sound:
+    return parselmouth.Sound(np.zeros(100), sampling_frequency=1000)
+
+
+def _table(rows) -> parselmouth.Data:
+    """A summary table like the script's, with the given speech rate, pauses and
+    filled pauses in each row"""
+    table = parselmouth.praat.call(
+        "Create Table with column names",
+        "summary",
+        len(rows),
+        "soundname nsyll npause dur speechrate nrFP",
+    )
+    parselmouth.praat.call(
+        table, "Set column label (label)", "speechrate", _SUMMARY_TABLE_COLUMN
+    )
+    for row, values in enumerate(rows, start=1):
+        for column, value in zip((_SUMMARY_TABLE_COLUMN, "npause", "nrFP"), values):
+            parselmouth.praat.call(table, "Set numeric value", row, column, value)
+    return table
+
+
+def _objects_of_recording() -> list:
+    sound = _sound()
+    return [
+        sound,
+        parselmouth.praat.call(sound, "To TextGrid", "syllables", ""),
+        _table([(0, 0, 0)]),
+    ]
+
+
+def test_split_starts_a_recording_at_each_sound():
+    first, second = _objects_of_recording(), _objects_of_recording()
+    # the summary table of the run comes last, after every recording
+    summary = _table([(2.5, 1, 0), (3.5, 2, 1)])
+
+    groups = _split_by_recording([*first, *second[:2], summary], 2)
+
+    assert groups == [first, [*second[:2], summary]]
+
+
+def test_split_takes_a_single_recording_as_it_is():
+    objects = [_table([(0, 0, 0)]), *_objects_of_recording()]
+
+    assert _split_by_recording(objects, 1) == [objects]
+
+
+def test_split_raises_if_recordings_are_missing():
+    with pytest.raises(RuntimeError):
+        _split_by_recording(_objects_of_recording(), 2)
+
+
+def test_summary_values_are_read_in_the_order_listed():
+    table = _table([(2.5, 1, 0), (3.5, 2, 1), (4.5, 3, 2)])
+
+    values = _summary_values(table, 2)
+
+    np.testing.assert_array_equal(values, [[2.5, 1, 0], [3.5, 2, 1]])
+
+
+def test_summary_values_raise_if_recordings_are_missing():
+    with pytest.raises(RuntimeError):
+        _summary_values(_table([(2.5, 1, 0)]), 2)
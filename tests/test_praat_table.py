@@ -0,0 +1,57 @@
+import numpy as np
+import parselmouth
+import pytest
+
+from acat.backend.praat_table import extract_rows, table_column_labels, table_columns
+
+
+def _table(columns: dict) -> parselmouth.Data:
+    labels = list(columns)
+    n_rows = len(next(iter(columns.values())))
+    table = parselmouth.praat.call(
+        "Create Table with column names", "table", n_rows, " ".join(labels)
+    )
+    for column, values in columns.items():
+        for row, value in enumerate(values, start=1):
+            parselmouth.praat.call(table, "Set string value", row, column, value)
+    return table
+
+
+@pytest.fixture
+def table() -> parselmouth.Data:
+    return _table(
+        {
+            "tmin": ["0", "0.25", "0.75"],
+            "tmax": ["0.25", "0.75", "1.5"],
+            "syll": ["0", "1", "--undefined--"],
+        }
+    )
+
+
+def test_column_labels(table):
+    assert table_column_labels(table) == ["tmin", "tmax", "syll"]
+
+
+def test_columns_are_read_in_the_order_asked(table):
+    values = table_columns(table, ["tmax", "tmin"])
+
+    assert values.dtype == float
+    np.testing.assert_array_equal(values, [[0.25, 0], [0.75, 0.25], [1.5, 0.75]])
+
+
+def test_undefined_cells_become_nan(table):
+    values = table_columns(table, ["syll"])[:, 0]
+
+    np.testing.assert_array_equal(values[:2], [0, 1])
+    assert np.isnan(values[2])
+
+
+def test_unknown_columns_raise(table):
+    with pytest.raises(ValueError):
+        table_columns(table, ["speechrate"])
+
+
+def test_extract_rows(table):
+    rows = extract_rows(table, 'self["tmax"] > 0.5')
+
+    np.testing.assert_array_equal(table_columns(rows, ["tmin"])[:, 0], [0.25, 0.75])
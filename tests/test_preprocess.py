@@ -0,0 +1,92 @@
+import math
+import pathlib
+
+import numpy as np
+import parselmouth
+import pytest
+
+from acat.backend.audio_probe import AudioMetadata
+from acat.backend.preprocess import (
+    FileComparison,
+    PreprocessOptions,
+    summarize_comparisons,
+)
+from acat.backend.scoring import FEATURES
+
+
+def _sine(channels: int, sample_rate: int, seconds: float = 0.5) -> parselmouth.Sound:
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    tone = 0.5 * np.sin(2 * np.pi * 220 * t)
+    # the channels differ in level, so mixing them down averages them
+    return parselmouth.Sound(
+        np.stack([tone * (channel + 1) / channels for channel in range(channels)]),
+        sampling_frequency=sample_rate,
+    )
+
+
+def test_mixes_down_and_resamples():
+    sound = _sine(2, 44100)
+
+    preprocessed = PreprocessOptions(16000).apply(sound)
+
+    assert preprocessed.n_channels == 1
+    assert preprocessed.sampling_frequency == 16000
+    assert preprocessed.duration == pytest.approx(sound.duration, abs=1e-3)
+    expected = sound.convert_to_mono().resample(16000).values
+    np.testing.assert_allclose(preprocessed.values, expected)
+    # the mono tone is the mean of the channels, at 0.375 peak
+    assert np.abs(preprocessed.values).max() == pytest.approx(0.375, rel=1e-2)
+
+
+def test_keeps_channels_and_lower_rates():
+    sound = _sine(2, 12000)
+
+    preprocessed = PreprocessOptions(16000, mono=False).apply(sound)
+
+    assert preprocessed.n_channels == 2
+    assert preprocessed.sampling_frequency == 12000
+    np.testing.assert_array_equal(preprocessed.values, sound.values)
+
+
+@pytest.mark.parametrize(
+    "metadata, options, expected",
+    [
+        (AudioMetadata(1.0, 16000, 1), PreprocessOptions(16000), False),
+        (AudioMetadata(1.0, 16000, 2), PreprocessOptions(16000), True),
+        (AudioMetadata(1.0, 16000, 2), PreprocessOptions(16000, mono=False), False),
+        (AudioMetadata(1.0, 44100, 1), PreprocessOptions(16000), True),
+    ],
+)
+def test_applies_to(metadata, options, expected):
+    assert options.applies_to(metadata) == expected
+
+
+def test_rejects_rates_that_lose_formants():
+    with pytest.raises(ValueError):
+        PreprocessOptions(8000)
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.delenv("ACAT_ANALYSIS_RATE", raising=False)
+    assert PreprocessOptions.from_env() is None
+
+    monkeypatch.setenv("ACAT_ANALYSIS_RATE", "22050")
+    assert PreprocessOptions.from_env() == PreprocessOptions(22050)
+
+
+def test_summarize_comparisons_leaves_out_undefined_features():
+    full = [1.0] * len(FEATURES)
+    comparisons = [
+        FileComparison(pathlib.Path("a.wav"), full, [1.5, *full[1:]], 2.0, 1.0),
+        FileComparison(pathlib.Path("b.wav"), [math.nan, *full[1:]], full, 2.0, 1.0),
+    ]
+
+    summary = summarize_comparisons(comparisons)
+
+    assert summary[FEATURES[0]] == {
+        "files": 1,
+        "mean_abs_diff": 0.5,
+        "max_abs_diff": 0.5,
+    }
+    assert summary[FEATURES[1]]["max_abs_diff"] == 0
+    assert summary["analysis"]["speedup"] == 2
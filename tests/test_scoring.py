@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from acat.backend.scoring import FEATURES, OUTPUTS, ScoringEngine, ScoringModel
+
+# the scoring formulas of the Japanese model before models were data
+JAPANESE = ScoringModel(
+    "Japanese",
+    np.array([2.138, -0.537]),
+    np.array(
+        [
+            [2.701, 0.015, -0.020, 3.821, -1.414, -5.549, 3.228],
+            [2.654, -0.001, -0.019, 3.170, -0.622, -8.016, 3.575],
+        ]
+    ),
+)
+
+
+def _baseline_scores(f) -> tuple:
+    speechrate, pauses, rangef0, sdsylldur, coeff1, coeff2, coeff3 = f
+    comprehensibility = (
+        2.138
+        + (2.701 * speechrate)
+        + (0.015 * pauses)
+        + (-0.020 * rangef0)
+        + (3.821 * sdsylldur)
+        + (-1.414 * coeff1)
+        + (-5.549 * coeff2)
+        + (3.228 * coeff3)
+    )
+    nativelikeness = (
+        -0.537
+        + (2.654 * speechrate)
+        + (-0.001 * pauses)
+        + (-0.019 * rangef0)
+        + (3.170 * sdsylldur)
+        + (-0.622 * coeff1)
+        + (-8.016 * coeff2)
+        + (3.575 * coeff3)
+    )
+    return comprehensibility, nativelikeness
+
+
+@pytest.fixture
+def features() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.normal([2.5, 10, 40, -0.5, -0.6, -0.8, -1.1], 1, (20, len(FEATURES)))
+
+
+def test_scores_match_the_baseline_formulas(features):
+    scores = ScoringEngine([JAPANESE]).score(features)
+
+    assert scores.shape == (len(features), 1, len(OUTPUTS))
+    np.testing.assert_allclose(
+        scores[:, 0], [_baseline_scores(f) for f in features], rtol=1e-12
+    )
+
+
+def test_scores_a_single_feature_vector(features):
+    scores = ScoringEngine([JAPANESE]).score(features[0].tolist())
+
+    np.testing.assert_allclose(scores[0, 0], _baseline_scores(features[0]))
+
+
+def test_scores_every_model_at_once(features):
+    doubled = ScoringModel("Doubled", JAPANESE.intercepts * 2, JAPANESE.weights * 2)
+    engine = ScoringEngine([JAPANESE, doubled])
+
+    scores = engine.score(features)
+
+    np.testing.assert_allclose(scores[:, 1], scores[:, 0] * 2)
+    np.testing.assert_allclose(engine.score_model("Doubled", features), scores[:, 1])
+
+
+def test_rejects_the_wrong_number_of_features(features):
+    with pytest.raises(ValueError):
+        ScoringEngine([JAPANESE]).score(features[:, :-1])
+
+
+def test_rejects_malformed_models():
+    with pytest.raises(ValueError):
+        ScoringModel("Bad", np.zeros(1), np.zeros((len(OUTPUTS), len(FEATURES))))
+    with pytest.raises(ValueError):
+        ScoringModel("Bad", np.zeros(len(OUTPUTS)), np.zeros((len(OUTPUTS), 3)))
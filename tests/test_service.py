@@ -0,0 +1,117 @@
+import asyncio
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from acat.backend import service as service_module
+from acat.backend.language_model import LanguageModel
+from acat.backend.service import HttpError, ScoringService, _Request
+
+MODEL = LanguageModel("Japanese")
+
+
+@pytest.fixture
+def files(tmp_path) -> list:
+    paths = []
+    for name in "abcde":
+        path = tmp_path / f"{name}.wav"
+        path.write_bytes(name.encode())
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def batches(monkeypatch) -> list:
+    """Score files in threads, recording the batches they were scored in"""
+    batches = []
+
+    def score(paths, models, preprocess):
+        batches.append([path.name for path in paths])
+        return [
+            (None, "RuntimeError: cannot analyze")
+            if path.name == "e.wav"
+            else ({model: path.name for model in models}, None)
+            for path in paths
+        ]
+
+    monkeypatch.setattr(service_module, "_score_in_worker", score)
+    return batches
+
+
+def _service(max_workers: int) -> ScoringService:
+    service = ScoringService(max_workers)
+    service._executor = ThreadPoolExecutor(max_workers)
+    return service
+
+
+def _get(path: str) -> _Request:
+    return _Request("GET", path, {}, {}, b"")
+
+
+def test_queued_jobs_are_scored_in_batches(files, batches):
+    async def run():
+        service = _service(max_workers=1)
+        jobs = [service.submit(path, [MODEL]) for path in files]
+        await asyncio.gather(*(job.done.wait() for job in jobs))
+        return service, jobs
+
+    service, jobs = asyncio.run(run())
+
+    # the first job started alone, and the others queued up behind it meanwhile
+    assert batches == [["a.wav"], ["b.wav", "c.wav", "d.wav", "e.wav"]]
+    assert [job.status for job in jobs] == ["done"] * 4 + ["failed"]
+    assert jobs[1].scores == {MODEL: "b.wav"}
+    assert jobs[4].error == "RuntimeError: cannot analyze"
+    assert service.metrics()["jobs"]["batches"] == 2
+
+
+def test_batches_leave_queued_jobs_for_the_other_workers(files, batches):
+    async def run():
+        service = _service(max_workers=2)
+        await asyncio.gather(
+            *(service.submit(path, [MODEL]).done.wait() for path in files)
+        )
+
+    asyncio.run(run())
+
+    # a and b start at once, and the first worker to be done takes half the queue
+    assert sorted(map(len, batches)) == [1, 1, 1, 2]
+    assert batches[2] == ["c.wav", "d.wav"]
+
+
+def test_batches_only_group_jobs_for_the_same_models(files, batches):
+    async def run():
+        service = _service(max_workers=1)
+        jobs = [
+            service.submit(path, [MODEL] if i % 2 else [MODEL, MODEL])
+            for i, path in enumerate(files)
+        ]
+        await asyncio.gather(*(job.done.wait() for job in jobs))
+
+    asyncio.run(run())
+
+    assert batches == [["a.wav"], ["b.wav", "d.wav"], ["c.wav", "e.wav"]]
+
+
+def test_health_reports_starting_until_the_workers_are_warm():
+    service = ScoringService(max_workers=1)
+
+    assert asyncio.run(service._route(_get("/health")))[0] == 503
+    service.ready = True
+    status, body = asyncio.run(service._route(_get("/health")))
+    assert (status, body["status"]) == (200, "ok")
+
+
+def test_a_full_queue_rejects_jobs(files, batches):
+    async def run():
+        service = _service(max_workers=1)
+        service.max_queue = 2
+        jobs = [service.submit(path, [MODEL]) for path in files[:3]]
+        with pytest.raises(HttpError):
+            service.submit(files[3], [MODEL])
+        # joining a queued job needs no room in the queue
+        assert service.submit(files[2], [MODEL]) is jobs[2]
+        await asyncio.gather(*(job.done.wait() for job in jobs))
+
+    asyncio.run(run())
@@ -0,0 +1,115 @@
+import os
+import time
+
+import pytest
+
+from acat.backend.watch import FolderWatcher, ScoreLedger, WatchedFile
+
+SETTLE_SECONDS = 0.2
+
+
+@pytest.fixture(params=[False, True], ids=["polling", "inotify"])
+def use_inotify(request) -> bool:
+    return request.param
+
+
+def _watcher(directory, ledger_path, use_inotify) -> FolderWatcher:
+    return FolderWatcher(
+        directory,
+        ScoreLedger(ledger_path),
+        settle_seconds=SETTLE_SECONDS,
+        poll_interval=0.02,
+        use_inotify=use_inotify,
+    )
+
+
+def _poll_for(watcher: FolderWatcher, seconds: float) -> list:
+    ready = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        ready.extend(watcher.poll(0.02))
+    return ready
+
+
+def _names(files) -> list:
+    return sorted(file.path.name for file in files)
+
+
+def test_hands_out_existing_and_new_files_once_they_settle(tmp_path, use_inotify):
+    audio = tmp_path / "audio"
+    audio.mkdir()
+    (audio / "a.wav").write_bytes(b"a")
+    watcher = _watcher(audio, tmp_path / "ledger.jsonl", use_inotify)
+
+    assert watcher.poll(0) == []
+    (audio / "b.wav").write_bytes(b"b")
+    (audio / "notes.txt").write_bytes(b"not audio")
+    (audio / ".c.wav").write_bytes(b"partial copy")
+
+    assert _names(_poll_for(watcher, 3 * SETTLE_SECONDS)) == ["a.wav", "b.wav"]
+    assert _poll_for(watcher, 2 * SETTLE_SECONDS) == []
+    watcher.close()
+
+
+def test_waits_for_files_that_are_still_written(tmp_path, use_inotify):
+    watcher = _watcher(tmp_path, tmp_path / "ledger.jsonl", use_inotify)
+    path = tmp_path / "a.wav"
+
+    ready = []
+    with open(path, "wb") as f:
+        for _ in range(10):
+            f.write(b"x" * 100)
+            f.flush()
+            ready.extend(_poll_for(watcher, SETTLE_SECONDS / 4))
+    assert ready == []
+
+    [file] = _poll_for(watcher, 3 * SETTLE_SECONDS)
+    assert file.size == 1000
+    watcher.close()
+
+
+def test_scored_files_are_skipped_after_a_restart(tmp_path):
+    audio = tmp_path / "audio"
+    audio.mkdir()
+    for name in ("a.wav", "b.wav", "c.wav"):
+        (audio / name).write_bytes(name.encode())
+    watcher = _watcher(audio, tmp_path / "ledger.jsonl", False)
+    for file in _poll_for(watcher, 3 * SETTLE_SECONDS):
+        watcher.done(file)
+    watcher.close()
+
+    # a.wav is only touched, while b.wav gets new content
+    stat = (audio / "a.wav").stat()
+    os.utime(audio / "a.wav", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    (audio / "b.wav").write_bytes(b"new content")
+
+    watcher = _watcher(audio, tmp_path / "ledger.jsonl", False)
+    assert _names(_poll_for(watcher, 3 * SETTLE_SECONDS)) == ["b.wav"]
+    assert watcher.ledger.lookup(audio / "a.wav").mtime_ns == stat.st_mtime_ns + 10**9
+    watcher.close()
+
+
+def test_files_being_scored_are_not_handed_out_again(tmp_path):
+    path = tmp_path / "a.wav"
+    path.write_bytes(b"a")
+    watcher = _watcher(tmp_path, tmp_path / "ledger.jsonl", False)
+    [file] = _poll_for(watcher, 3 * SETTLE_SECONDS)
+
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert _poll_for(watcher, 3 * SETTLE_SECONDS) == []
+    watcher.close()
+
+
+def test_ledger_keeps_the_latest_entry_and_skips_a_cut_off_line(tmp_path):
+    ledger = ScoreLedger(tmp_path / "ledger.jsonl")
+    ledger.record(WatchedFile(tmp_path / "a.wav", "first", 1, 1))
+    ledger.record(WatchedFile(tmp_path / "a.wav", "second", 2, 2), failed=True)
+    with open(ledger.path, "a") as f:
+        f.write('{"path": "/data/b.w')
+
+    reloaded = ScoreLedger(ledger.path)
+
+    assert len(reloaded) == 1
+    entry = reloaded.lookup(tmp_path / "a.wav")
+    assert (entry.fingerprint, entry.failed) == ("second", True)